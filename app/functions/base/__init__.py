@@ -4,3 +4,5 @@ from .grid import *
 from .settings import *
 from .tile_naming import *
 from .logger import *
+from .profiler import *
+from .project_config import *
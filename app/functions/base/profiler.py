@@ -0,0 +1,121 @@
+# app/functions/base/profiler.py
+
+import os
+import time
+import threading
+import cProfile
+import pstats
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+PROFILES_DIR = "profiles"
+PROFILE_TOP_FUNCTIONS = 40
+PROFILE_TOP_ALLOCATIONS = 25
+
+# cProfile can't nest and tracemalloc is process-wide, so one action is
+# profiled at a time and overlapping or nested actions run unprofiled
+_profile_lock = threading.Lock()
+_profile_owner = None  # Thread ident of the profiled action
+
+def is_profiling():
+    """
+    Check whether the calling thread is running a profiled action.
+
+    cProfile and tracemalloc only see this thread's work well, so worker
+    pools run their items inline while this is true.
+    """
+    return _profile_owner == threading.get_ident()
+
+def profile_action(base_dir, action, enabled=True):
+    """
+    Profile the enclosed block into <base_dir>/profiles/<action>-<timestamp>.
+
+    Does nothing unless enabled, so callers can pass settings['profile'].
+    """
+    if not enabled:
+        return nullcontext()
+    return _profile(base_dir, action)
+
+@contextmanager
+def _profile(base_dir, action):
+    """Run the block under cProfile and tracemalloc and write the reports afterwards."""
+    global _profile_owner
+    if not _profile_lock.acquire(blocking=False):
+        print(f"Another action is being profiled, running {action} without profiling")
+        yield
+        return
+
+    _profile_owner = threading.get_ident()
+    try:
+        started = datetime.now()
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        profiler = cProfile.Profile()
+
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            elapsed = time.perf_counter() - start
+            current, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+            if not was_tracing:
+                tracemalloc.stop()
+
+            output_dir = os.path.join(base_dir, PROFILES_DIR, f"{action}-{started.strftime('%Y%m%d-%H%M%S')}")
+            try:
+                write_profile_reports(output_dir, action, profiler, elapsed, current, peak, snapshot)
+                print(f"Profile written to {output_dir}")
+            except Exception as e:
+                print(f"Error writing profile for {action}: {e}")
+    finally:
+        _profile_owner = None
+        _profile_lock.release()
+
+def write_profile_reports(output_dir, action, profiler, elapsed, current, peak, snapshot):
+    """
+    Write profile.pstats, a text summary of the hottest functions and a
+    memory report with peak usage and the top allocation sites.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    profiler.dump_stats(os.path.join(output_dir, "profile.pstats"))
+
+    with open(os.path.join(output_dir, "functions.txt"), 'w') as f:
+        f.write(f"Action: {action}\n")
+        f.write(f"Wall time: {elapsed:.3f}s\n")
+        f.write("Worker pool items ran one at a time in the profiled thread, so the wall time is\n"
+                "serial; expect the unprofiled action to be faster on several CPUs.\n")
+        stats = pstats.Stats(profiler, stream=f)
+        for sort_key in ('cumulative', 'tottime'):
+            f.write(f"\n=== Top {PROFILE_TOP_FUNCTIONS} by {sort_key} ===\n")
+            stats.sort_stats(sort_key).print_stats(PROFILE_TOP_FUNCTIONS)
+
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>")
+    ))
+    with open(os.path.join(output_dir, "memory.txt"), 'w') as f:
+        f.write(f"Action: {action}\n")
+        f.write(f"Peak traced memory: {peak / 1024 ** 2:.1f} MB\n")
+        f.write(f"Traced memory at end: {current / 1024 ** 2:.1f} MB\n")
+        if resource is not None:
+            # ru_maxrss is in kilobytes on Linux and bytes on macOS
+            max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            scale = 1024 ** 2 if os.uname().sysname == 'Darwin' else 1024
+            f.write(f"Process peak RSS (since start): {max_rss / scale:.1f} MB\n")
+        f.write(f"\n=== Top {PROFILE_TOP_ALLOCATIONS} allocation sites still held at the end ===\n")
+        for stat in snapshot.statistics('lineno')[:PROFILE_TOP_ALLOCATIONS]:
+            frame = stat.traceback[0]
+            f.write(f"{stat.size / 1024:10.1f} KB {stat.count:8d} blocks  {frame.filename}:{frame.lineno}\n")
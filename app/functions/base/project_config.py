@@ -0,0 +1,58 @@
+# app/functions/base/project_config.py
+import os
+
+# Sub-tile grid sizes used by multi-scale assembly (2 means 2x2, and so on)
+DEFAULT_SUBDIVISION_SCALES = [2, 3, 5, 8, 10]
+
+def load_project_config(project_path):
+    """Load project-specific configuration."""
+    config = {
+        'name': os.path.basename(project_path),
+        'upscale_size': 1024,
+        'base_tile_size': 600,
+        'subdivision_scales': list(DEFAULT_SUBDIVISION_SCALES)
+    }
+    
+    try:
+        project_config = os.path.join(project_path, 'paneful.project')
+        if os.path.exists(project_config):
+            current_section = None
+            with open(project_config, 'r') as f:
+                for line in f:
+                    line = line.strip()
+                    if line.startswith('[') and line.endswith(']'):
+                        current_section = line[1:-1]
+                    elif line and not line.startswith('#') and current_section == 'project':
+                        key, value = line.split('=')
+                        if key in ['upscale_size', 'base_tile_size']:
+                            config[key] = int(value)
+                        elif key == 'subdivision_scales':
+                            config[key] = parse_subdivision_scales(value)
+                        else:
+                            config[key] = value
+    except Exception as e:
+        print(f"Error loading project config: {e}")
+    
+    return config
+
+def parse_subdivision_scales(value):
+    """Parse a comma-separated scale list such as '2,3,5' or '2x2,3x3'."""
+    scales = []
+    for part in value.split(','):
+        part = part.strip().lower()
+        if not part:
+            continue
+        grid_size = int(part.split('x')[0])
+        if grid_size < 1:
+            raise ValueError(f"Invalid subdivision scale: {part}")
+        if grid_size not in scales:
+            scales.append(grid_size)
+    if not scales:
+        raise ValueError("No subdivision scales configured")
+    return sorted(scales)
+
+def get_subdivision_scales(project_path):
+    """Get the project's subdivision grid sizes."""
+    if not project_path:
+        return list(DEFAULT_SUBDIVISION_SCALES)
+    return load_project_config(project_path).get('subdivision_scales', list(DEFAULT_SUBDIVISION_SCALES))
@@ -11,7 +11,8 @@ def load_settings():
     settings = {
         'projects_dir': 'projects',  # Default relative to root
         'rendered_tile_size': 1024,
-        'quality_level': 'ultra'
+        'quality_level': 'ultra',
+        'profile': False  # Profile menu actions into <project>/profiles
     }
     
     try:
@@ -25,6 +26,9 @@ def load_settings():
                         if value not in VALID_QUALITY_LEVELS:
                             print(f"Warning: Invalid quality_level '{value}', using 'ultra'")
                             value = 'ultra'
+                    if key == 'profile':
+                        settings[key] = value.strip().lower() in ('1', 'true', 'yes', 'on')
+                        continue
                     settings[key] = int(value) if value.isdigit() else value
                     
         # Convert projects_dir to absolute path
@@ -39,4 +43,6 @@ def load_settings():
         
     print(f"Using projects directory: {settings['projects_dir']}")
     print(f"Quality level set to: {settings['quality_level']}")
+    if settings['profile']:
+        print("Profiling enabled for menu actions")
     return settings
\ No newline at end of file
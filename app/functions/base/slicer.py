@@ -6,6 +6,7 @@ import numpy as np
 from PIL import Image, ImageFilter, ImageEnhance
 from tqdm import tqdm
 from .preprocessor import preprocess_image
+from .project_config import load_project_config
 from ..controlnet.canny import CannyMapGenerator
 from ..controlnet.normals import NormalMapGenerator
 from ..controlnet.depth import DepthMapGenerator
@@ -114,7 +115,6 @@ def slice_and_save(project_path, grid_size):
 
     # Load project configuration
     try:
-        from ..program_functions import load_project_config
         project_config = load_project_config(project_path)
         target_size = project_config.get('upscale_size', 1024)
         quality_level = project_config.get('quality_level', 'high')
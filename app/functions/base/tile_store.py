@@ -0,0 +1,410 @@
+# app/functions/base/tile_store.py
+import os
+import json
+import mmap
+import zlib
+import struct
+import cv2
+import numpy as np
+from .io import calculate_md5
+
+PACKED_EXTENSION = '.ptiles'
+TILE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+CODECS = ('raw', 'zlib')
+
+_MAGIC = b'PTILES01'
+_HEADER = struct.Struct('<8sQQ')  # magic, index offset, index length
+_ALIGNMENT = 64
+
+class PackedTileStore:
+    """
+    Read-only container holding the decoded tiles of one directory.
+
+    Layout: a fixed header, the tile payloads (64-byte aligned) and a JSON
+    offset index at the end. Raw payloads are served as zero-copy numpy views
+    into a memory map; zlib payloads are decompressed on read.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mmap = None
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, index_offset, index_length = _HEADER.unpack_from(self._mmap, 0)
+            if magic != _MAGIC:
+                raise ValueError(f"Not a packed tile store: {path}")
+            self.index = json.loads(self._mmap[index_offset:index_offset + index_length])
+        except Exception:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def names(self):
+        """List tile names (paths relative to the packed directory)."""
+        return list(self.index)
+
+    def entry(self, name):
+        """Get the index entry (offset, length, shape, dtype, codec, md5) for a tile."""
+        return self.index[name]
+
+    def read(self, name):
+        """Get a tile as a numpy array; raw tiles are read-only views into the map."""
+        entry = self.index[name]
+        dtype = np.dtype(entry['dtype'])
+        if entry['codec'] == 'raw':
+            data = np.frombuffer(
+                self._mmap,
+                dtype=dtype,
+                count=entry['length'] // dtype.itemsize,
+                offset=entry['offset']
+            )
+        else:
+            payload = self._mmap[entry['offset']:entry['offset'] + entry['length']]
+            data = np.frombuffer(zlib.decompress(payload), dtype=dtype)
+        return data.reshape(entry['shape'])
+
+    def close(self):
+        """Close the memory map; live views keep it open until they are released."""
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                pass  # Views still reference the map, it is released with them
+            self._mmap = None
+        self._file.close()
+
+    @staticmethod
+    def write(path, entries, codec='raw'):
+        """
+        Write a container from (name, array) pairs.
+
+        Args:
+            path: Output container path
+            entries: Iterable of (relative name, numpy array) or
+                     (relative name, numpy array, md5 of the source file)
+            codec: 'raw' for zero-copy reads or 'zlib' for fast compression
+
+        Returns:
+            int: Number of tiles written
+        """
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec '{codec}', expected one of: {', '.join(CODECS)}")
+
+        index = {}
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, 0, 0))
+            for name, array, *source_md5 in entries:
+                array = np.ascontiguousarray(array)
+                payload = array.tobytes()
+                md5 = source_md5[0] if source_md5 else calculate_md5(payload)
+                if codec == 'zlib':
+                    payload = zlib.compress(payload, 1)
+
+                f.write(b'\0' * (-f.tell() % _ALIGNMENT))
+                index[name] = {
+                    'offset': f.tell(),
+                    'length': len(payload),
+                    'shape': list(array.shape),
+                    'dtype': array.dtype.str,
+                    'codec': codec,
+                    'md5': md5
+                }
+                f.write(payload)
+
+            index_bytes = json.dumps(index).encode('utf-8')
+            index_offset = f.tell()
+            f.write(index_bytes)
+            f.seek(0)
+            f.write(_HEADER.pack(_MAGIC, index_offset, len(index_bytes)))
+
+        os.replace(temp_path, path)
+        return len(index)
+
+def packed_path_for(directory):
+    """Get the container path that packs a directory."""
+    return os.path.normpath(directory) + PACKED_EXTENSION
+
+def _iter_directory_tiles(directory, packed_names=None):
+    """
+    Yield (relative name, array, file md5) for every readable tile under a
+    directory, adding the names to packed_names if given.
+    """
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for filename in sorted(files):
+            if not filename.lower().endswith(TILE_EXTENSIONS):
+                continue
+            full_path = os.path.join(root, filename)
+            with open(full_path, 'rb') as f:
+                data = f.read()
+            array = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+            if array is None:
+                print(f"Skipping unreadable tile: {full_path}")
+                continue
+            name = os.path.relpath(full_path, directory).replace(os.sep, '/')
+            if packed_names is not None:
+                packed_names.add(name)
+            # Keep the file hash so incremental subdivision sees packed tiles as unchanged
+            yield name, array, calculate_md5(data)
+
+def _iter_merged_tiles(directory, existing, packed_names):
+    """Yield the directory's tiles, then the existing container's tiles that have no loose file."""
+    yield from _iter_directory_tiles(directory, packed_names)
+    if existing is not None:
+        for name in existing.names():
+            if name not in packed_names:
+                yield name, existing.read(name), existing.entry(name)['md5']
+
+def _pack_directory(directory, codec='raw'):
+    """
+    Pack a directory into its container, keeping tiles already packed there.
+
+    Returns:
+        tuple: (tiles in the container, names of the loose tiles packed)
+    """
+    path = packed_path_for(directory)
+    cached = _stores.pop(path, None)
+    if cached is not None:
+        cached[1].close()
+
+    packed_names = set()
+    existing = PackedTileStore(path) if os.path.isfile(path) else None
+    try:
+        count = PackedTileStore.write(path, _iter_merged_tiles(directory, existing, packed_names), codec)
+    finally:
+        if existing is not None:
+            existing.close()
+    invalidate_tile_sources()
+    print(f"Packed {count} tiles from {directory} into {os.path.basename(path)}")
+    return count, packed_names
+
+def import_directory(directory, codec='raw'):
+    """Pack a tile directory (including scale subdirectories) into its container."""
+    return _pack_directory(directory, codec)[0]
+
+def export_directory(container_path, directory=None):
+    """Unpack a container back into the regular directory layout."""
+    if directory is None:
+        directory = container_path[:-len(PACKED_EXTENSION)]
+    count = 0
+    with PackedTileStore(container_path) as store:
+        for name in store.names():
+            out_path = os.path.join(directory, *name.split('/'))
+            os.makedirs(os.path.dirname(out_path), exist_ok=True)
+            if cv2.imwrite(out_path, store.read(name)):
+                count += 1
+            else:
+                print(f"Failed to export {name} to {out_path}")
+    invalidate_tile_sources()
+    print(f"Exported {count} tiles from {os.path.basename(container_path)} to {directory}")
+    return count
+
+class TileSource:
+    """
+    Tiles of one directory, served from loose files and/or a packed container.
+
+    Loose files take priority, so tiles written after packing are still seen.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.store = None
+        self.prefix = ''
+        self.files = set()
+
+        try:
+            # One scandir per directory; d_type avoids a stat per entry
+            with os.scandir(directory) as entries:
+                self.files = {
+                    entry.name for entry in entries
+                    if entry.name.lower().endswith(TILE_EXTENSIONS) and entry.is_file()
+                }
+        except (FileNotFoundError, NotADirectoryError):
+            pass
+
+        # A directory is packed either on its own or inside its parent's container
+        # (e.g. subdivided-tiles/<variant>/2x2 lives in subdivided-tiles/<variant>.ptiles)
+        parent = os.path.dirname(os.path.normpath(directory))
+        candidates = [
+            (packed_path_for(directory), ''),
+            (packed_path_for(parent), os.path.basename(os.path.normpath(directory)) + '/')
+        ]
+        for container_path, prefix in candidates:
+            if os.path.isfile(container_path):
+                try:
+                    self.store = _open_store(container_path)
+                    self.prefix = prefix
+                    break
+                except Exception as e:
+                    print(f"Error opening packed tile store {container_path}: {e}")
+
+        self.packed = set()
+        if self.store is not None:
+            for name in self.store.index:
+                if name.startswith(self.prefix) and '/' not in name[len(self.prefix):]:
+                    self.packed.add(name[len(self.prefix):])
+
+    def names(self):
+        """List all tile names, sorted."""
+        return sorted(self.files | self.packed)
+
+    def __contains__(self, name):
+        return name in self.files or name in self.packed
+
+    def read(self, name, flags=cv2.IMREAD_COLOR):
+        """Read a tile with cv2.imread semantics for the given flags."""
+        if name in self.files:
+            return cv2.imread(os.path.join(self.directory, name), flags)
+        if name not in self.packed:
+            return None
+
+        array = self.store.read(self.prefix + name)
+        if flags == cv2.IMREAD_UNCHANGED:
+            return array
+        if array.dtype != np.uint8:
+            array = (array // 257).astype(np.uint8)
+        if flags == cv2.IMREAD_GRAYSCALE:
+            if array.ndim == 2:
+                return array
+            code = cv2.COLOR_BGRA2GRAY if array.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+            return cv2.cvtColor(array, code)
+        if array.ndim == 2:
+            return cv2.cvtColor(array, cv2.COLOR_GRAY2BGR)
+        if array.shape[2] == 4:
+            return array[:, :, :3]
+        return array
+
+    def fingerprint(self, name):
+        """Get mtime/size (and md5 for packed tiles) identifying a tile's content."""
+        if name in self.files:
+            stat = os.stat(os.path.join(self.directory, name))
+            return {'mtime': stat.st_mtime_ns, 'size': stat.st_size, 'md5': None}
+        entry = self.store.entry(self.prefix + name)
+        return {'mtime': os.stat(self.store.path).st_mtime_ns, 'size': entry['length'], 'md5': entry['md5']}
+
+_stores = {}
+_sources = {}
+
+def _open_store(container_path):
+    """Open a container once per process, reopening it if it was rewritten."""
+    mtime = os.stat(container_path).st_mtime_ns
+    cached = _stores.get(container_path)
+    if cached is not None:
+        if cached[0] == mtime:
+            return cached[1]
+        cached[1].close()
+    store = PackedTileStore(container_path)
+    _stores[container_path] = (mtime, store)
+    return store
+
+def get_tile_source(directory):
+    """Get the (cached) tile source for a directory."""
+    directory = os.path.normpath(directory)
+    if directory not in _sources:
+        _sources[directory] = TileSource(directory)
+    return _sources[directory]
+
+def invalidate_tile_sources():
+    """Forget cached directory listings so the next lookup rescans."""
+    _sources.clear()
+
+def register_tiles(directory, names):
+    """Add freshly written files to a cached directory listing."""
+    directory = os.path.normpath(directory)
+    if directory in _sources:
+        _sources[directory].files.update(names)
+
+def list_tiles(directory):
+    """List tile names in a directory, including packed tiles."""
+    return get_tile_source(directory).names()
+
+def tile_exists(path):
+    """Check whether a tile exists as a file or inside a packed container."""
+    return os.path.basename(path) in get_tile_source(os.path.dirname(path))
+
+def read_tile(path, flags=cv2.IMREAD_COLOR):
+    """Read a tile from disk or from a packed container, like cv2.imread."""
+    return get_tile_source(os.path.dirname(path)).read(os.path.basename(path), flags)
+
+def tile_fingerprint(path):
+    """Get the content fingerprint of a tile (see TileSource.fingerprint)."""
+    return get_tile_source(os.path.dirname(path)).fingerprint(os.path.basename(path))
+
+def list_variants(parent_dir):
+    """List variant names under a directory, whether stored as folders or containers."""
+    if not os.path.isdir(parent_dir):
+        return []
+    variants = set()
+    with os.scandir(parent_dir) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                variants.add(entry.name)
+            elif entry.name.endswith(PACKED_EXTENSION):
+                variants.add(entry.name[:-len(PACKED_EXTENSION)])
+    return sorted(variants)
+
+def _packable_directories(project_path):
+    """Directories of a project that get one container each."""
+    directories = [os.path.join(project_path, "base-tiles")]
+    for category in ("rendered-tiles", "subdivided-tiles"):
+        category_dir = os.path.join(project_path, category)
+        if os.path.isdir(category_dir):
+            directories.extend(
+                os.path.join(category_dir, d) for d in sorted(os.listdir(category_dir))
+                if os.path.isdir(os.path.join(category_dir, d))
+            )
+    return [d for d in directories if os.path.isdir(d)]
+
+def pack_project(project_path, codec='raw', remove_sources=False):
+    """Pack base, rendered and subdivided tiles of a project into containers."""
+    total = 0
+    for directory in _packable_directories(project_path):
+        count, packed_names = _pack_directory(directory, codec)
+        total += count
+        if remove_sources and packed_names:
+            # Only files that made it into the container; unreadable tiles stay put
+            for name in packed_names:
+                os.remove(os.path.join(directory, *name.split('/')))
+            for root, dirs, files in os.walk(directory, topdown=False):
+                if not os.listdir(root):
+                    os.rmdir(root)
+    invalidate_tile_sources()
+    return total
+
+def unpack_project(project_path, remove_containers=False):
+    """Export every container of a project back to the directory layout."""
+    containers = []
+    base_container = packed_path_for(os.path.join(project_path, "base-tiles"))
+    if os.path.isfile(base_container):
+        containers.append(base_container)
+    for category in ("rendered-tiles", "subdivided-tiles"):
+        category_dir = os.path.join(project_path, category)
+        if os.path.isdir(category_dir):
+            containers.extend(
+                os.path.join(category_dir, f) for f in sorted(os.listdir(category_dir))
+                if f.endswith(PACKED_EXTENSION)
+            )
+
+    total = 0
+    for container_path in containers:
+        total += export_directory(container_path)
+        if remove_containers:
+            cached = _stores.pop(container_path, None)
+            if cached is not None:
+                cached[1].close()
+            os.remove(container_path)
+    invalidate_tile_sources()
+    return total
@@ -0,0 +1,336 @@
+import random
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional, Tuple
+import cv2
+import numpy as np
+from PIL import Image
+from .base.profiler import is_profiling
+
+# Tiles rendered per NumPy pass; bounds the uint32 intermediates of large tiles
+BATCH_SIZE = 16
+TINT_ALPHA = int(255 * 0.3)
+
+@dataclass
+class EffectPlan:
+    """Effect chosen for one tile, resolved to source paths but not yet decoded."""
+    position: Tuple[int, int]
+    kind: str                                   # original, bitmap, blend, grayscale, solid or rotate
+    sources: tuple = ()                         # Source tile paths
+    shape: Optional[Tuple[int, int]] = None     # (height, width) of the rendered tile
+    color: Optional[Tuple[int, int, int]] = None
+    tint: Optional[Tuple[int, int, int]] = None
+
+def load_rgba(path):
+    """Decode a tile as an (H, W, 4) RGBA array, matching PIL's convert('RGBA')."""
+    with Image.open(path) as image:
+        # 8-bit RGB(A) PNGs decode identically and faster through OpenCV
+        if image.format == 'PNG' and image.mode in ('RGB', 'RGBA'):
+            decoded = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+            if decoded is not None and decoded.dtype == np.uint8 and decoded.ndim == 3:
+                code = cv2.COLOR_BGRA2RGBA if decoded.shape[2] == 4 else cv2.COLOR_BGR2RGBA
+                return cv2.cvtColor(decoded, code)
+        return np.asarray(image.convert('RGBA'))
+
+def read_tile_shape(path):
+    """Get a tile's (height, width) from its header."""
+    with Image.open(path) as image:
+        return image.height, image.width
+
+def _pick_random_tile(all_tiles, tile_shape):
+    """Pick a random tile and check it opens, like compositing_functions.load_random_tile."""
+    if all_tiles:
+        tile_path = random.choice(all_tiles)
+        try:
+            return tile_path, tile_shape(tile_path)
+        except Exception as e:
+            print(f"Error loading random tile {tile_path}: {e}")
+    return None, None
+
+def _to_bitmap(tile):
+    """Dither a tile to 1-bit and back to RGBA (Floyd-Steinberg stays in PIL)."""
+    return np.asarray(Image.fromarray(tile, 'RGBA').convert('1').convert('RGBA'))
+
+def plan_random_effect(tile_path, position, tile_size, all_tiles, tile_shape=read_tile_shape):
+    """
+    Choose a random effect for a tile without decoding anything.
+
+    Consumes the random module exactly like compositing_functions.apply_random_effect,
+    so a seeded run picks the same effects, tiles and colours. Only tile headers
+    are read here; pixels are decoded by render_effect_plans.
+
+    Args:
+        tile_path: Path of the tile at this grid position
+        position: (row, col) of the tile
+        tile_size: (width, height) of a grid cell, or an int for square cells
+        all_tiles: Paths random tiles are drawn from
+        tile_shape: Callable returning a path's (height, width)
+    """
+    width, height = (tile_size, tile_size) if isinstance(tile_size, int) else tile_size
+    effect_choice = random.randint(1, 7)
+    plan = None
+    try:
+        if effect_choice == 1:
+            plan = EffectPlan(position, 'original', (tile_path,), tile_shape(tile_path))
+
+        elif effect_choice == 2:
+            random_path, random_shape = _pick_random_tile(all_tiles, tile_shape)
+            plan = EffectPlan(position, 'original', (random_path,), random_shape)
+
+        elif effect_choice == 3:
+            path1, shape1 = _pick_random_tile(all_tiles, tile_shape)
+            path2, shape2 = _pick_random_tile(all_tiles, tile_shape)
+            if path1 is not None and path2 is not None:
+                if shape1 != shape2:
+                    raise ValueError("images do not match")
+                plan = EffectPlan(position, 'blend', (path1, path2), shape1)
+            else:
+                plan = EffectPlan(position, 'original', (tile_path,), tile_shape(tile_path))
+
+        elif effect_choice == 4:
+            plan = EffectPlan(position, 'grayscale', (tile_path,), tile_shape(tile_path))
+
+        elif effect_choice == 5:
+            random_path, random_shape = _pick_random_tile(all_tiles, tile_shape)
+            if random_path is not None:
+                plan = EffectPlan(position, 'bitmap', (random_path,), random_shape)
+            else:
+                plan = EffectPlan(position, 'original', (tile_path,), tile_shape(tile_path))
+
+        elif effect_choice == 6:
+            random_color = tuple(random.randint(0, 255) for _ in range(3))
+            plan = EffectPlan(position, 'solid', shape=(height, width), color=random_color)
+
+        elif effect_choice == 7:
+            # Enlarged by half, then turned 90 degrees (swapping width and height)
+            plan = EffectPlan(position, 'rotate', (tile_path,), (int(width * 1.5), int(height * 1.5)))
+
+        if effect_choice != 6 and random.choice([True, False]):
+            plan.tint = tuple(random.randint(0, 255) for _ in range(3))
+
+        if plan.kind != 'solid' and plan.sources[0] is None:
+            raise ValueError("No tile available")
+
+    except Exception as e:
+        print(f"Error applying effect at position {position}: {e}")
+        plan = EffectPlan(position, 'original', (tile_path,), tile_shape(tile_path))
+
+    return plan
+
+def _div255(values):
+    """Rounded division by 255, as PIL's DIV255."""
+    values = values + 128
+    return ((values >> 8) + values) >> 8
+
+def grayscale_batch(tiles):
+    """ITU-R 601-2 luma of (N, H, W, 4) tiles with opaque alpha, as PIL's convert('L')."""
+    rgb = tiles[..., :3].astype(np.uint32)
+    luma = (rgb[..., 0] * 19595 + rgb[..., 1] * 38470 + rgb[..., 2] * 7471 + 0x8000) >> 16
+    out = np.empty(tiles.shape, dtype=np.uint8)
+    out[..., :3] = luma[..., None]
+    out[..., 3] = 255
+    return out
+
+def blend_batch(tiles1, tiles2):
+    """50/50 blend of two (N, H, W, 4) stacks, as PIL's Image.blend(alpha=0.5)."""
+    return ((tiles1.astype(np.uint16) + tiles2) >> 1).astype(np.uint8)
+
+def _alpha_coefficients(alpha):
+    """PIL alpha_composite coefficients and output alpha for every destination alpha."""
+    dst_alpha = np.arange(256, dtype=np.uint32)
+    out_alpha255 = alpha * 255 + dst_alpha * (255 - alpha)
+    coef1 = (alpha * 255 * 255 * 128) // out_alpha255
+    coef2 = 255 * 128 - coef1
+    return coef1, coef2, _div255(out_alpha255).astype(np.uint8)
+
+_TINT_COEFFICIENTS = {}
+
+def _tint_table(color_value, coef1, coef2):
+    """Tinted channel value indexed by (destination alpha, destination value)."""
+    values = np.arange(256, dtype=np.uint32)
+    mixed = color_value * coef1[:, None] + values * coef2[:, None] + (0x80 << 7)
+    return ((((mixed >> 8) + mixed) >> 8) >> 7).astype(np.uint8)
+
+def tint_batch(tiles, colors, alpha=TINT_ALPHA):
+    """
+    Composite a flat colour layer over each tile, as PIL's Image.alpha_composite.
+
+    The result only depends on each pixel's alpha and channel value, so tiles
+    are remapped through lookup tables instead of dividing per pixel.
+
+    Args:
+        tiles: (N, H, W, 4) uint8 RGBA stack, or a list of (H, W, 4) tiles
+        colors: (N, 3) tint colours
+        alpha: Tint layer opacity (0-255)
+
+    Returns:
+        list: Tinted (H, W, 4) uint8 tiles
+    """
+    if alpha not in _TINT_COEFFICIENTS:
+        _TINT_COEFFICIENTS[alpha] = _alpha_coefficients(alpha)
+    coef1, coef2, alpha_table = _TINT_COEFFICIENTS[alpha]
+
+    out = []
+    for tile, color in zip(tiles, colors):
+        tinted = np.empty(tile.shape, dtype=np.uint8)
+        out.append(tinted)
+        tile_alpha = tile[..., 3]
+        if tile_alpha.min() == 255:
+            # Opaque tiles only need the alpha=255 row of each table, applied in one LUT pass
+            table = np.empty((1, 256, 4), dtype=np.uint8)
+            for channel, color_value in enumerate(color):
+                table[0, :, channel] = _tint_table(color_value, coef1[255:], coef2[255:])[0]
+            table[0, :, 3] = alpha_table[255]
+            cv2.LUT(np.ascontiguousarray(tile), table, dst=tinted)
+            continue
+        offsets = tile_alpha.astype(np.intp) * 256
+        for channel, color_value in enumerate(color):
+            table = _tint_table(color_value, coef1, coef2).ravel()
+            np.take(table, offsets + tile[..., channel], out=tinted[..., channel])
+        np.take(alpha_table, tile_alpha, out=tinted[..., 3])
+    return out
+
+def _render_chunk(kind, plans, load_tile):
+    """Render same-kind, same-shape plans, returning one (H, W, 4) array per plan."""
+    if kind == 'solid':
+        height, width = plans[0].shape
+        out = np.empty((len(plans), height, width, 4), dtype=np.uint8)
+        out[..., :3] = np.array([p.color for p in plans], dtype=np.uint8)[:, None, None, :]
+        out[..., 3] = 255
+        return list(out)
+
+    tiles = [load_tile(p.sources[0]) for p in plans]
+    if kind == 'original':
+        return tiles
+    if kind == 'bitmap':
+        return [_to_bitmap(tile) for tile in tiles]
+    if kind == 'rotate':
+        # Resized before rotating, so the resized width is the rotated height;
+        # the rotation itself is applied as a view afterwards
+        rotated_height, rotated_width = plans[0].shape
+        return list(np.stack([
+            np.asarray(Image.fromarray(tile, 'RGBA').resize((rotated_height, rotated_width)))
+            for tile in tiles
+        ]))
+    first = np.stack(tiles)
+    if kind == 'blend':
+        return list(blend_batch(first, np.stack([load_tile(p.sources[1]) for p in plans])))
+    return list(grayscale_batch(first))
+
+def _render_group(kind, plans, load_tile):
+    """Render one chunk of plans including tints (runs on a worker thread)."""
+    try:
+        tiles = _render_chunk(kind, plans, load_tile)
+    except Exception as e:
+        if len(plans) == 1:
+            print(f"Error rendering effect at position {plans[0].position}: {e}")
+            return [None]
+        # Isolate the failing plan
+        return [tile for plan in plans for tile in _render_group(kind, [plan], load_tile)]
+
+    tinted = [j for j, plan in enumerate(plans) if plan.tint is not None]
+    for j, tile in zip(tinted, tint_batch([tiles[j] for j in tinted], [plans[j].tint for j in tinted])):
+        tiles[j] = tile
+    if kind == 'rotate':
+        tiles = [np.rot90(tile) for tile in tiles]  # Zero-copy view, tints are per-pixel
+    return tiles
+
+def render_effect_plans(plans, load_tile=load_rgba, max_workers=None):
+    """
+    Decode and render planned effects on a thread pool, one NumPy pass per effect and shape.
+
+    Decoding, resizing and the NumPy passes release the GIL, so worker threads
+    run in parallel and hand back arrays without pickling. Untinted 'original'
+    tiles are returned as decoded and rotated tiles as np.rot90 views.
+
+    Returns:
+        list: (H, W, 4) uint8 RGBA arrays in the order of plans (None where rendering failed)
+    """
+    groups = {}
+    for index, plan in enumerate(plans):
+        groups.setdefault((plan.kind, plan.shape), []).append(index)
+
+    chunks = []
+    for (kind, _), indices in groups.items():
+        for start in range(0, len(indices), BATCH_SIZE):
+            chunks.append((kind, indices[start:start + BATCH_SIZE]))
+
+    results = [None] * len(plans)
+    if is_profiling():
+        # Keep the work in the profiled thread
+        for kind, indices in chunks:
+            for i, tile in zip(indices, _render_group(kind, [plans[i] for i in indices], load_tile)):
+                results[i] = tile
+        return results
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            (indices, executor.submit(_render_group, kind, [plans[i] for i in indices], load_tile))
+            for kind, indices in chunks
+        ]
+        for indices, future in futures:
+            for i, tile in zip(indices, future.result()):
+                results[i] = tile
+    return results
+
+def paste_with_alpha(canvas, tile, left, top):
+    """Paste an RGBA tile using its own alpha as the mask, as PIL's paste(tile, box, tile)."""
+    canvas_height, canvas_width = canvas.shape[:2]
+    height, width = tile.shape[:2]
+    x0, y0 = max(left, 0), max(top, 0)
+    x1, y1 = min(left + width, canvas_width), min(top + height, canvas_height)
+    if x0 >= x1 or y0 >= y1:
+        return
+    src = tile[y0 - top:y1 - top, x0 - left:x1 - left]
+    dst = canvas[y0:y1, x0:x1]
+
+    mask = src[..., 3:]
+    if mask.min() == 255:
+        dst[...] = src
+        return
+    mask = mask.astype(np.uint32)
+    dst[...] = _div255(dst.astype(np.uint32) * (255 - mask) + src.astype(np.uint32) * mask)
+
+def _composite_cells(cells, placements):
+    """Alpha-over same-size tiles onto distinct grid cells in one NumPy pass."""
+    rows = np.array([row for row, _, _ in placements])
+    cols = np.array([col for _, col, _ in placements])
+    tiles = np.stack([tile for _, _, tile in placements])
+
+    opaque = tiles[..., 3].reshape(len(tiles), -1).min(axis=1) == 255
+    if opaque.any():
+        cells[rows[opaque], :, cols[opaque]] = tiles[opaque]
+    if not opaque.all():
+        masked = ~opaque
+        src = tiles[masked].astype(np.uint32)
+        dst = cells[rows[masked], :, cols[masked]].astype(np.uint32)
+        mask = src[..., 3:]
+        cells[rows[masked], :, cols[masked]] = _div255(dst * (255 - mask) + src * mask)
+
+def composite_grid(canvas, placements, cell_height, cell_width):
+    """
+    Paste tiles in order onto a grid canvas, as successive PIL paste(tile, box, tile) calls.
+
+    Cell-sized tiles never overlap each other, so every run of them between two
+    irregular (e.g. enlarged) tiles is composited in a single vectorized pass.
+
+    Args:
+        canvas: Contiguous (rows * cell_height, cols * cell_width, 4) uint8 array
+        placements: (row, col, tile) in paste order
+    """
+    rows, cols = canvas.shape[0] // cell_height, canvas.shape[1] // cell_width
+    cells = canvas.reshape(rows, cell_height, cols, cell_width, 4)
+
+    pending = []
+    for row, col, tile in placements:
+        if tile is None:
+            continue
+        if tile.shape[:2] == (cell_height, cell_width) and row < rows and col < cols:
+            pending.append((row, col, tile))
+            continue
+        if pending:
+            _composite_cells(cells, pending)
+            pending = []
+        paste_with_alpha(canvas, tile, col * cell_width, row * cell_height)
+    if pending:
+        _composite_cells(cells, pending)
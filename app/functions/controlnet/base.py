@@ -1,8 +1,26 @@
 # app/functions/controlnet/base.py
 import os
+import threading
 from PIL import Image
 from ..base.logger import Logger
 
+# MiDaS model and transform per device, shared by every depth and normal map generator
+_midas_models = {}
+_midas_lock = threading.Lock()
+
+def load_midas_model(device):
+    """Load MiDaS_small and its transform once per device and reuse them afterwards."""
+    import torch  # Only the model-based generators need torch
+    with _midas_lock:
+        if device not in _midas_models:
+            model = torch.hub.load("intel-isl/MiDaS", "MiDaS_small")
+            model.eval()
+            if device != 'cpu':
+                model.to(device)
+            transform = torch.hub.load("intel-isl/MiDaS", "transforms").small_transform
+            _midas_models[device] = (model, transform)
+        return _midas_models[device]
+
 class BaseMapGenerator:
     """Base class for controlnet map generation."""
     
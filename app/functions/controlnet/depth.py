@@ -4,7 +4,7 @@ import cv2
 import torch
 import numpy as np
 from PIL import Image
-from .base import BaseMapGenerator
+from .base import BaseMapGenerator, load_midas_model
 
 class DepthMapGenerator(BaseMapGenerator):
     """Generates depth maps using MiDaS."""
@@ -55,18 +55,8 @@ class DepthMapGenerator(BaseMapGenerator):
             self.logger.log("Attempting to load MiDaS model...", module="DepthMap")
             self.logger.log(f"Using device: {self.device}", module="DepthMap")
             
-            self.logger.log("Loading MiDaS model from torch hub...", module="DepthMap")
-            self.model = torch.hub.load("intel-isl/MiDaS", "MiDaS_small")
-            
-            self.logger.log("Setting model to eval mode...", module="DepthMap")
-            self.model.eval()
-            
-            if self.device != 'cpu':
-                self.model.to(self.device)
-                self.logger.log(f"Model moved to device: {self.device}", module="DepthMap")
-                
-            self.logger.log("Loading MiDaS transforms...", module="DepthMap")
-            self.transform = torch.hub.load("intel-isl/MiDaS", "transforms").small_transform
+            self.logger.log("Loading MiDaS model and transforms (shared across generators)...", module="DepthMap")
+            self.model, self.transform = load_midas_model(self.device)
             
             self.logger.log("Successfully loaded MiDaS model and transforms", module="DepthMap")
             
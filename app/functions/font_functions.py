@@ -1,6 +1,12 @@
 import os
+import json
 import random
-from PIL import ImageFont
+import struct
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from itertools import accumulate
+from PIL import Image, ImageDraw, ImageFont
 
 # Known fun/decorative fonts to weight heavily
 WEIGHTED_FONTS = {
@@ -30,9 +36,173 @@ WEIGHTED_FONTS = {
     'showcard gothic': 4,
 }
 
+# Persistent font index, kept under the app root next to logs/
+FONT_INDEX_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                               'cache', 'font-index.json')
+FONT_INDEX_VERSION = 1
+
+SYSTEM_FONT_DIRS = [
+    # Windows font directories
+    r"C:\Windows\Fonts",
+    r"C:\WINNT\Fonts",
+    os.path.expanduser("~/AppData/Local/Microsoft/Windows/Fonts"),
+    
+    # Linux/Ubuntu font directories
+    "/usr/share/fonts",
+    "/usr/local/share/fonts",
+    os.path.expanduser("~/.fonts"),
+    "/usr/share/fonts/truetype",
+    
+    # macOS font directories
+    "/Library/Fonts",
+    "/System/Library/Fonts",
+    os.path.expanduser("~/Library/Fonts")
+]
+
+def font_weight(font_path):
+    """Get a font's selection weight from WEIGHTED_FONTS (1 if it isn't listed)."""
+    font_name = os.path.splitext(os.path.basename(font_path))[0].lower()
+    for weighted_name, weight in WEIGHTED_FONTS.items():
+        if weighted_name in font_name:
+            return weight
+    return 1
+
+def read_weight_class(font_path):
+    """Read usWeightClass (400 regular, 700 bold, ...) from a font's OS/2 table, or None."""
+    try:
+        with open(font_path, 'rb') as f:
+            num_tables = struct.unpack('>4sH', f.read(6))[1]
+            f.seek(12)
+            for _ in range(num_tables):
+                tag, _, offset, _ = struct.unpack('>4sIII', f.read(16))
+                if tag == b'OS/2':
+                    f.seek(offset + 4)
+                    return struct.unpack('>H', f.read(2))[0]
+    except (OSError, struct.error):
+        pass
+    return None
+
+def describe_font(font_path, mtime):
+    """Validate a font file and get its index entry."""
+    entry = {
+        'path': font_path,
+        'family': None,
+        'style': None,
+        'weight_class': None,
+        'valid': False,
+        'mtime': mtime,
+        'weight': font_weight(font_path)
+    }
+    try:
+        family, style = ImageFont.truetype(font_path, 12).getname()
+    except Exception:
+        return entry
+    entry.update(family=family, style=style, weight_class=read_weight_class(font_path), valid=True)
+    return entry
+
+class FontIndex:
+    """
+    Font files of a set of directories, persisted as JSON.
+
+    Each directory is stored with its mtime, font entries and subdirectories;
+    only directories whose mtime changed are listed again, and only new or
+    modified files in them are re-validated.
+    """
+    def __init__(self, index_path=FONT_INDEX_PATH):
+        self.index_path = index_path
+        self.directories = {}  # dir -> {'mtime', 'fonts', 'subdirs'}
+        self.changed = False
+
+    def load(self):
+        """Load the saved index, starting empty if it is missing, stale or unreadable."""
+        try:
+            with open(self.index_path, 'r') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return self
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not read font index {self.index_path}: {e}")
+            return self
+        if data.get('version') == FONT_INDEX_VERSION:
+            self.directories = data.get('directories', {})
+            if data.get('weighted_fonts') != WEIGHTED_FONTS:
+                # Weighting changed since the index was written; no need to re-validate
+                for directory in self.directories.values():
+                    for entry in directory['fonts']:
+                        entry['weight'] = font_weight(entry['path'])
+                self.changed = True
+        return self
+
+    def save(self):
+        """Write the index if anything changed since it was loaded."""
+        if not self.changed:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            temp_path = f"{self.index_path}.tmp"
+            with open(temp_path, 'w') as f:
+                json.dump({
+                    'version': FONT_INDEX_VERSION,
+                    'weighted_fonts': WEIGHTED_FONTS,
+                    'directories': self.directories
+                }, f)
+            os.replace(temp_path, self.index_path)
+            self.changed = False
+        except OSError as e:
+            print(f"Warning: Could not save font index {self.index_path}: {e}")
+
+    def _directory(self, path):
+        """Get a directory's entry, listing it again only if its mtime changed."""
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        cached = self.directories.get(path)
+        if cached is not None and cached['mtime'] == mtime:
+            return cached
+
+        print(f"Scanning: {path}")
+        old_fonts = {entry['path']: entry for entry in cached['fonts']} if cached else {}
+        fonts, subdirs = [], []
+        try:
+            with os.scandir(path) as it:
+                dir_entries = list(it)
+        except OSError:
+            dir_entries = []
+        for dir_entry in dir_entries:
+            try:
+                if dir_entry.is_dir():
+                    if not dir_entry.is_symlink():  # Like os.walk, don't follow linked directories
+                        subdirs.append(dir_entry.path)
+                elif dir_entry.name.lower().endswith(('.ttf', '.otf')):
+                    file_mtime = dir_entry.stat().st_mtime_ns
+                    old = old_fonts.get(dir_entry.path)
+                    fonts.append(old if old and old['mtime'] == file_mtime
+                                 else describe_font(dir_entry.path, file_mtime))
+            except OSError:
+                continue
+
+        entry = {'mtime': mtime, 'fonts': fonts, 'subdirs': subdirs}
+        self.directories[path] = entry
+        self.changed = True
+        return entry
+
+    def fonts(self, root):
+        """Get the valid font entries under root, in os.walk order."""
+        found = []
+        pending = [root]
+        while pending:
+            directory = self._directory(pending.pop())
+            if directory is None:
+                continue
+            found.extend(entry for entry in directory['fonts'] if entry['valid'])
+            pending.extend(reversed(directory['subdirs']))
+        return found
+
 class FontCache:
     _system_fonts = None
     _weighted_fonts = None
+    _selection_tables = {}  # project fonts -> (fonts, cumulative weights)
     
     @classmethod
     def get_system_fonts(cls):
@@ -43,72 +213,53 @@ class FontCache:
     
     @classmethod
     def _scan_system_fonts(cls):
-        """Scan common system locations for font files."""
-        system_font_dirs = [
-            # Windows font directories
-            r"C:\Windows\Fonts",
-            r"C:\WINNT\Fonts",
-            os.path.expanduser("~/AppData/Local/Microsoft/Windows/Fonts"),
-            
-            # Linux/Ubuntu font directories
-            "/usr/share/fonts",
-            "/usr/local/share/fonts",
-            os.path.expanduser("~/.fonts"),
-            "/usr/share/fonts/truetype",
-            
-            # macOS font directories
-            "/Library/Fonts",
-            "/System/Library/Fonts",
-            os.path.expanduser("~/Library/Fonts")
-        ]
-        
+        """Get the fonts in the system font directories from the persistent font index."""
+        index = FontIndex().load()
         font_files = []
         weighted_fonts = {}
         
-        for font_dir in system_font_dirs:
+        for font_dir in SYSTEM_FONT_DIRS:
             if os.path.exists(font_dir):
-                print(f"Scanning: {font_dir}")
-                for root, dirs, files in os.walk(font_dir):
-                    for file in files:
-                        if file.lower().endswith(('.ttf', '.otf')):
-                            full_path = os.path.join(root, file)
-                            try:
-                                # Validate font
-                                ImageFont.truetype(full_path, 12)
-                                font_files.append(full_path)
-                                
-                                # Check if it's a weighted font
-                                font_name = os.path.splitext(file)[0].lower()
-                                for weighted_name, weight in WEIGHTED_FONTS.items():
-                                    if weighted_name in font_name:
-                                        weighted_fonts[full_path] = weight
-                                        print(f"Found weighted font: {file} (weight: {weight})")
-                                        break
-                                
-                            except Exception:
-                                continue
+                for entry in index.fonts(font_dir):
+                    font_files.append(entry['path'])
+                    if entry['weight'] != 1:
+                        weighted_fonts[entry['path']] = entry['weight']
+        
+        # Drop directories that are no longer scanned or no longer exist
+        reachable = set()
+        pending = [d for d in SYSTEM_FONT_DIRS if d in index.directories]
+        while pending:
+            directory = pending.pop()
+            if directory not in reachable and directory in index.directories:
+                reachable.add(directory)
+                pending.extend(index.directories[directory]['subdirs'])
+        for directory in set(index.directories) - reachable:
+            del index.directories[directory]
+            index.changed = True
+        index.save()
         
         cls._weighted_fonts = weighted_fonts
+        cls._selection_tables = {}
         print(f"Found {len(font_files)} total fonts, {len(weighted_fonts)} weighted fonts")
         return font_files
 
+    @classmethod
+    def _selection_table(cls, project_fonts):
+        """Get the fonts to choose from and their cumulative weights, built once per font set."""
+        key = tuple(project_fonts)
+        if key not in cls._selection_tables:
+            fonts = cls.get_system_fonts() + list(project_fonts)
+            weights = [cls._weighted_fonts.get(font, 1) for font in fonts]
+            cls._selection_tables[key] = (fonts, list(accumulate(weights)))
+        return cls._selection_tables[key]
+
     @classmethod
     def select_random_font(cls, project_fonts):
         """Select a random font with weighting applied."""
-        all_fonts = cls.get_system_fonts() + project_fonts
-        weighted_choices = []
+        fonts, cum_weights = cls._selection_table(project_fonts)
         
-        for font in all_fonts:
-            # Get base weight
-            weight = cls._weighted_fonts.get(font, 1)
-            weighted_choices.append((font, weight))
-        
-        # Use random.choices with weights for selection
-        selected_font = random.choices(
-            [font for font, _ in weighted_choices],
-            weights=[weight for _, weight in weighted_choices],
-            k=1
-        )[0]
+        # Cumulative weights make each pick a single bisect
+        selected_font = random.choices(fonts, cum_weights=cum_weights, k=1)[0]
         
         font_name = os.path.basename(selected_font)
         weight = cls._weighted_fonts.get(selected_font, 1)
@@ -126,3 +277,60 @@ def get_all_fonts(project_fonts_dir):
         print(f"Found {len(project_fonts)} project fonts")
     
     return project_fonts
+
+@lru_cache(maxsize=128)
+def load_font(font_path, font_size):
+    """Open a font at a size, reusing the FreeType face for repeated (path, size) pairs."""
+    return ImageFont.truetype(font_path, font_size)
+
+class WordMaskCache:
+    """
+    Rasterized word coverage masks keyed by (word, font path, size).
+
+    A mask is drawn once in white on an 'L' image; drawing it with
+    ImageDraw.bitmap and the text colour gives the same pixels as
+    ImageDraw.text, so only new words or fonts go through FreeType.
+    """
+    DEFAULT_MAX_BYTES = 256 * 1024 ** 2  # 256 MB of masks
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._masks = OrderedDict()  # key -> (mask, offset)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.renders = 0
+
+    def get(self, word, font_path, font_size):
+        """Get (mask, (dx, dy)): the mask goes at the text position plus (dx, dy)."""
+        key = (word, font_path, font_size)
+        with self._lock:
+            if key in self._masks:
+                self._masks.move_to_end(key)
+                return self._masks[key]
+
+        font = load_font(font_path, font_size)
+        left, top, right, bottom = font.getbbox(word)
+        mask = Image.new('L', (max(1, right - left), max(1, bottom - top)), 0)
+        ImageDraw.Draw(mask).text((-left, -top), word, font=font, fill=255)
+
+        with self._lock:
+            self.renders += 1
+            self._masks[key] = (mask, (left, top))
+            self._bytes += mask.width * mask.height
+            while self._bytes > self.max_bytes and len(self._masks) > 1:
+                _, (evicted, _) = self._masks.popitem(last=False)
+                self._bytes -= evicted.width * evicted.height
+        return mask, (left, top)
+
+    def clear(self):
+        """Drop all cached masks."""
+        with self._lock:
+            self._masks.clear()
+            self._bytes = 0
+
+_word_masks = WordMaskCache()
+
+def draw_word(draw, position, word, font_path, font_size, fill):
+    """Draw a word like ImageDraw.text, from the cached mask of (word, font, size)."""
+    mask, (dx, dy) = _word_masks.get(word, font_path, font_size)
+    draw.bitmap((position[0] + dx, position[1] + dy), mask, fill=fill)
@@ -1,4 +1,5 @@
 import hashlib
+from .word_dictionary import get_word_dictionary
 
 def calculate_md5(image_data):
     """Calculate the MD5 hash of image data."""
@@ -18,15 +19,4 @@ def load_words(dictionary_path='meaningless-words/dictionary.txt'):
     Returns:
         list: List of individual words
     """
-    try:
-        with open(dictionary_path, 'r') as file:
-            # Split the content by whitespace and filter out empty strings
-            words = [word.strip() for word in file.read().split() if word.strip()]
-        if not words:
-            print("No words found in dictionary")
-            return ["DADA"]  # Fallback word
-        print(f"Loaded {len(words)} words from dictionary")  # Debug info
-        return words
-    except Exception as e:
-        print(f"Error loading dictionary: {e}")
-        return ["DADA"]  # Fallback word
+    return list(get_word_dictionary(dictionary_path))
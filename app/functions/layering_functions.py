@@ -1,11 +1,17 @@
-from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageEnhance
+from PIL import Image, ImageDraw, ImageEnhance
 import os
+import math
 import random
+from dataclasses import dataclass
 import numpy as np
-from scipy.ndimage import gaussian_filter
-import math
-from functions.helper_functions import load_words
-from functions.font_functions import FontCache, get_all_fonts
+from .word_dictionary import get_word_dictionary
+from .font_functions import FontCache, draw_word, get_all_fonts, load_font
+from .overlay.effects import apply_liquid_effect, apply_wave_distortion, pyramid_blur
+from .overlay.warp import WarpPipeline, rotate_point, rotated_box
+from .transform.scheduler import WorkScheduler
+
+# Room around the text for the widest effect (wave and mesh shift up to 50px)
+WORD_LAYER_MARGIN = 60
 
 def apply_chromatic_aberration(word_layer, offset_range=(-10, 10)):
     """Split RGB channels and offset them slightly."""
@@ -25,77 +31,22 @@ def apply_chromatic_aberration(word_layer, offset_range=(-10, 10)):
     
     return result
 
-def apply_wave_distortion(word_layer, amplitude=50, wavelength=100):
-    """Apply sinusoidal wave distortion to the text."""
-    width, height = word_layer.size
-    result = Image.new('RGBA', word_layer.size, (0, 0, 0, 0))
-    pixels = np.array(word_layer)
-    
-    for y in range(height):
-        for x in range(width):
-            offset_x = int(amplitude * math.sin(y / wavelength))
-            new_x = (x + offset_x) % width
-            result.putpixel((new_x, y), tuple(pixels[y, x]))
-    
-    return result
-
 def apply_mesh_warp(word_layer, grid_size=4, max_displacement=50):
     """Apply mesh-based warping."""
-    width, height = word_layer.size
-    
-    # Create mesh grid
-    x_points = np.linspace(0, width, grid_size)
-    y_points = np.linspace(0, height, grid_size)
-    
-    # Create displacement map
-    mesh = []
-    for y in range(grid_size - 1):
-        for x in range(grid_size - 1):
-            x1, y1 = x_points[x], y_points[y]
-            x2, y2 = x_points[x + 1], y_points[y + 1]
-            
-            dx1 = random.randint(-max_displacement, max_displacement)
-            dy1 = random.randint(-max_displacement, max_displacement)
-            dx2 = random.randint(-max_displacement, max_displacement)
-            dy2 = random.randint(-max_displacement, max_displacement)
-            
-            mesh.append((
-                x1, y1, x2, y2,
-                x1 + dx1, y1 + dy1, x2 + dx2, y2 + dy2
-            ))
-    
-    return word_layer.transform(word_layer.size, Image.MESH, mesh, Image.BILINEAR)
+    return WarpPipeline(word_layer.size).add_mesh_warp(grid_size, max_displacement).apply(word_layer)
 
 def create_glow_effect(word_layer, glow_size=10, glow_color=(255, 255, 255)):
     """Create a glowing effect behind the text."""
-    glow = word_layer.filter(ImageFilter.GaussianBlur(glow_size))
+    glow = pyramid_blur(word_layer, glow_size)
     enhancer = ImageEnhance.Brightness(glow)
     glow = enhancer.enhance(1.5)
     
-    glow_layer = Image.new('RGBA', word_layer.size, (0, 0, 0, 0))
-    glow_layer.paste(Image.new('RGB', word_layer.size, glow_color), (0, 0))
+    # Glow colour shaped by the blurred text, behind the text itself
+    glow_layer = Image.new('RGBA', word_layer.size, glow_color + (0,))
+    glow_layer.putalpha(glow.getchannel('A'))
     
     return Image.alpha_composite(glow_layer, word_layer)
 
-def apply_liquid_effect(word_layer, intensity=30):
-    """Apply a liquid-like distortion using Perlin noise."""
-    width, height = word_layer.size
-    
-    noise = np.random.rand(height, width) * intensity
-    smoothed_noise = gaussian_filter(noise, sigma=5)
-    
-    result = Image.new('RGBA', word_layer.size, (0, 0, 0, 0))
-    pixels = np.array(word_layer)
-    
-    for y in range(height):
-        for x in range(width):
-            offset = int(smoothed_noise[y, x])
-            new_x = (x + offset) % width
-            new_y = (y + offset) % height
-            result.putpixel((new_x, new_y), tuple(pixels[y, x]))
-    
-    return result
-
 def apply_echo_effect(word_layer, num_echoes=3, max_offset=10):
     """Create multiple offset copies of the text."""
     result = Image.new('RGBA', word_layer.size, (0, 0, 0, 0))
@@ -116,47 +67,68 @@ def apply_echo_effect(word_layer, num_echoes=3, max_offset=10):
     result = Image.alpha_composite(result, word_layer)
     return result
 
-def draw_single_word(base_image, fonts_dir, dictionary_path='meaningless-words/dictionary.txt'):
-    """Places a single word from the dictionary onto the image with random styling and effects."""
-    if base_image.mode != 'RGBA':
-        base_image = base_image.convert('RGBA')
-    
-    words = load_words(dictionary_path)
-    if not words:
-        print("No words loaded, using fallback")
-        return base_image
+# Geometric effects are recorded on a WarpPipeline instead of resampling the layer
+GEOMETRIC_EFFECTS = {
+    apply_chromatic_aberration: WarpPipeline.add_chromatic_aberration,
+    apply_wave_distortion: WarpPipeline.add_wave,
+    apply_mesh_warp: WarpPipeline.add_mesh_warp,
+    apply_liquid_effect: WarpPipeline.add_liquid
+}
 
-    canvas_width, canvas_height = base_image.size
-    
-    word = random.choice(words)
+WORD_EFFECTS = [
+    apply_chromatic_aberration,
+    apply_wave_distortion,
+    apply_mesh_warp,
+    create_glow_effect,
+    apply_liquid_effect,
+    apply_echo_effect
+]
+
+@dataclass
+class WordSpec:
+    """One word placement, planned up front so its layer can be rendered anywhere."""
+    word: str
+    font_path: str
+    font_size: int
+    color: tuple
+    box: tuple  # (left, top, right, bottom) of the word layer on the canvas
+    text_position: tuple  # Where the text is drawn inside the word layer
+    effects: list
+    rotation_angle: int
+    seed: int  # Seeds the effect parameters
+    canvas_size: tuple
+
+def plan_word(words, project_fonts, canvas_size, placement=None):
+    """
+    Draw one word's placement and styling from the global RNG, or None if its font fails to load.
+
+    With a PlacementEngine the word goes to the best of its candidate spots
+    (after rotation) and that spot is marked as taken; otherwise its
+    position is uniform random.
+    """
+    canvas_width, canvas_height = canvas_size
+
+    word = words.choice()
     print(f"Selected word: {word}")
     
-    # Get project fonts and select a weighted random font
-    project_fonts = get_all_fonts(fonts_dir)
     font_path = FontCache.select_random_font(project_fonts)
     font_name = os.path.basename(font_path)
     print(f"Using font: {font_name}")
 
-    word_layer = Image.new('RGBA', base_image.size, (0, 0, 0, 0))
-    draw = ImageDraw.Draw(word_layer)
-
     font_size = random.randint(int(min(canvas_width, canvas_height) * 0.025),
                              int(min(canvas_width, canvas_height) * 0.5))
     print(f"Font size: {font_size}")
     
     try:
-        font = ImageFont.truetype(font_path, font_size)
+        font = load_font(font_path, font_size)
     except Exception as e:
         print(f"Error loading font {font_name}: {e}")
-        return base_image
+        return None
 
-    bbox = draw.textbbox((0, 0), word, font=font)
+    bbox = font.getbbox(word)
     text_width = bbox[2] - bbox[0]
     text_height = bbox[3] - bbox[1]
     
-    text_x = random.randint(-text_width//2, canvas_width)
-    text_y = random.randint(-text_height//2, canvas_height)
-    
     text_color = (
         random.randint(0, 255),
         random.randint(0, 255),
@@ -165,27 +137,166 @@ def draw_single_word(base_image, fonts_dir, dictionary_path='meaningless-words/d
     )
     print(f"Text color: {text_color}")
     
-    draw.text((text_x, text_y), word, font=font, fill=text_color)
-    
-    effects_to_apply = random.sample([
-        apply_chromatic_aberration,
-        apply_wave_distortion,
-        apply_mesh_warp,
-        create_glow_effect,
-        apply_liquid_effect,
-        apply_echo_effect
-    ], random.randint(2, 4))
-    
-    print("Applying effects:", [e.__name__ for e in effects_to_apply])
-    
-    for effect in effects_to_apply:
-        word_layer = effect(word_layer)
+    effects = random.sample(WORD_EFFECTS, random.randint(2, 4))
+    print("Applying effects:", [e.__name__ for e in effects])
     
     rotation_angle = random.randint(0, 360)
     print(f"Rotation angle: {rotation_angle}")
-    word_layer = word_layer.rotate(rotation_angle, expand=False, resample=Image.BICUBIC)
+
+    if placement is None:
+        text_x = random.randint(-text_width//2, canvas_width)
+        text_y = random.randint(-text_height//2, canvas_height)
+    else:
+        # Pick where the rotated word should end up, then undo the rotation
+        # about the canvas centre to find where to draw it
+        theta = math.radians(rotation_angle)
+        cos_t, sin_t = abs(math.cos(theta)), abs(math.sin(theta))
+        footprint_width = math.ceil(text_width * cos_t + text_height * sin_t)
+        footprint_height = math.ceil(text_width * sin_t + text_height * cos_t)
+        x, y = placement.choose(footprint_width, footprint_height)
+        placement.occupy((x, y, x + footprint_width, y + footprint_height))
+        center_x, center_y = rotate_point((x + footprint_width / 2, y + footprint_height / 2),
+                                          -rotation_angle, (canvas_width / 2, canvas_height / 2))
+        text_x = round(center_x - (bbox[0] + bbox[2]) / 2)
+        text_y = round(center_y - (bbox[1] + bbox[3]) / 2)
     
-    result = Image.alpha_composite(base_image, word_layer)
+    # Render and process only the text box plus the effect margin, clipped to the canvas
+    left = min(max(0, text_x + bbox[0] - WORD_LAYER_MARGIN), canvas_width - 1)
+    top = min(max(0, text_y + bbox[1] - WORD_LAYER_MARGIN), canvas_height - 1)
+    right = max(min(canvas_width, text_x + bbox[2] + WORD_LAYER_MARGIN), left + 1)
+    bottom = max(min(canvas_height, text_y + bbox[3] + WORD_LAYER_MARGIN), top + 1)
+
+    return WordSpec(
+        word=word,
+        font_path=font_path,
+        font_size=font_size,
+        color=text_color,
+        box=(left, top, right, bottom),
+        text_position=(text_x - left, text_y - top),
+        effects=effects,
+        rotation_angle=rotation_angle,
+        seed=random.getrandbits(32),
+        canvas_size=canvas_size
+    )
+
+def render_word_layer(spec):
+    """
+    Render a planned word with its effects.
+
+    Returns (layer, (x, y)) to composite onto the canvas, or None if the
+    rotated word falls entirely outside it. Effect parameters come from
+    spec.seed, so the layer is the same in any process, and the caller's
+    RNG state is left untouched.
+    """
+    canvas_width, canvas_height = spec.canvas_size
+    left, top, right, bottom = spec.box
+
+    random_state, np_random_state = random.getstate(), np.random.get_state()
+    random.seed(spec.seed)
+    np.random.seed(spec.seed)
+    try:
+        word_layer = Image.new('RGBA', (right - left, bottom - top), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(word_layer)
+        draw_word(draw, spec.text_position, spec.word, spec.font_path, spec.font_size, spec.color)
+
+        # Colour effects run as their own passes; geometric ones and the rotation
+        # are composed into one displacement field and resampled once
+        warp = WarpPipeline(word_layer.size)
+        for effect in spec.effects:
+            if effect in GEOMETRIC_EFFECTS:
+                GEOMETRIC_EFFECTS[effect](warp)
+            else:
+                word_layer = effect(word_layer)
+
+        # Rotate about the canvas centre, as a canvas-sized layer would, and
+        # keep only the region the rotated layer covers
+        center = (canvas_width / 2 - left, canvas_height / 2 - top)
+        box = rotated_box(word_layer.size, spec.rotation_angle, center,
+                          bounds=(-left, -top, canvas_width - left, canvas_height - top))
+        if box is None:
+            return None
+        word_layer = warp.add_rotation(spec.rotation_angle, center).apply(word_layer, box)
+        return word_layer, (left + box[0], top + box[1])
+    finally:
+        random.setstate(random_state)
+        np.random.set_state(np_random_state)
+
+def draw_single_word(base_image, fonts_dir, dictionary_path='meaningless-words/dictionary.txt', placement=None):
+    """
+    Places a single word from the dictionary onto the image with random styling and effects.
+
+    Plans, renders and composites the word in this process before returning,
+    so calling it word_count times is the sequential reference draw_words
+    has to match for the same seed.
+    """
+    if base_image.mode != 'RGBA':
+        base_image = base_image.convert('RGBA')
+
+    words = get_word_dictionary(dictionary_path)
+    spec = plan_word(words, get_all_fonts(fonts_dir), base_image.size, placement)
+    result = base_image.copy()
+    if spec is not None:
+        layer = render_word_layer(spec)
+        if layer is not None:
+            result.alpha_composite(*layer)
     print("Word placement completed successfully")
+    return result
+
+def draw_words(base_image, word_count, fonts_dir, dictionary_path='meaningless-words/dictionary.txt',
+               backend='process', max_workers=None, placement=None):
+    """
+    Places word_count words onto a copy of the image.
+
+    Every word is planned first, in the same RNG order as placing them one by
+    one, then the word layers are rendered on a worker pool and composited in
+    placement order onto a single copy of the canvas. The result matches
+    calling draw_single_word word_count times for the same seed.
+
+    Args:
+        base_image: Image to place the words on
+        word_count: Number of words to place
+        fonts_dir: Project fonts directory
+        dictionary_path: Word list to draw from
+        backend: 'process' worker pool, or None to render in this process
+                 (effects reseed the global RNG, so threads can't share it)
+        max_workers: Worker count (default: CPU count - 1)
+        placement: Optional PlacementEngine steering words to quiet, free
+                   regions (shared across calls, it also avoids earlier words)
+    """
+    if backend not in ('process', None):
+        raise ValueError(f"Unknown backend '{backend}', expected 'process' or None")
+    if base_image.mode != 'RGBA':
+        base_image = base_image.convert('RGBA')
+    
+    words = get_word_dictionary(dictionary_path)
+
+    # Get project fonts to select weighted random fonts from
+    project_fonts = get_all_fonts(fonts_dir)
+    specs = []
+    for i in range(word_count):
+        print(f"Planning word {i+1} of {word_count}")
+        spec = plan_word(words, project_fonts, base_image.size, placement)
+        if spec is not None:
+            specs.append(spec)
+
+    work_items = [(spec,) for spec in specs]
+    if backend is None or len(work_items) <= 1:
+        layers = [render_word_layer(spec) for spec in specs]
+    else:
+        summary = WorkScheduler(backend, max_workers).run(
+            render_word_layer,
+            work_items,
+            desc="Rendering words",
+            unit="word"
+        )
+        # Results arrive in completion order; composite them in placement order
+        rendered = {id(item): layer for item, layer in zip(summary['completed_items'], summary['results'])}
+        layers = [rendered.get(id(item)) for item in work_items]
+
+    result = base_image.copy()
+    for layer in layers:
+        if layer is not None:
+            result.alpha_composite(*layer)
+    print(f"Placed {len(specs)} words")
     
     return result
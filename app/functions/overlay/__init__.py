@@ -1,3 +1,5 @@
 # overlay/__init__.py
 from .effects import *
-from .text import *
\ No newline at end of file
+from .text import *
+from .warp import *
+from .placement import *
\ No newline at end of file
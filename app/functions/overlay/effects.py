@@ -1,7 +1,8 @@
 # app/functions/overlay/effects.py
 import random
 import numpy as np
-from PIL import Image, ImageFilter, ImageEnhance
+import cv2
+from PIL import Image, ImageEnhance
 from scipy.ndimage import gaussian_filter
 import math
 
@@ -19,43 +20,75 @@ def apply_chromatic_aberration(word_layer, offset_range=(-10, 10)):
         a
     ))
 
+# Smallest blur sigma run on a pyramid level; smaller radii blur at full resolution
+PYRAMID_MIN_SIGMA = 4
+
+def pyramid_blur(layer, radius):
+    """
+    Gaussian blur of an RGBA layer, like ImageFilter.GaussianBlur(radius).
+
+    Large radii blur a downsampled copy (halved while the radius stays at
+    least PYRAMID_MIN_SIGMA there) and upsample it back, so the cost falls
+    with the radius instead of growing with it.
+    """
+    pixels = np.asarray(layer.convert('RGBA'))
+    height, width = pixels.shape[:2]
+    factor = 1
+    while radius / (factor * 2) >= PYRAMID_MIN_SIGMA and min(height, width) // (factor * 2) >= 8:
+        factor *= 2
+    if factor == 1:
+        return Image.fromarray(cv2.GaussianBlur(pixels, (0, 0), radius, borderType=cv2.BORDER_REPLICATE), 'RGBA')
+
+    small = cv2.resize(pixels, (max(1, round(width / factor)), max(1, round(height / factor))),
+                       interpolation=cv2.INTER_AREA)
+    # Area downsampling and linear upsampling blur too; take their variance off the target
+    variance = radius ** 2 - (factor ** 2 - 1) / 12 - factor ** 2 / 6
+    sigma = max(variance, (factor / 2) ** 2) ** 0.5 / factor
+    small = cv2.GaussianBlur(small, (0, 0), sigma, borderType=cv2.BORDER_REPLICATE)
+    return Image.fromarray(cv2.resize(small, (width, height), interpolation=cv2.INTER_LINEAR), 'RGBA')
+
 def create_glow_effect(layer, radius=10, brightness=1.5):
     """Create a glowing effect."""
-    glow = layer.filter(ImageFilter.GaussianBlur(radius))
+    glow = pyramid_blur(layer, radius)
     enhancer = ImageEnhance.Brightness(glow)
     return enhancer.enhance(brightness)
 
+def wave_offsets(height, amplitude=50, wavelength=100):
+    """Horizontal shift of each row for the wave distortion."""
+    return np.array([int(amplitude * math.sin(y / wavelength)) for y in range(height)])
+
 def apply_wave_distortion(layer, amplitude=50, wavelength=100):
     """Apply wave distortion effect."""
-    width, height = layer.size
-    result = Image.new('RGBA', layer.size, (0, 0, 0, 0))
-    pixels = np.array(layer)
-    
-    for y in range(height):
-        offset = int(amplitude * math.sin(y / wavelength))
-        for x in range(width):
-            new_x = (x + offset) % width
-            result.putpixel((new_x, y), tuple(pixels[y, x]))
-    
-    return result
+    pixels = np.asarray(layer.convert('RGBA'))
+    height, width = pixels.shape[:2]
+
+    # Each row is shifted right by its offset (wrapping), gathered in one pass
+    offsets = wave_offsets(height, amplitude, wavelength)
+    source_x = (np.arange(width)[None, :] - offsets[:, None]) % width
+    return Image.fromarray(pixels[np.arange(height)[:, None], source_x], 'RGBA')
+
+def liquid_offsets(height, width, intensity=30):
+    """Smoothed random displacement of each pixel for the liquid effect."""
+    noise = np.random.rand(height, width) * intensity
+    return gaussian_filter(noise, sigma=5)
 
 def apply_liquid_effect(layer, intensity=30):
     """Apply liquid-like distortion."""
-    width, height = layer.size
-    noise = np.random.rand(height, width) * intensity
-    smoothed = gaussian_filter(noise, sigma=5)
-    
-    result = Image.new('RGBA', layer.size, (0, 0, 0, 0))
-    pixels = np.array(layer)
-    
-    for y in range(height):
-        for x in range(width):
-            offset = int(smoothed[y, x])
-            new_x = (x + offset) % width
-            new_y = (y + offset) % height
-            result.putpixel((new_x, new_y), tuple(pixels[y, x]))
-    
-    return result
+    pixels = np.asarray(layer.convert('RGBA'))
+    height, width = pixels.shape[:2]
+    offsets = liquid_offsets(height, width, intensity).astype(np.intp)
+
+    # Forward-map every pixel diagonally by its offset; where several pixels land
+    # on the same spot the last one in row-major order wins, as with putpixel
+    y, x = np.indices((height, width))
+    targets = (((y + offsets) % height) * width + (x + offsets) % width).ravel()
+    winners = np.full(height * width, -1, dtype=np.intp)
+    np.maximum.at(winners, targets, np.arange(height * width))
+
+    result = np.zeros((height * width, 4), dtype=np.uint8)
+    landed = winners >= 0
+    result[landed] = pixels.reshape(-1, 4)[winners[landed]]
+    return Image.fromarray(result.reshape(height, width, 4), 'RGBA')
 
 def apply_echo_effect(word_layer, num_echoes=3, max_offset=10):
     """Create multiple offset copies of the text."""
@@ -79,30 +112,8 @@ def apply_echo_effect(word_layer, num_echoes=3, max_offset=10):
 
 def apply_mesh_warp(word_layer, grid_size=4, max_displacement=50):
     """Apply mesh-based warping."""
-    width, height = word_layer.size
-    
-    # Create mesh grid
-    x_points = np.linspace(0, width, grid_size)
-    y_points = np.linspace(0, height, grid_size)
-    
-    # Create displacement map
-    mesh = []
-    for y in range(grid_size - 1):
-        for x in range(grid_size - 1):
-            x1, y1 = x_points[x], y_points[y]
-            x2, y2 = x_points[x + 1], y_points[y + 1]
-            
-            dx1 = random.randint(-max_displacement, max_displacement)
-            dy1 = random.randint(-max_displacement, max_displacement)
-            dx2 = random.randint(-max_displacement, max_displacement)
-            dy2 = random.randint(-max_displacement, max_displacement)
-            
-            mesh.append((
-                x1, y1, x2, y2,
-                x1 + dx1, y1 + dy1, x2 + dx2, y2 + dy2
-            ))
-    
-    return word_layer.transform(word_layer.size, Image.MESH, mesh, Image.BILINEAR)
+    from .warp import WarpPipeline  # warp builds on this module's offsets
+    return WarpPipeline(word_layer.size).add_mesh_warp(grid_size, max_displacement).apply(word_layer)
 
 def apply_tint(image, color=None, opacity=0.3):
     """Apply a color tint overlay."""
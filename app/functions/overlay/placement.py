@@ -0,0 +1,130 @@
+# app/functions/overlay/placement.py
+import os
+import re
+import random
+import numpy as np
+import cv2
+
+CANNY_MAP_PATTERN = re.compile(r'^canny_(\d+)_(\d+)\.png$')
+
+def edge_map_from_image(image, max_size=512):
+    """Get a downsampled Canny edge map of an image (same thresholds as CannyMapGenerator)."""
+    # Box-reduce before converting so huge canvases are never copied at full size
+    factor = -(-max(image.size) // max_size)
+    if factor > 1:
+        image = image.reduce(factor)
+    gray = cv2.cvtColor(np.asarray(image.convert('RGB')), cv2.COLOR_RGB2GRAY)
+    return cv2.Canny(cv2.GaussianBlur(gray, (5, 5), 0), 30, 100)
+
+def load_canny_edge_map(canny_dir, tile_size=64):
+    """
+    Stitch a project's canny_<row>_<col>.png maps into one downsampled edge map.
+
+    Returns None if the directory has no canny maps.
+    """
+    tiles = {}
+    try:
+        for filename in os.listdir(canny_dir):
+            match = CANNY_MAP_PATTERN.match(filename)
+            if match:
+                tiles[(int(match.group(1)), int(match.group(2)))] = os.path.join(canny_dir, filename)
+    except FileNotFoundError:
+        return None
+    if not tiles:
+        return None
+
+    rows = max(row for row, _ in tiles) + 1
+    cols = max(col for _, col in tiles) + 1
+    edge_map = np.zeros((rows * tile_size, cols * tile_size), dtype=np.uint8)
+    for (row, col), path in tiles.items():
+        edges = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if edges is None:
+            print(f"Warning: Could not read canny map {path}")
+            continue
+        edge_map[row * tile_size:(row + 1) * tile_size, col * tile_size:(col + 1) * tile_size] = \
+            cv2.resize(edges, (tile_size, tile_size), interpolation=cv2.INTER_AREA)
+    return edge_map
+
+class PlacementEngine:
+    """
+    Picks low-detail, unoccupied spots for words on a canvas.
+
+    Edge density and the area covered by placed words live on a coarse grid
+    as summed-area tables, so scoring a candidate rectangle takes four
+    lookups per table whatever its size.
+    """
+    DEFAULT_GRID_SIZE = 256  # Cells along the longer canvas side
+    OVERLAP_PENALTY = 4.0  # Covering another word costs more than any amount of detail
+
+    def __init__(self, edge_map, canvas_size, grid_size=DEFAULT_GRID_SIZE, candidates=24):
+        self.canvas_width, self.canvas_height = canvas_size
+        self.candidates = candidates
+        scale = grid_size / max(canvas_size)
+        self.grid_width = max(1, round(self.canvas_width * scale))
+        self.grid_height = max(1, round(self.canvas_height * scale))
+        self.scale_x = self.grid_width / self.canvas_width
+        self.scale_y = self.grid_height / self.canvas_height
+
+        # Mean edge strength (0-1) of each cell, then its summed-area table
+        edges = cv2.resize(np.asarray(edge_map, dtype=np.float32) / 255,
+                           (self.grid_width, self.grid_height), interpolation=cv2.INTER_AREA)
+        self._edge_table = cv2.integral(edges, sdepth=cv2.CV_64F)
+        self._occupied = np.zeros((self.grid_height, self.grid_width), dtype=np.uint8)
+        self._occupancy_table = cv2.integral(self._occupied)
+
+    @classmethod
+    def from_image(cls, image, **kwargs):
+        """Build an engine from the canvas itself."""
+        return cls(edge_map_from_image(image), image.size, **kwargs)
+
+    @classmethod
+    def from_project(cls, project_path, canvas, **kwargs):
+        """Build an engine from the project's canny maps, or from the canvas if there are none."""
+        canny_dir = os.path.join(project_path, "sd-out", "controlnet-maps", "canny")
+        edge_map = load_canny_edge_map(canny_dir)
+        if edge_map is None:
+            print("No canny maps found, detecting edges on the canvas")
+            return cls.from_image(canvas, **kwargs)
+        print(f"Using canny maps from {canny_dir} for word placement")
+        return cls(edge_map, canvas.size, **kwargs)
+
+    def _cells(self, box):
+        """Convert a canvas (left, top, right, bottom) box to grid cells covering it."""
+        left, top, right, bottom = box
+        x0 = min(max(0, int(left * self.scale_x)), self.grid_width - 1)
+        y0 = min(max(0, int(top * self.scale_y)), self.grid_height - 1)
+        x1 = max(min(self.grid_width, int(np.ceil(right * self.scale_x))), x0 + 1)
+        y1 = max(min(self.grid_height, int(np.ceil(bottom * self.scale_y))), y0 + 1)
+        return x0, y0, x1, y1
+
+    @staticmethod
+    def _rect_sum(table, x0, y0, x1, y1):
+        """Sum of a grid rectangle from its summed-area table."""
+        return table[y1, x1] - table[y0, x1] - table[y1, x0] + table[y0, x0]
+
+    def score(self, box):
+        """Lower is better: mean edge density plus a penalty for covering placed words."""
+        x0, y0, x1, y1 = self._cells(box)
+        area = (x1 - x0) * (y1 - y0)
+        edges = self._rect_sum(self._edge_table, x0, y0, x1, y1)
+        occupied = self._rect_sum(self._occupancy_table, x0, y0, x1, y1)
+        return (edges + self.OVERLAP_PENALTY * occupied) / area
+
+    def choose(self, width, height):
+        """Get the (left, top) of the best of several random width x height spots."""
+        max_x = self.canvas_width - width
+        max_y = self.canvas_height - height
+        best, best_score = None, None
+        for _ in range(self.candidates):
+            x = random.randint(min(0, max_x), max(0, max_x))
+            y = random.randint(min(0, max_y), max(0, max_y))
+            score = self.score((x, y, x + width, y + height))
+            if best_score is None or score < best_score:
+                best, best_score = (x, y), score
+        return best
+
+    def occupy(self, box):
+        """Mark a canvas box as taken by a word."""
+        x0, y0, x1, y1 = self._cells(box)
+        self._occupied[y0:y1, x0:x1] = 1
+        self._occupancy_table = cv2.integral(self._occupied)
@@ -1,7 +1,9 @@
 # app/functions/overlay/text.py
 import os
 import random
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw
+from ..font_functions import draw_word, load_font
+from ..word_dictionary import get_word_dictionary
 
 def draw_single_word(base_image, fonts_dir, dictionary_path='meaningless-words/dictionary.txt'):
     """Places a single word from the dictionary onto the image with random styling."""
@@ -9,22 +11,14 @@ def draw_single_word(base_image, fonts_dir, dictionary_path='meaningless-words/d
     if base_image.mode != 'RGBA':
         base_image = base_image.convert('RGBA')
     
-    # Load dictionary words
-    try:
-        with open(dictionary_path, 'r') as file:
-            words = [word.strip() for word in file if word.strip()]
-        if not words:
-            print("No words found in dictionary")
-            return base_image
-    except Exception as e:
-        print(f"Error loading dictionary: {e}")
-        return base_image
+    # Shared, memory-mapped dictionary words
+    words = get_word_dictionary(dictionary_path)
 
     # Get canvas dimensions
     canvas_width, canvas_height = base_image.size
     
     # Select random word
-    word = random.choice(words)
+    word = words.choice()
     print(f"Selected word: {word}")  # Debug info
     
     # Get available fonts
@@ -50,7 +44,7 @@ def draw_single_word(base_image, fonts_dir, dictionary_path='meaningless-words/d
     # Random styling with reasonable font size
     font_size = random.randint(int(max_dimension * 0.05), int(max_dimension * 0.15))
     try:
-        font = ImageFont.truetype(font_path, font_size)
+        font = load_font(font_path, font_size)
         print(f"Font size: {font_size}")  # Debug info
     except Exception as e:
         print(f"Error loading font: {e}")
@@ -75,7 +69,7 @@ def draw_single_word(base_image, fonts_dir, dictionary_path='meaningless-words/d
     print(f"Text color: {text_color}")  # Debug info
     
     # Draw text
-    draw.text((text_x, text_y), word, font=font, fill=text_color)
+    draw_word(draw, (text_x, text_y), word, font_path, font_size, text_color)
     
     # Random rotation
     rotation_angle = random.randint(0, 360)
@@ -0,0 +1,179 @@
+# app/functions/overlay/warp.py
+import math
+import random
+import numpy as np
+import cv2
+from PIL import Image
+from .effects import liquid_offsets
+
+class WarpPipeline:
+    """
+    Geometric layer effects composed into a single resampling pass.
+
+    Every add_* call draws the same random parameters as the matching
+    standalone effect but only records a backward map (output pixel ->
+    source pixel). apply() chains the maps and remaps the layer once per
+    distinct channel map, instead of building a new image per effect.
+    """
+    def __init__(self, size):
+        self.width, self.height = size
+        self.stages = []  # (channels or None for all, map function), in the order effects apply
+
+    def add_translation(self, offset_x, offset_y, channels=None):
+        """Shift the given channels (default: all) so output (x, y) reads (x + dx, y + dy)."""
+        self.stages.append((channels, lambda x, y: (x + offset_x, y + offset_y)))
+        return self
+
+    def add_chromatic_aberration(self, offset_range=(-10, 10)):
+        """Offset the red and blue channels, like apply_chromatic_aberration."""
+        r_offset = (random.randint(*offset_range), random.randint(*offset_range))
+        b_offset = (random.randint(*offset_range), random.randint(*offset_range))
+        self.add_translation(*r_offset, channels=(0,))
+        return self.add_translation(*b_offset, channels=(2,))
+
+    def add_wave(self, amplitude=50, wavelength=100):
+        """Shift each row sideways along a sine wave, wrapping, like apply_wave_distortion."""
+        width = self.width
+
+        def wave(x, y):
+            return (x - np.trunc(amplitude * np.sin(y / wavelength))) % width, y
+
+        self.stages.append((None, wave))
+        return self
+
+    def add_liquid(self, intensity=30):
+        """
+        Displace pixels diagonally by smoothed noise, like apply_liquid_effect.
+
+        The standalone effect scatters pixels forward; here the same noise is
+        read as a backward offset, which leaves no holes and needs no collisions.
+        """
+        width, height = self.width, self.height
+        offsets = liquid_offsets(height, width, intensity).astype(np.float32)
+
+        def liquid(x, y):
+            offset = cv2.remap(offsets, x, y, cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+            return (x - offset) % width, (y - offset) % height
+
+        self.stages.append((None, liquid))
+        return self
+
+    def add_mesh_warp(self, grid_size=4, max_displacement=50):
+        """
+        Drag mesh points by random amounts, like apply_mesh_warp.
+
+        Each cell moves its top-left and bottom-right corners; corners shared
+        by several cells are averaged and the displacement is interpolated
+        bilinearly between them.
+        """
+        displacement = np.zeros((grid_size, grid_size, 2), dtype=np.float32)
+        counts = np.zeros((grid_size, grid_size, 1), dtype=np.float32)
+        for y in range(grid_size - 1):
+            for x in range(grid_size - 1):
+                dx1 = random.randint(-max_displacement, max_displacement)
+                dy1 = random.randint(-max_displacement, max_displacement)
+                dx2 = random.randint(-max_displacement, max_displacement)
+                dy2 = random.randint(-max_displacement, max_displacement)
+                displacement[y, x] += (dx1, dy1)
+                displacement[y + 1, x + 1] += (dx2, dy2)
+                counts[y, x] += 1
+                counts[y + 1, x + 1] += 1
+        displacement /= np.maximum(counts, 1)
+
+        scale_x = (grid_size - 1) / max(self.width, 1)
+        scale_y = (grid_size - 1) / max(self.height, 1)
+
+        def mesh(x, y):
+            d = cv2.remap(displacement, x * scale_x, y * scale_y, cv2.INTER_LINEAR,
+                          borderMode=cv2.BORDER_REPLICATE)
+            return x + d[..., 0], y + d[..., 1]
+
+        self.stages.append((None, mesh))
+        return self
+
+    def add_rotation(self, angle, center=None):
+        """Rotate counter-clockwise about center (default: the layer centre), like Image.rotate."""
+        theta = math.radians(angle)
+        cos_t, sin_t = math.cos(theta), math.sin(theta)
+        cx, cy = center if center is not None else (self.width / 2, self.height / 2)
+
+        def rotation(x, y):
+            px, py = x + 0.5 - cx, y + 0.5 - cy
+            return cos_t * px - sin_t * py + cx - 0.5, sin_t * px + cos_t * py + cy - 0.5
+
+        self.stages.append((None, rotation))
+        return self
+
+    def source_maps(self, box=None):
+        """
+        Compose the stages into one (map_x, map_y) pair per RGBA channel.
+
+        box is the (left, top, right, bottom) output region in layer
+        coordinates, which may extend past the layer (default: the layer).
+        Channels that no per-channel stage touched share the same arrays.
+        """
+        left, top, right, bottom = box or (0, 0, self.width, self.height)
+        y, x = np.indices((bottom - top, right - left), dtype=np.float32)
+        x += left
+        y += top
+        maps = [(x, y)] * 4
+
+        # The last effect applied is the first lookup from output back to source
+        for channels, stage in reversed(self.stages):
+            targets = range(4) if channels is None else channels
+            done = {}
+            for channel in targets:
+                key = id(maps[channel][0])
+                if key not in done:
+                    done[key] = tuple(np.asarray(m, dtype=np.float32) for m in stage(*maps[channel]))
+                maps[channel] = done[key]
+        return maps
+
+    def apply(self, layer, box=None):
+        """Resample an RGBA layer through every recorded stage into box (default: the layer)."""
+        if not self.stages and box is None:
+            return layer
+        left, top, right, bottom = box or (0, 0, self.width, self.height)
+        pixels = np.asarray(layer.convert('RGBA'))
+        result = np.empty((bottom - top, right - left, 4), dtype=np.uint8)
+
+        # One remap per group of channels sharing a map
+        groups = {}
+        for channel, channel_maps in enumerate(self.source_maps(box)):
+            groups.setdefault(id(channel_maps[0]), (channel_maps, []))[1].append(channel)
+        for (map_x, map_y), channels in groups.values():
+            source = np.ascontiguousarray(pixels[..., channels])
+            warped = cv2.remap(source, map_x, map_y, cv2.INTER_CUBIC,
+                               borderMode=cv2.BORDER_CONSTANT, borderValue=0)
+            result[..., channels] = warped.reshape(result.shape[0], result.shape[1], len(channels))
+        return Image.fromarray(result, 'RGBA')
+
+def rotate_point(point, angle, center):
+    """Move a point the way Image.rotate(angle) about center moves the pixel under it."""
+    theta = math.radians(angle)
+    cos_t, sin_t = math.cos(theta), math.sin(theta)
+    px, py = point[0] - center[0], point[1] - center[1]
+    return cos_t * px + sin_t * py + center[0], -sin_t * px + cos_t * py + center[1]
+
+def rotated_box(size, angle, center, bounds=None):
+    """
+    Get the integer (left, top, right, bottom) box covering a size (width,
+    height) layer after rotating it by angle about center, clipped to bounds.
+
+    Returns None when nothing of the rotated layer falls inside bounds.
+    """
+    width, height = size
+    corners = [rotate_point(corner, angle, center)
+               for corner in ((0, 0), (width, 0), (0, height), (width, height))]
+    xs = [x for x, _ in corners]
+    ys = [y for _, y in corners]
+    # One extra pixel each side for the bicubic kernel
+    left, top = math.floor(min(xs)) - 1, math.floor(min(ys)) - 1
+    right, bottom = math.ceil(max(xs)) + 1, math.ceil(max(ys)) + 1
+
+    if bounds is not None:
+        left, top = max(left, bounds[0]), max(top, bounds[1])
+        right, bottom = min(right, bounds[2]), min(bottom, bounds[3])
+    if right <= left or bottom <= top:
+        return None
+    return left, top, right, bottom
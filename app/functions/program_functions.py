@@ -1,9 +1,30 @@
 import os
+import json
 import random
 from datetime import datetime
+import numpy as np
 from PIL import Image
 from ..functions.helper_functions import calculate_md5
-from ..functions.compositing_functions import apply_random_effect, apply_tint
+from ..functions.layering_functions import draw_words
+from ..functions.overlay.placement import PlacementEngine
+from ..functions.batch_effects import composite_grid, plan_random_effect, render_effect_plans
+from ..functions.tile_pool import get_tile_pool
+from ..functions.base.tile_store import invalidate_tile_sources
+from ..functions.transform.tile_catalog import TileCatalog
+from ..functions.base.project_config import (
+    DEFAULT_SUBDIVISION_SCALES, load_project_config, parse_subdivision_scales, get_subdivision_scales
+)
+
+# Project discovery: how deep to look under the projects directory, which
+# project subdirectories never hold projects, and where listings are cached
+PROJECT_SCAN_DEPTH = 4
+PROJECT_SKIP_DIRS = {
+    "base-image", "base-tiles", "sd-out", "rendered-tiles", "subdivided-tiles",
+    "normalized-tiles", "collage-out", "profiles", "thumbnails", "__pycache__"
+}
+PROJECT_REGISTRY_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                                     'cache', 'project-registry.json')
+PROJECT_REGISTRY_VERSION = 1
 
 def create_new_project(base_dir):
     """Create a new project with required directories."""
@@ -32,7 +53,8 @@ def create_new_project(base_dir):
         'project': {
             'name': project_name,
             'upscale_size': 1024,
-            'base_tile_size': 600
+            'base_tile_size': 600,
+            'subdivision_scales': ','.join(str(g) for g in DEFAULT_SUBDIVISION_SCALES)
         },
         'upscaler': {
             'type': 'ultramix',  # default upscaler
@@ -64,8 +86,39 @@ def create_new_project(base_dir):
     
     return project_path
 
-def scan_for_projects(base_dir):
-    """Find all project directories."""
+def _load_project_registry():
+    """Load the saved project registry, or an empty one."""
+    try:
+        with open(PROJECT_REGISTRY_PATH, 'r') as f:
+            registry = json.load(f)
+        if registry.get('version') == PROJECT_REGISTRY_VERSION:
+            return registry
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        print(f"Warning: Could not read project registry {PROJECT_REGISTRY_PATH}: {e}")
+    return {'version': PROJECT_REGISTRY_VERSION, 'roots': {}}
+
+def _save_project_registry(registry):
+    """Write the project registry, keeping the old one if that fails."""
+    try:
+        os.makedirs(os.path.dirname(PROJECT_REGISTRY_PATH), exist_ok=True)
+        temp_path = f"{PROJECT_REGISTRY_PATH}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(registry, f)
+        os.replace(temp_path, PROJECT_REGISTRY_PATH)
+    except OSError as e:
+        print(f"Warning: Could not save project registry {PROJECT_REGISTRY_PATH}: {e}")
+
+def scan_for_projects(base_dir, max_depth=PROJECT_SCAN_DEPTH):
+    """
+    Find all project directories.
+
+    The scan stops at project roots, skips the tile and output directories
+    listed in PROJECT_SKIP_DIRS and goes at most max_depth levels below
+    base_dir. Directory listings are kept in a registry and only re-read
+    when a directory's mtime changes, so repeat scans are a few stats.
+    """
     if not os.path.exists(base_dir):
         print(f"Projects directory not found: {base_dir}")
         return []
@@ -73,48 +126,57 @@ def scan_for_projects(base_dir):
     projects = []
     print(f"Scanning for projects in: {base_dir}")
     
+    registry = _load_project_registry()
+    base_key = os.path.abspath(base_dir)
+    known = registry['roots'].get(base_key, {})
+    directories = {}  # relative path -> {'mtime', 'project', 'subdirs'}
+    changed = False
+    
     try:
-        for root, dirs, files in os.walk(base_dir):
-            if "paneful.project" in files:
-                projects.append(root)
-                #print(f"Found project: {os.path.basename(root)}")
+        pending = [('', 0)]
+        while pending:
+            relative_path, depth = pending.pop()
+            path = os.path.join(base_dir, relative_path) if relative_path else base_dir
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            
+            entry = known.get(relative_path)
+            if entry is None or entry['mtime'] != mtime:
+                with os.scandir(path) as it:
+                    dir_entries = list(it)
+                names = {e.name for e in dir_entries}
+                entry = {
+                    'mtime': mtime,
+                    'project': "paneful.project" in names,
+                    'subdirs': [e.name for e in dir_entries
+                                if e.is_dir(follow_symlinks=False) and e.name not in PROJECT_SKIP_DIRS]
+                }
+                changed = True
+            directories[relative_path] = entry
+            
+            if entry['project']:
+                projects.append(path)
+                #print(f"Found project: {os.path.basename(path)}")
+                continue  # Projects don't contain other projects
+            if depth < max_depth:
+                pending.extend((os.path.join(relative_path, name), depth + 1)
+                               for name in reversed(entry['subdirs']))
     except Exception as e:
         print(f"Error scanning projects: {e}")
         return []
+    
+    # Directories no longer reached drop out of the registry
+    if changed or set(directories) != set(known):
+        registry['roots'][base_key] = directories
+        _save_project_registry(registry)
         
     if not projects:
         print("No projects found. Create a new project to get started.")
         
     return projects
 
-def load_project_config(project_path):
-    """Load project-specific configuration."""
-    config = {
-        'name': os.path.basename(project_path),
-        'upscale_size': 1024,
-        'base_tile_size': 600
-    }
-    
-    try:
-        project_config = os.path.join(project_path, 'paneful.project')
-        if os.path.exists(project_config):
-            current_section = None
-            with open(project_config, 'r') as f:
-                for line in f:
-                    line = line.strip()
-                    if line.startswith('[') and line.endswith(']'):
-                        current_section = line[1:-1]
-                    elif line and not line.startswith('#') and current_section == 'project':
-                        key, value = line.split('=')
-                        if key in ['upscale_size', 'base_tile_size']:
-                            config[key] = int(value)
-                        else:
-                            config[key] = value
-    except Exception as e:
-        print(f"Error loading project config: {e}")
-    
-    return config
-
 def reset_project_config(project_path):
     """Reset project configuration file to defaults."""
     project_name = os.path.basename(project_path)
@@ -122,7 +184,8 @@ def reset_project_config(project_path):
         'project': {
             'name': project_name,
             'upscale_size': 1024,
-            'base_tile_size': 600
+            'base_tile_size': 600,
+            'subdivision_scales': ','.join(str(g) for g in DEFAULT_SUBDIVISION_SCALES)
         }
     }
     
@@ -140,13 +203,14 @@ def reset_project_config(project_path):
         print(f"Error resetting project config: {e}")
         return False
 
-def run_dadaism(project_name, rendered_tiles_dir, collage_out_dir, fonts_dir, run_number=1, return_image=False):
+def run_dadaism(project_name, rendered_tiles_dir, collage_out_dir, fonts_dir, run_number=1, return_image=False,
+                tile_pool=None):
     """Creates a Dadaist collage by randomly selecting tiles."""
     print(f"Starting Dadaist collage for project: {project_name}")
 
-    # Get list of subdirectories
-    subdirectories = [d for d in os.listdir(rendered_tiles_dir) 
-                     if os.path.isdir(os.path.join(rendered_tiles_dir, d))]
+    # Listing and decoded tiles are shared across runs through the tile pool
+    tile_pool = tile_pool or get_tile_pool(rendered_tiles_dir)
+    subdirectories = tile_pool.variants()
     if not subdirectories:
         print("No subdirectories found in rendered_tiles_dir.")
         return None
@@ -156,41 +220,42 @@ def run_dadaism(project_name, rendered_tiles_dir, collage_out_dir, fonts_dir, ru
     base_subdir_path = os.path.join(rendered_tiles_dir, base_subdir)
     print(f"Selected base subdirectory: {base_subdir_path}")
 
-    # Collect all available tiles from all subdirectories
-    all_tiles = []
-    for subdir in subdirectories:
-        subdir_path = os.path.join(rendered_tiles_dir, subdir)
-        for file in os.listdir(subdir_path):
-            if file.endswith('.png'):
-                all_tiles.append(os.path.join(subdir_path, file))
+    all_tiles = tile_pool.paths()
 
-    pieces = sorted(os.listdir(base_subdir_path))
+    # Grid geometry comes from the tile catalog; rescan so tiles rendered since
+    # the last listing in this process (run-jobs, watch) are seen
+    invalidate_tile_sources()
+    catalog = TileCatalog(rendered_tiles_dir)
+    pieces = sorted(catalog.parent_tiles(base_subdir).items(), key=lambda item: item[1])
     if not pieces:
         print(f"No pieces found in '{base_subdir_path}'.")
         return None
+    rows, cols = catalog.grid_dimensions(base_subdir)
 
-    # Get sample piece to determine size
-    sample_piece = pieces[0]
-    sample_img = Image.open(os.path.join(base_subdir_path, sample_piece)).convert('RGBA')
-    tile_size = sample_img.size[0]  # Assuming square tiles
-
-    # Create canvas for the reconstructed image
-    reconstructed_image = Image.new('RGBA', (10 * tile_size, 10 * tile_size), (255, 255, 255, 255))
+    # Get sample piece to determine cell size
+    tile_height, tile_width = tile_pool.shape(os.path.join(base_subdir_path, pieces[0][1]))
 
-    # Place all tiles first
-    for piece in pieces:
+    # Plan every tile's effect first (same random sequence as apply_random_effect)
+    plans = []
+    for (row, col), piece in pieces:
         try:
-            row, col = parse_filename(piece)
-            if row is None or col is None:
-                continue
-
-            tile = Image.open(os.path.join(base_subdir_path, piece)).convert('RGBA')
-            modified_tile = apply_random_effect(tile, (row, col), tile_size, all_tiles)
-            reconstructed_image.paste(modified_tile, (col * tile_size, row * tile_size), modified_tile)
-
+            piece_path = os.path.join(base_subdir_path, piece)
+            tile_pool.shape(piece_path)  # Unreadable pieces are skipped before drawing any random numbers
+            plans.append(plan_random_effect(
+                piece_path, (row, col), (tile_width, tile_height), all_tiles, tile_pool.shape
+            ))
         except Exception as e:
             print(f"Error processing piece '{piece}': {e}")
 
+    # Render effects on worker threads, then composite in the original paste order
+    canvas = np.full((rows * tile_height, cols * tile_width, 4), 255, dtype=np.uint8)
+    placements = [
+        (plan.position[0], plan.position[1], tile)
+        for plan, tile in zip(plans, render_effect_plans(plans, tile_pool.load))
+    ]
+    composite_grid(canvas, placements, tile_height, tile_width)
+    reconstructed_image = Image.fromarray(canvas, 'RGBA')
+
     if return_image:
         return reconstructed_image
     
@@ -270,9 +335,8 @@ def create_dadaist_collage_with_words(project_path, word_count=10, dictionary_pa
 
     # Add words
     print(f"Applying {word_count} words...")
-    for i in range(word_count):
-        print(f"Placing word {i+1} of {word_count}")
-        #result = draw_single_word(result, fonts_dir, dictionary_path)
+    placement = PlacementEngine.from_project(project_path, result)
+    result = draw_words(result, word_count, fonts_dir, dictionary_path, placement=placement)
 
     # Save the result
     os.makedirs(collage_out_dir, exist_ok=True)
@@ -1,8 +1,7 @@
 import numpy as np
-from PIL import Image, ImageDraw, ImageFilter, ImageEnhance
+from PIL import Image, ImageDraw, ImageEnhance
 import random
-from scipy.ndimage import gaussian_filter
-import math
+from .overlay.effects import apply_liquid_effect, apply_wave_distortion, pyramid_blur
 
 def apply_chromatic_aberration(word_layer, offset_range=(-10, 10)):
     """Split RGB channels and offset them slightly."""
@@ -22,23 +21,6 @@ def apply_chromatic_aberration(word_layer, offset_range=(-10, 10)):
     
     return result
 
-def apply_wave_distortion(word_layer, amplitude=50, wavelength=100):
-    """Apply sinusoidal wave distortion to the text."""
-    width, height = word_layer.size
-    result = Image.new('RGBA', word_layer.size, (0, 0, 0, 0))
-    pixels = np.array(word_layer)
-    
-    for y in range(height):
-        for x in range(width):
-            # Calculate displacement
-            offset_x = int(amplitude * math.sin(y / wavelength))
-            new_x = (x + offset_x) % width
-            
-            # Copy pixel to new position
-            result.putpixel((new_x, y), tuple(pixels[y, x]))
-    
-    return result
-
 def apply_mesh_warp(word_layer, grid_size=4, max_displacement=50):
     """Apply mesh-based warping."""
     width, height = word_layer.size
@@ -72,40 +54,18 @@ def apply_mesh_warp(word_layer, grid_size=4, max_displacement=50):
 def create_glow_effect(word_layer, glow_size=10, glow_color=(255, 255, 255)):
     """Create a glowing effect behind the text."""
     # Create glow layer
-    glow = word_layer.filter(ImageFilter.GaussianBlur(glow_size))
+    glow = pyramid_blur(word_layer, glow_size)
     enhancer = ImageEnhance.Brightness(glow)
     glow = enhancer.enhance(1.5)
     
-    # Colorize the glow
-    glow_layer = Image.new('RGBA', word_layer.size, (0, 0, 0, 0))
-    glow_layer.paste(Image.new('RGB', word_layer.size, glow_color), (0, 0))
+    # Colorize the glow, shaped by the blurred text
+    glow_layer = Image.new('RGBA', word_layer.size, glow_color + (0,))
+    glow_layer.putalpha(glow.getchannel('A'))
     
     # Combine with original
     result = Image.alpha_composite(glow_layer, word_layer)
     return result
 
-def apply_liquid_effect(word_layer, intensity=30):
-    """Apply a liquid-like distortion using Perlin noise."""
-    width, height = word_layer.size
-    
-    # Create noise array
-    noise = np.random.rand(height, width) * intensity
-    smoothed_noise = gaussian_filter(noise, sigma=5)
-    
-    # Apply displacement
-    result = Image.new('RGBA', word_layer.size, (0, 0, 0, 0))
-    pixels = np.array(word_layer)
-    
-    for y in range(height):
-        for x in range(width):
-            offset = int(smoothed_noise[y, x])
-            new_x = (x + offset) % width
-            new_y = (y + offset) % height
-            
-            result.putpixel((new_x, new_y), tuple(pixels[y, x]))
-    
-    return result
-
 def apply_echo_effect(word_layer, num_echoes=3, max_offset=10):
     """Create multiple offset copies of the text."""
     result = Image.new('RGBA', word_layer.size, (0, 0, 0, 0))
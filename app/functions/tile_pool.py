@@ -0,0 +1,164 @@
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from .batch_effects import load_rgba, read_tile_shape
+
+class TilePool:
+    """
+    Decoded RGBA tiles of every rendered variant, shared across Dadaist runs.
+
+    The variant listing is rebuilt only when a directory's mtime changes, and
+    decoded tiles are kept in an LRU cache bounded by max_bytes. Cached
+    tiles and shapes are keyed on the file's mtime and size, so a tile
+    re-rendered under the same name is decoded again.
+    """
+    DEFAULT_MAX_BYTES = 2 * 1024 ** 3  # 2 GB of decoded tiles
+    # Directory mtimes this close to the listing time may hide later changes
+    # on filesystems with coarse timestamps, so they are not trusted
+    LISTING_RACE_NS = 2 * 10 ** 9
+
+    def __init__(self, rendered_tiles_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.rendered_tiles_dir = rendered_tiles_dir
+        self.max_bytes = max_bytes
+        self._listing_key = None
+        self._listed_at = 0
+        self._variants = []
+        self._paths = []
+        self._cache = OrderedDict()  # path -> ((mtime_ns, size), read-only ndarray)
+        self._cache_bytes = 0
+        self._shapes = {}  # path -> ((mtime_ns, size), (height, width))
+        self._loading = {}  # path -> Event set once its decode finishes
+        self._lock = threading.Lock()
+        self.decodes = 0
+
+    def _current_listing_key(self):
+        """Get the mtimes identifying the current directory listing."""
+        key = [os.stat(self.rendered_tiles_dir).st_mtime_ns]
+        for variant in self._variants:
+            try:
+                key.append(os.stat(os.path.join(self.rendered_tiles_dir, variant)).st_mtime_ns)
+            except FileNotFoundError:
+                key.append(None)
+        return tuple(key)
+
+    def _listing_is_current(self):
+        """Check whether the cached listing can still be trusted."""
+        if self._listing_key is None:
+            return False
+        key = self._current_listing_key()
+        if key != self._listing_key:
+            return False
+        return all(mtime is not None and mtime < self._listed_at - self.LISTING_RACE_NS for mtime in key)
+
+    def refresh(self):
+        """Re-list variants and tiles if anything was added, removed or renamed."""
+        if self._listing_is_current():
+            return
+
+        # Same order as os.listdir, so seeded runs pick the same tiles as before
+        self._listed_at = time.time_ns()
+        self._variants = [d for d in os.listdir(self.rendered_tiles_dir)
+                          if os.path.isdir(os.path.join(self.rendered_tiles_dir, d))]
+        self._paths = []
+        for variant in self._variants:
+            variant_path = os.path.join(self.rendered_tiles_dir, variant)
+            for file in os.listdir(variant_path):
+                if file.endswith('.png'):
+                    self._paths.append(os.path.join(variant_path, file))
+        self._listing_key = self._current_listing_key()
+
+        # Drop decodes of tiles that no longer exist
+        current = set(self._paths)
+        with self._lock:
+            for path in [p for p in self._cache if p not in current]:
+                self._cache_bytes -= self._cache.pop(path)[1].nbytes
+            for path in [p for p in self._shapes if p not in current]:
+                del self._shapes[path]
+
+    def variants(self):
+        """List variant directory names."""
+        self.refresh()
+        return list(self._variants)
+
+    def paths(self):
+        """List every tile path across variants."""
+        self.refresh()
+        return self._paths
+
+    def sample(self):
+        """Pick a random tile path (one random.choice, like load_random_tile)."""
+        return random.choice(self.paths())
+
+    def shape(self, path):
+        """Get a tile's (height, width) from its header, cached."""
+        key = _file_key(path)
+        with self._lock:
+            cached = self._shapes.get(path)
+            if cached is not None and cached[0] == key:
+                return cached[1]
+        shape = read_tile_shape(path)
+        with self._lock:
+            self._shapes[path] = (key, shape)
+        return shape
+
+    def load(self, path):
+        """Get a decoded tile, decoding it only on first use or after it changed (safe to call from threads)."""
+        key = _file_key(path)
+        with self._lock:
+            cached = self._cache.get(path)
+            if cached is not None:
+                if cached[0] == key:
+                    self._cache.move_to_end(path)
+                    return cached[1]
+                # Re-rendered since it was decoded
+                del self._cache[path]
+                self._cache_bytes -= cached[1].nbytes
+            loading = self._loading.get(path)
+            if loading is None:
+                self._loading[path] = threading.Event()
+
+        if loading is not None:
+            # Another thread is decoding this tile; wait for it and retry
+            loading.wait()
+            return self.load(path)
+
+        try:
+            tile = load_rgba(path)
+            tile.flags.writeable = False  # Shared between runs
+            with self._lock:
+                self.decodes += 1
+                self._shapes[path] = (key, tile.shape[:2])
+                previous = self._cache.pop(path, None)
+                if previous is not None:
+                    self._cache_bytes -= previous[1].nbytes
+                self._cache[path] = (key, tile)
+                self._cache_bytes += tile.nbytes
+                while self._cache_bytes > self.max_bytes and len(self._cache) > 1:
+                    _, (_, evicted) = self._cache.popitem(last=False)
+                    self._cache_bytes -= evicted.nbytes
+            return tile
+        finally:
+            with self._lock:
+                self._loading.pop(path).set()
+
+    def clear(self):
+        """Drop all decoded tiles."""
+        with self._lock:
+            self._cache.clear()
+            self._cache_bytes = 0
+
+def _file_key(path):
+    """Get the (mtime_ns, size) identifying a tile file's content."""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+_pools = {}
+
+def get_tile_pool(rendered_tiles_dir):
+    """Get the shared tile pool of a rendered-tiles directory."""
+    rendered_tiles_dir = os.path.normpath(rendered_tiles_dir)
+    if rendered_tiles_dir not in _pools:
+        _pools[rendered_tiles_dir] = TilePool(rendered_tiles_dir)
+    return _pools[rendered_tiles_dir]
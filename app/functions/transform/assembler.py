@@ -6,7 +6,23 @@ import random
 from .grid_manager import GridManager
 from .piece_selector import PieceSelector
 from .output_manager import OutputManager
+from .virtual_subdivision import VirtualSubdivider
+from .subdivision_functions import TileSubdivider
+from .tile_catalog import TileCatalog
+from .scheduler import WorkScheduler, workers_for_memory
 from ..base.tile_naming import TileNaming
+from ..base.tile_store import invalidate_tile_sources, list_tiles, read_tile, tile_exists
+from ..base.project_config import DEFAULT_SUBDIVISION_SCALES, get_subdivision_scales
+
+# Peak memory of one restore relative to its canvas: canvas, PNG and JPG encode buffers
+RESTORE_MEMORY_FACTOR = 3
+
+def restore_variant(project_name, rendered_tiles_dir, collage_out_dir, variant):
+    """Build the exact assembly of one variant (runs in a worker process)."""
+    assembler = Assembler(project_name, rendered_tiles_dir, collage_out_dir)
+    assembler.piece_selector = PieceSelector('exact', catalog=assembler.catalog)
+    assembler._process_single_assembly(variant, 'exact', 1)
+    return variant
 
 class Assembler:
     """Main assembly coordinator."""
@@ -16,29 +32,55 @@ class Assembler:
         self.collage_out_dir = collage_out_dir
         self.output_manager = OutputManager(project_name, collage_out_dir)
         self.tile_naming = TileNaming()
+        self.catalog = TileCatalog(rendered_tiles_dir)
         self.piece_selector = None
+        self.virtual_subdivider = None
+        self.use_virtual_subdivision = True
+        self.subdivision_scales = list(DEFAULT_SUBDIVISION_SCALES)
+        self.subdividers = {}
+        self._exported = set()
+
+    def set_multi_scale_strategy(self, project_path, virtual=True):
+        """Enable multi-scale assembly mode.
 
-    def set_multi_scale_strategy(self, project_path):
-        """Enable multi-scale assembly mode."""
-        self.piece_selector = PieceSelector('multi-scale')
+        With virtual=True, sub-tiles are cropped in memory from the rendered
+        tiles and the subdivided-tiles export is not needed. Otherwise only the
+        scales the assembly actually samples are exported, on demand.
+        """
         self.project_path = project_path
+        self.subdivision_scales = get_subdivision_scales(project_path)
+        self.catalog = TileCatalog(
+            self.rendered_tiles_dir, os.path.join(project_path, "subdivided-tiles")
+        )
+        self.piece_selector = PieceSelector(
+            'multi-scale', scales=self.subdivision_scales, catalog=self.catalog
+        )
+        self.virtual_subdivider = VirtualSubdivider(self.catalog)
+        self.use_virtual_subdivision = virtual
+        self.subdividers = {}
+        self._exported = set()
 
     def assemble(self, strategy='exact', run_number=1):
         """Main assembly process."""
         if self.piece_selector is None:
-            self.piece_selector = PieceSelector(strategy)
+            self.piece_selector = PieceSelector(strategy, catalog=self.catalog)
         
-        # Find valid tile directories
-        subdirectories = [d for d in os.listdir(self.rendered_tiles_dir) 
-                         if os.path.isdir(os.path.join(self.rendered_tiles_dir, d))]
+        # Find valid tile directories (loose folders or packed containers)
+        invalidate_tile_sources()
+        self.catalog.refresh()
+        subdirectories = self.catalog.variants()
         
         valid_subdirs = []
+        canvas_bytes = {}
         for subdir in subdirectories:
             subdir_path = os.path.join(self.rendered_tiles_dir, subdir)
             try:
                 grid_manager = GridManager(subdir_path)
                 if grid_manager._is_valid_tile_directory(subdir_path):
                     valid_subdirs.append(subdir)
+                    rows, cols = grid_manager.grid_dimensions
+                    height, width = grid_manager.piece_dimensions
+                    canvas_bytes[subdir] = rows * cols * height * width * 3
                 else:
                     print(f"Skipping invalid tile directory: {subdir}")
             except Exception as e:
@@ -49,13 +91,7 @@ class Assembler:
             return
             
         if strategy == 'exact':
-            # Process each valid subdirectory for exact assemblies
-            for base_subdir in valid_subdirs:
-                try:
-                    self._process_single_assembly(base_subdir, strategy, 1)
-                    print(f"Created exact assembly for {base_subdir}")
-                except Exception as e:
-                    print(f"Error creating exact assembly for {base_subdir}: {e}")
+            self._restore_variants(valid_subdirs, canvas_bytes)
         else:
             # For random/multi-scale, use first directory as base but pull from all
             base_subdir = valid_subdirs[0]
@@ -69,6 +105,26 @@ class Assembler:
                     print(f"Error creating {strategy} assembly {run + 1}: {e}")
                     continue
 
+    def _restore_variants(self, variants, canvas_bytes, memory_budget=None, max_workers=None):
+        """Build exact assemblies of all variants on a memory-capped process pool."""
+        peak_bytes = max(canvas_bytes.values()) * RESTORE_MEMORY_FACTOR
+        workers = workers_for_memory(peak_bytes, memory_budget, max_workers)
+        scheduler = WorkScheduler('process', workers)
+        summary = scheduler.run(
+            restore_variant,
+            [(self.project_name, self.rendered_tiles_dir, self.collage_out_dir, v) for v in variants],
+            desc="Restoring variants",
+            unit="variant",
+            cost=lambda item: canvas_bytes[item[3]]
+        )
+
+        print(f"\nRestored {summary['completed']} of {len(variants)} variants")
+        for variant in sorted(summary['results']):
+            print(f"  Created exact assembly for {variant}")
+        for item, error in summary['errors']:
+            print(f"  Error creating exact assembly for {item[3]}: {error}")
+        return summary
+
     def _process_single_assembly(self, base_subdir, strategy, run_number, valid_subdirs=None):
         """Process a single assembly operation."""
         base_path = os.path.join(self.rendered_tiles_dir, base_subdir)
@@ -93,6 +149,8 @@ class Assembler:
                 valid_subdirs,
                 assembly_data
             )
+            for subdivider in self.subdividers.values():
+                subdivider.save_state()
         else:
             self._process_pieces(
                 canvas,
@@ -114,7 +172,7 @@ class Assembler:
         """Process regular (non-multi-scale) pieces."""
         height, width = grid_manager.piece_dimensions
         
-        for piece in sorted(os.listdir(base_path)):
+        for piece in list_tiles(base_path):
             if not piece.endswith('.png'):
                 continue
                 
@@ -127,8 +185,8 @@ class Assembler:
                     self.project_path if hasattr(self, 'project_path') else None
                 )
                 
-                if os.path.exists(piece_path):
-                    piece_img = cv2.imread(piece_path)
+                if tile_exists(piece_path):
+                    piece_img = read_tile(piece_path)
                     if piece_img is not None:
                         if piece_img.shape[:2] != (height, width):
                             piece_img = cv2.resize(piece_img, (width, height))
@@ -159,9 +217,9 @@ class Assembler:
     def _process_multi_scale_pieces(self, canvas, base_path, grid_manager, valid_subdirs, assembly_data):
         """Process pieces for multi-scale assembly."""
         height, width = grid_manager.piece_dimensions
-        subdivision_scales = ["2x2","3x3","5x5","8x8","10x10"]
+        subdivision_scales = [f"{g}x{g}" for g in self.subdivision_scales]
         
-        for piece in sorted(os.listdir(base_path)):
+        for piece in list_tiles(base_path):
             if not piece.endswith('.png'):
                 continue
                 
@@ -182,9 +240,8 @@ class Assembler:
                 # Find all available directories that have this scale
                 available_dirs = []
                 for subdir in valid_subdirs:
-                    scale_path = os.path.join(self.project_path, "subdivided-tiles", subdir, selected_scale)
-                    if os.path.exists(scale_path):
-                        available_dirs.append((subdir, scale_path))
+                    if self.catalog.has_parent(subdir, coords.parent_row, coords.parent_col):
+                        available_dirs.append((subdir, self.catalog.scale_dir(subdir, grid_size)))
                 
                 if available_dirs:
                     print(f"Using {selected_scale} for parent tile {piece}")
@@ -195,28 +252,24 @@ class Assembler:
                         for sub_col in range(grid_size):
                             # Randomly select directory for this specific subdivided tile
                             selected_subdir, selected_path = random.choice(available_dirs)
-                            
-                            sub_tile_name = f"{coords.parent_row}-{coords.parent_col}_{sub_row}-{sub_col}.png"
-                            sub_tile_path = os.path.join(selected_path, sub_tile_name)
                             used_directories[f"{sub_row}-{sub_col}"] = selected_subdir
                             
-                            if os.path.exists(sub_tile_path):
-                                sub_img = cv2.imread(sub_tile_path)
-                                if sub_img is not None:
-                                    if sub_img.shape[:2] != (sub_height, sub_width):
-                                        sub_img = cv2.resize(sub_img, (sub_width, sub_height))
-                                    
-                                    # Place in tile space
-                                    sub_row_start = sub_row * sub_height
-                                    sub_col_start = sub_col * sub_width
-                                    tile_space[
-                                        sub_row_start:sub_row_start + sub_height,
-                                        sub_col_start:sub_col_start + sub_width
-                                    ] = sub_img
-                                else:
-                                    print(f"Could not read subtile: {sub_tile_path}")
-                            else:
-                                print(f"Subtile not found: {sub_tile_path}")
+                            sub_img = self._load_subtile(
+                                selected_subdir, selected_path, coords, grid_size, sub_row, sub_col
+                            )
+                            if sub_img is None:
+                                continue
+                            
+                            if sub_img.shape[:2] != (sub_height, sub_width):
+                                sub_img = cv2.resize(sub_img, (sub_width, sub_height))
+                            
+                            # Place in tile space
+                            sub_row_start = sub_row * sub_height
+                            sub_col_start = sub_col * sub_width
+                            tile_space[
+                                sub_row_start:sub_row_start + sub_height,
+                                sub_col_start:sub_col_start + sub_width
+                            ] = sub_img
                     
                     # Place completed tile space in canvas
                     row_start = coords.parent_row * height
@@ -241,3 +294,46 @@ class Assembler:
                     
             except Exception as e:
                 print(f"Error processing piece {piece}: {e}")
+
+    def _load_subtile(self, subdir, scale_path, coords, grid_size, sub_row, sub_col):
+        """Load a sub-tile from the virtual subdivider or the exported files."""
+        if self.use_virtual_subdivision:
+            sub_img = self.virtual_subdivider.get_subtile(
+                subdir, coords.parent_row, coords.parent_col, grid_size, sub_row, sub_col
+            )
+            if sub_img is None:
+                print(f"Subtile not available: {subdir} {coords.parent_row}-{coords.parent_col}_{sub_row}-{sub_col}")
+            return sub_img
+
+        sub_tile_name = self.tile_naming.create_subdivided_tile_name(
+            coords.parent_row, coords.parent_col, sub_row, sub_col
+        )
+        sub_tile_path = os.path.join(scale_path, sub_tile_name)
+        self._ensure_exported(subdir, coords, grid_size)
+        if not self.catalog.has_child(subdir, grid_size, coords.parent_row, coords.parent_col, sub_row, sub_col):
+            print(f"Subtile not found: {sub_tile_path}")
+            return None
+        sub_img = read_tile(sub_tile_path)
+        if sub_img is None:
+            print(f"Could not read subtile: {sub_tile_path}")
+        return sub_img
+
+    def _ensure_exported(self, subdir, coords, grid_size):
+        """Export a parent tile's sub-tiles at one scale the first time it is sampled."""
+        key = (subdir, coords.parent_row, coords.parent_col, grid_size)
+        if key in self._exported:
+            return
+        self._exported.add(key)
+
+        parent_path = self.catalog.parent_path(subdir, coords.parent_row, coords.parent_col)
+        if parent_path is None:
+            return
+        if subdir not in self.subdividers:
+            output_dir = os.path.join(self.project_path, "subdivided-tiles", subdir)
+            self.subdividers[subdir] = TileSubdivider(output_dir, self.subdivision_scales)
+        try:
+            if self.subdividers[subdir].ensure_subdivided(parent_path, [grid_size]):
+                self.catalog.add_children(subdir, grid_size, coords.parent_row, coords.parent_col)
+                print(f"Generated {grid_size}x{grid_size} sub-tiles for {subdir}/{os.path.basename(parent_path)}")
+        except Exception as e:
+            print(f"Error subdividing {parent_path} at {grid_size}x{grid_size}: {e}")
@@ -2,6 +2,7 @@
 import os
 import cv2
 import numpy as np
+from ..base.tile_store import list_tiles, read_tile
 
 class GridManager:
    """Handles grid calculations and validation."""
@@ -16,13 +17,13 @@ class GridManager:
    def _is_valid_tile_directory(self, directory_path):
        """Check if directory contains valid grid tiles."""
        try:
-           pieces = [f for f in os.listdir(directory_path) 
+           pieces = [f for f in list_tiles(directory_path) 
                     if f.endswith('.png') and '-' in f and '_' in f]
            if not pieces:
                return False
            
            # Check first piece is readable and has expected format
-           sample = cv2.imread(os.path.join(directory_path, pieces[0]))
+           sample = read_tile(os.path.join(directory_path, pieces[0]))
            if sample is None:
                return False
                
@@ -46,7 +47,7 @@ class GridManager:
        if not self._is_valid_tile_directory(self.subdir_path):
            raise ValueError(f"No valid grid tiles found in {self.subdir_path}")
 
-       pieces = [f for f in os.listdir(self.subdir_path) 
+       pieces = [f for f in list_tiles(self.subdir_path) 
                 if f.endswith('.png') and '-' in f and '_' in f]
        
        max_row = max_col = 0
@@ -71,12 +72,12 @@ class GridManager:
 
    def _get_piece_dimensions(self):
        """Get dimensions from a sample piece."""
-       pieces = [f for f in os.listdir(self.subdir_path) if f.endswith('.png')]
+       pieces = [f for f in list_tiles(self.subdir_path) if f.endswith('.png')]
        if not pieces:
            raise ValueError(f"No pieces found in {self.subdir_path}")
 
        sample_path = os.path.join(self.subdir_path, pieces[0])
-       sample = cv2.imread(sample_path)
+       sample = read_tile(sample_path)
        if sample is None:
            raise ValueError(f"Cannot read sample piece from {self.subdir_path}")
 
@@ -0,0 +1,277 @@
+# transform/ingest_functions.py
+import os
+import json
+import shutil
+from collections import Counter
+from datetime import datetime
+import cv2
+from ..base.tile_naming import TileNaming
+from ..base.tile_store import invalidate_tile_sources, list_tiles, list_variants, read_tile, tile_fingerprint
+from .scheduler import WorkScheduler
+
+NORMALIZED_TILES_DIR = "normalized-tiles"
+REPORT_FILENAME = "ingest-report.json"
+
+def target_tile_shape(shapes, tile_size):
+    """
+    Get the (height, width) every tile of a variant is normalized to.
+
+    The width is tile_size and the height keeps the variant's most common
+    aspect ratio, so square grids become tile_size x tile_size.
+    """
+    height, width = Counter(shapes).most_common(1)[0][0]
+    return max(1, round(tile_size * height / width)), tile_size
+
+def normalize_tile(source_path, output_path, target_shape):
+    """Write one tile at the target (height, width), resizing only if needed."""
+    tile = read_tile(source_path, cv2.IMREAD_UNCHANGED)
+    if tile is None:
+        raise ValueError(f"Could not read tile: {source_path}")
+    height, width = target_shape
+    source_shape = tile.shape[:2]
+
+    if source_shape == (height, width) and os.path.isfile(source_path):
+        shutil.copyfile(source_path, output_path)
+    else:
+        if source_shape != (height, width):
+            shrinking = source_shape[0] > height or source_shape[1] > width
+            interpolation = cv2.INTER_AREA if shrinking else cv2.INTER_LANCZOS4
+            tile = cv2.resize(tile, (width, height), interpolation=interpolation)
+        if not cv2.imwrite(output_path, tile):
+            raise IOError(f"Could not write normalized tile: {output_path}")
+
+    return os.path.basename(output_path), list(source_shape)
+
+def _read_tile_shape(tile_path):
+    """Get a tile's (height, width) without keeping the decoded pixels around."""
+    tile = read_tile(tile_path, cv2.IMREAD_UNCHANGED)
+    if tile is None:
+        raise ValueError(f"Could not read tile: {tile_path}")
+    return tuple(tile.shape[:2])
+
+def _source_key(tile_path):
+    """Get the mtime/size recorded for a source tile, so later ingests can tell whether it changed."""
+    try:
+        fingerprint = tile_fingerprint(tile_path)
+    except FileNotFoundError:
+        return {'mtime': None, 'size': None}
+    return {'mtime': fingerprint['mtime'], 'size': fingerprint['size']}
+
+def load_ingest_report(project_path):
+    """Load the last ingest report, or None if the project was never ingested."""
+    report_path = os.path.join(project_path, NORMALIZED_TILES_DIR, REPORT_FILENAME)
+    try:
+        with open(report_path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Warning: Could not read ingest report {report_path}: {e}")
+        return None
+
+def find_stale_ingest(project_path, report):
+    """
+    Compare an ingest report against rendered-tiles.
+
+    Returns a description of the first difference (an added or removed
+    variant, or a new, changed or removed tile), or None if the
+    normalized tiles are up to date. Tiles that were invalid or failed
+    count as changed once their mtime or size moves, so a tile that was
+    still being written during an ingest is picked up when it lands.
+    """
+    rendered_tiles_dir = os.path.join(project_path, "rendered-tiles")
+    variants = report.get('variants', {})
+    current_variants = list_variants(rendered_tiles_dir)
+    for variant in set(current_variants) ^ set(variants):
+        state = "added" if variant in current_variants else "removed"
+        return f"variant {variant} was {state}"
+
+    failed = {entry['path']: entry for entry in report.get('failed', [])}
+    for variant in current_variants:
+        variant_path = os.path.join(rendered_tiles_dir, variant)
+        tiles = variants[variant].get('tiles', {})
+        rejected = {entry['name']: entry for entry in variants[variant].get('invalid', [])}
+        current = set(list_tiles(variant_path))
+        for tile_name in current:
+            tile_path = os.path.join(variant_path, tile_name)
+            entry = (tiles.get(tile_name) or rejected.get(tile_name)
+                     or failed.get(os.path.relpath(tile_path, project_path)))
+            if entry is None:
+                return f"{variant}/{tile_name} is new"
+            try:
+                fingerprint = tile_fingerprint(tile_path)
+            except FileNotFoundError:
+                return f"{variant}/{tile_name} was removed"
+            if entry.get('mtime') != fingerprint['mtime'] or entry.get('size') != fingerprint['size']:
+                return f"{variant}/{tile_name} changed"
+        for tile_name in set(tiles) - current:
+            return f"{variant}/{tile_name} was removed"
+    return None
+
+def get_assembly_tiles_dir(project_path, tile_size=None):
+    """
+    Get the tile directory assemblies should read from.
+
+    Uses the normalized cache when it was built for tile_size (or any size
+    if tile_size is None), otherwise falls back to rendered-tiles. A cache
+    that no longer matches rendered-tiles is brought up to date first.
+    """
+    report = load_ingest_report(project_path)
+    if not report or (tile_size is not None and report.get('tile_size') != tile_size):
+        return os.path.join(project_path, "rendered-tiles")
+
+    invalidate_tile_sources()
+    reason = find_stale_ingest(project_path, report)
+    if reason:
+        print(f"Normalized tiles are out of date ({reason}), re-ingesting changed tiles")
+        # Usually only a few tiles changed, which threads handle without spawning processes
+        if ingest_rendered_tiles(project_path, report['tile_size'], backend='thread') is None:
+            print("Warning: Could not update normalized tiles, using rendered-tiles")
+            return os.path.join(project_path, "rendered-tiles")
+    return os.path.join(project_path, NORMALIZED_TILES_DIR)
+
+def ingest_rendered_tiles(project_path, tile_size, backend='process', max_workers=None):
+    """
+    Normalize every rendered variant to tile_size into normalized-tiles.
+
+    Filenames are validated against TileNaming, unchanged tiles are skipped
+    on later runs, and the outcome is written to normalized-tiles/ingest-report.json.
+
+    Args:
+        project_path: Path to the project
+        tile_size: Target tile width in pixels (rendered_tile_size)
+        backend: 'process' or 'thread' worker pool
+        max_workers: Worker count (default: CPU count - 1)
+    """
+    rendered_tiles_dir = os.path.join(project_path, "rendered-tiles")
+    normalized_dir = os.path.join(project_path, NORMALIZED_TILES_DIR)
+    tile_naming = TileNaming()
+
+    variants = list_variants(rendered_tiles_dir)
+    if not variants:
+        print("No variation directories found")
+        return None
+
+    previous = load_ingest_report(project_path) or {}
+    previous_variants = previous.get('variants', {}) if previous.get('tile_size') == tile_size else {}
+
+    report = {
+        'tile_size': tile_size,
+        'created': datetime.now().isoformat(),
+        'variants': {},
+        'failed': []
+    }
+    work_items = []
+    pending = {}  # (variant, tile_name) -> report entry awaiting its worker result
+    skipped = 0
+
+    for variant in variants:
+        variant_path = os.path.join(rendered_tiles_dir, variant)
+        output_dir = os.path.join(normalized_dir, variant)
+        os.makedirs(output_dir, exist_ok=True)
+        old_tiles = previous_variants.get(variant, {}).get('tiles', {})
+
+        # Validate names and detect duplicate grid positions
+        valid, invalid, positions = [], [], {}
+        for tile_name in list_tiles(variant_path):
+            tile_path = os.path.join(variant_path, tile_name)
+            try:
+                coords = tile_naming.parse_original_tile_name(tile_name)
+            except ValueError as e:
+                invalid.append({'name': tile_name, 'reason': str(e), **_source_key(tile_path)})
+                continue
+            position = (coords.parent_row, coords.parent_col)
+            if position in positions:
+                invalid.append({'name': tile_name, 'reason': f"Duplicate position of {positions[position]}",
+                                **_source_key(tile_path)})
+                continue
+            positions[position] = tile_name
+            valid.append(tile_name)
+
+        # Work out the variant's target shape from the source tiles
+        fingerprints, shapes = {}, {}
+        for tile_name in valid:
+            tile_path = os.path.join(variant_path, tile_name)
+            fingerprint = tile_fingerprint(tile_path)
+            old = old_tiles.get(tile_name)
+            fingerprints[tile_name] = fingerprint
+            if old and old['mtime'] == fingerprint['mtime'] and old['size'] == fingerprint['size']:
+                shapes[tile_name] = tuple(old['source_shape'])
+            else:
+                try:
+                    shapes[tile_name] = _read_tile_shape(tile_path)
+                except ValueError as e:
+                    invalid.append({'name': tile_name, 'reason': str(e),
+                                    'mtime': fingerprint['mtime'], 'size': fingerprint['size']})
+        if not shapes:
+            report['variants'][variant] = {'shape': None, 'tiles': {}, 'invalid': invalid}
+            continue
+        target_shape = target_tile_shape(list(shapes.values()), tile_size)
+
+        variant_report = {'shape': list(target_shape), 'tiles': {}, 'invalid': invalid}
+        report['variants'][variant] = variant_report
+        for tile_name, source_shape in shapes.items():
+            entry = {
+                'mtime': fingerprints[tile_name]['mtime'],
+                'size': fingerprints[tile_name]['size'],
+                'source_shape': list(source_shape),
+                'resized': source_shape != target_shape
+            }
+            old = old_tiles.get(tile_name)
+            output_path = os.path.join(output_dir, tile_name)
+            unchanged = (old and previous_variants[variant].get('shape') == list(target_shape)
+                         and {k: old.get(k) for k in entry} == entry)
+            if unchanged and os.path.exists(output_path):
+                variant_report['tiles'][tile_name] = entry
+                skipped += 1
+                continue
+            pending[(variant, tile_name)] = entry
+            work_items.append((os.path.join(variant_path, tile_name), output_path, target_shape))
+
+        # Drop normalized tiles whose source is gone or no longer valid
+        for tile_name in set(list_tiles(output_dir)) - set(shapes):
+            try:
+                os.remove(os.path.join(output_dir, tile_name))
+            except FileNotFoundError:
+                pass
+
+    # Drop variants that were removed from rendered-tiles
+    for variant in set(list_variants(normalized_dir)) - set(variants):
+        shutil.rmtree(os.path.join(normalized_dir, variant), ignore_errors=True)
+
+    scheduler = WorkScheduler(backend, max_workers)
+    summary = scheduler.run(
+        normalize_tile,
+        work_items,
+        desc="Normalizing rendered tiles",
+        unit="tile"
+    )
+
+    for source_path, output_path, _ in summary['completed_items']:
+        variant = os.path.basename(os.path.dirname(output_path))
+        tile_name = os.path.basename(output_path)
+        report['variants'][variant]['tiles'][tile_name] = pending[(variant, tile_name)]
+    for (source_path, output_path, _), error in summary['errors']:
+        entry = pending[(os.path.basename(os.path.dirname(output_path)), os.path.basename(output_path))]
+        report['failed'].append({
+            'path': os.path.relpath(source_path, project_path),
+            'error': error,
+            'mtime': entry['mtime'],
+            'size': entry['size']
+        })
+
+    invalidate_tile_sources()
+    report_path = os.path.join(normalized_dir, REPORT_FILENAME)
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    resized = sum(
+        entry['resized']
+        for variant_report in report['variants'].values()
+        for entry in variant_report['tiles'].values()
+    )
+    invalid_count = sum(len(v['invalid']) for v in report['variants'].values())
+    print(f"Normalized {summary['completed']} tiles ({skipped} up to date, {resized} resized in total), "
+          f"{invalid_count} invalid, {summary['failed']} failed")
+    print(f"Ingest report written to {report_path}")
+    return report
@@ -2,6 +2,8 @@
 import os
 import random
 from ..base.tile_naming import TileNaming
+from ..base.project_config import DEFAULT_SUBDIVISION_SCALES
+from .tile_catalog import TileCatalog
 
 class TileSelectionStrategy:
     """Base class for tile selection strategies."""
@@ -18,41 +20,61 @@ class ExactStrategy(TileSelectionStrategy):
 
 class RandomStrategy(TileSelectionStrategy):
     """Select random tile from available variants."""
+    def __init__(self, catalog=None):
+        super().__init__()
+        self.catalog = catalog
+
     def select_tile(self, piece_name, subdirectory_path, all_subdirectories, project_path):
         random_subdir = random.choice(all_subdirectories)
+        if self.catalog is not None:
+            # Match by grid position, since variants may use different filename prefixes
+            coords = self.tile_naming.parse_original_tile_name(piece_name)
+            path = self.catalog.parent_path(random_subdir, coords.parent_row, coords.parent_col)
+            if path is not None:
+                return path
         return os.path.join(os.path.dirname(subdirectory_path), random_subdir, piece_name)
 
 class MultiScaleStrategy(TileSelectionStrategy):
+    def __init__(self, scales=None, catalog=None):
+        super().__init__()
+        self.scales = list(scales or DEFAULT_SUBDIVISION_SCALES)
+        self.catalog = catalog
+
+    def _get_catalog(self, subdirectory_path, project_path):
+        """Build a catalog on first use when none was supplied."""
+        if self.catalog is None:
+            self.catalog = TileCatalog(
+                os.path.dirname(subdirectory_path),
+                os.path.join(project_path, "subdivided-tiles")
+            )
+        return self.catalog
+
     def select_tile(self, piece_name, subdirectory_path, all_subdirectories, project_path):
         try:
             coords = self.tile_naming.parse_original_tile_name(piece_name)
+            catalog = self._get_catalog(subdirectory_path, project_path)
+            variant = os.path.basename(subdirectory_path)
             
+            # Find all subdivided tiles for this parent tile from the in-memory index
             available_tiles = []
-            for scale in ["2x2","3x3","5x5","8x8","10x10"]:
-                grid_size = int(scale.split("x")[0])
-                scale_dir = os.path.join(
-                    project_path, 
-                    "subdivided-tiles", 
-                    os.path.basename(subdirectory_path),
-                    scale
-                )
-                
-                if os.path.exists(scale_dir):
-                    # Find all subdivided tiles for this parent tile
-                    for child_row in range(grid_size):
-                        for child_col in range(grid_size):
-                            subdivided_name = self.tile_naming.create_subdivided_tile_name(
-                                coords.parent_row, coords.parent_col,
-                                child_row, child_col
-                            )
-                            subdivided_path = os.path.join(scale_dir, subdivided_name)
-                            if os.path.exists(subdivided_path):
-                                available_tiles.append((scale, subdivided_path))
+            for grid_size in self.scales:
+                children = catalog.children(variant, grid_size, coords.parent_row, coords.parent_col)
+                if children:
+                    available_tiles.append((grid_size, sorted(children)))
 
             if available_tiles:
-                chosen_scale, chosen_path = random.choice(available_tiles)
-                print(f"Selected {chosen_path} ({chosen_scale}) for {piece_name}")
-                return chosen_path
+                # Weight each scale by its number of sub-tiles, as a flat pick over all of them would
+                total = sum(len(children) for _, children in available_tiles)
+                pick = random.randrange(total)
+                for grid_size, children in available_tiles:
+                    if pick < len(children):
+                        child_row, child_col = children[pick]
+                        break
+                    pick -= len(children)
+                subdivided_name = self.tile_naming.create_subdivided_tile_name(
+                    coords.parent_row, coords.parent_col, child_row, child_col
+                )
+                return os.path.join(catalog.scale_dir(variant, grid_size), subdivided_name)
 
         except Exception as e:
             print(f"Error processing {piece_name}: {e}")
@@ -62,11 +84,12 @@ class MultiScaleStrategy(TileSelectionStrategy):
 
 class PieceSelector:
     """Handles piece selection strategy."""
-    def __init__(self, strategy='exact'):
+    def __init__(self, strategy='exact', scales=None, catalog=None):
+        self.catalog = catalog
         strategies = {
             'exact': ExactStrategy(),
-            'random': RandomStrategy(),
-            'multi-scale': MultiScaleStrategy()
+            'random': RandomStrategy(catalog),
+            'multi-scale': MultiScaleStrategy(scales, catalog)
         }
         self.strategy = strategies.get(strategy, ExactStrategy())
 
@@ -74,6 +97,6 @@ class PieceSelector:
         """Select piece based on current strategy."""
         return self.strategy.select_tile(piece_name, current_subdir, all_subdirs, project_path)
 
-    def set_multi_scale_strategy(self):
+    def set_multi_scale_strategy(self, scales=None):
         """Switch to multi-scale strategy."""
-        self.strategy = MultiScaleStrategy()
\ No newline at end of file
+        self.strategy = MultiScaleStrategy(scales, self.catalog)
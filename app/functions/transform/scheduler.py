@@ -0,0 +1,99 @@
+# transform/scheduler.py
+import os
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from tqdm import tqdm
+from ..base.profiler import is_profiling
+
+def available_memory_bytes(default=4 * 1024 ** 3):
+    """Get currently available physical memory, or default where it can't be queried."""
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, ValueError, OSError):
+        return default
+
+def workers_for_memory(item_bytes, memory_budget=None, max_workers=None):
+    """
+    Get how many items can run at once without exceeding a memory budget.
+
+    The budget defaults to half of the available physical memory.
+    """
+    if memory_budget is None:
+        memory_budget = available_memory_bytes() // 2
+    cpu_workers = max_workers or max(1, mp.cpu_count() - 1)
+    if item_bytes <= 0:
+        return cpu_workers
+    return max(1, min(cpu_workers, memory_budget // item_bytes))
+
+class WorkScheduler:
+    """Runs a flat list of work items on one shared worker pool.
+
+    Items from every variant go into the same pool, so workers stay busy until
+    the last item is done instead of idling between per-variant pools.
+    """
+    BACKENDS = {
+        'process': ProcessPoolExecutor,
+        'thread': ThreadPoolExecutor
+    }
+
+    def __init__(self, backend='process', max_workers=None):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}', expected one of: {', '.join(self.BACKENDS)}")
+        self.backend = backend
+        self.max_workers = max_workers or max(1, mp.cpu_count() - 1)  # Leave one CPU free
+
+    def run(self, func, work_items, desc="Processing", unit="item", cost=None):
+        """
+        Run func(*item) for every work item and report a summary.
+
+        Args:
+            func: Module-level callable (must be picklable for the process backend)
+            work_items: List of argument tuples
+            desc: Progress bar label
+            unit: Progress bar unit
+            cost: Optional callable estimating an item's cost; the most
+                  expensive items are submitted first to avoid a long tail
+
+        Returns:
+            dict: completed/failed counts, collected results, completed items and errors
+        """
+        summary = {'completed': 0, 'failed': 0, 'results': [], 'completed_items': [], 'errors': []}
+        if not work_items:
+            return summary
+
+        if cost is not None:
+            work_items = sorted(work_items, key=cost, reverse=True)
+
+        if is_profiling():
+            # Worker processes and threads are invisible to the profiler, so run the hot path here
+            print(f"Profiling: running {len(work_items)} work items in this thread")
+            for item in tqdm(work_items, desc=desc, unit=unit):
+                try:
+                    summary['results'].append(func(*item))
+                    summary['completed_items'].append(item)
+                    summary['completed'] += 1
+                except Exception as e:
+                    summary['failed'] += 1
+                    summary['errors'].append((item, str(e)))
+                    tqdm.write(f"Error processing {item}: {e}")
+            return summary
+
+        num_workers = min(self.max_workers, len(work_items))
+        print(f"Scheduling {len(work_items)} work items on {num_workers} {self.backend} workers")
+
+        with self.BACKENDS[self.backend](max_workers=num_workers) as executor:
+            futures = {executor.submit(func, *item): item for item in work_items}
+
+            with tqdm(total=len(futures), desc=desc, unit=unit) as pbar:
+                for future in as_completed(futures):
+                    try:
+                        summary['results'].append(future.result())
+                        summary['completed_items'].append(futures[future])
+                        summary['completed'] += 1
+                    except Exception as e:
+                        summary['failed'] += 1
+                        summary['errors'].append((futures[future], str(e)))
+                        tqdm.write(f"Error processing {futures[future]}: {e}")
+                    pbar.update(1)
+
+        return summary
@@ -1,120 +1,271 @@
 # app/functions/transform/subdivision_functions.py
 import os
-from PIL import Image
-import multiprocessing as mp
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from tqdm import tqdm
+import json
+import cv2
+from ..base.io import calculate_md5
 from ..base.tile_naming import TileNaming
+from ..base.tile_store import list_tiles, list_variants, read_tile, tile_fingerprint
+from ..base.project_config import DEFAULT_SUBDIVISION_SCALES, get_subdivision_scales
+from .ingest_functions import get_assembly_tiles_dir
+from .scheduler import WorkScheduler
+from .virtual_subdivision import subtile_bounds
+
+def subdivide_tile(tile_path, output_dir, grid_sizes):
+    """Crop one tile into a grid_size x grid_size set of sub-tiles per scale and save them."""
+    tile_naming = TileNaming()
+    coords = tile_naming.parse_original_tile_name(os.path.basename(tile_path))
+
+    # Load image once (from disk or a packed tile store) for every scale
+    tile = read_tile(tile_path, cv2.IMREAD_UNCHANGED)
+    if tile is None:
+        raise ValueError(f"Could not read tile: {tile_path}")
+    height, width = tile.shape[:2]
+
+    count = 0
+    for grid_size in grid_sizes:
+        scale_dir = os.path.join(output_dir, f"{grid_size}x{grid_size}")
+        os.makedirs(scale_dir, exist_ok=True)
+        for i in range(grid_size):
+            for j in range(grid_size):
+                # Calculate crop coordinates
+                top, bottom, left, right = subtile_bounds(height, width, grid_size, i, j)
+
+                # Generate filename and save the cropped view
+                subtile_name = tile_naming.create_subdivided_tile_name(
+                    coords.parent_row, coords.parent_col, i, j
+                )
+                subtile_path = os.path.join(scale_dir, subtile_name)
+                if not cv2.imwrite(subtile_path, tile[top:bottom, left:right]):
+                    raise IOError(f"Could not write sub-tile: {subtile_path}")
+        count += grid_size * grid_size
+
+    return count
 
 class TileSubdivider:
-    def __init__(self, output_dir):
+    STATE_FILENAME = ".subdivision-state.json"
+
+    def __init__(self, output_dir, grid_sizes=None):
         self.output_dir = output_dir
         self.tile_naming = TileNaming()
-        self.grid_sizes = [2, 3, 5, 8, 10]
-        
-        # Create all output directories at initialization
-        for grid_size in self.grid_sizes:
-            os.makedirs(os.path.join(output_dir, f"{grid_size}x{grid_size}"), exist_ok=True)
-
-    def subdivide_tiles(self, tiles_dir):
-        """Process all tiles with parallel execution."""
-        print(f"Starting subdivision process in: {tiles_dir}")
-        
-        # Get list of all PNG files
-        tile_files = [f for f in os.listdir(tiles_dir) if f.endswith(".png")]
-        if not tile_files:
-            print("No PNG files found to process")
+        self.grid_sizes = list(grid_sizes or DEFAULT_SUBDIVISION_SCALES)
+        self.state_path = os.path.join(output_dir, self.STATE_FILENAME)
+        self.state = self._load_state()
+        self._pending = {}  # tile_name -> fingerprint of sources being regenerated
+        self.stats = {'skipped': 0, 'regenerated': 0, 'removed': 0}
+        os.makedirs(output_dir, exist_ok=True)
+
+    def _load_state(self):
+        """Load the per-variant record of subdivided sources."""
+        try:
+            with open(self.state_path, 'r') as f:
+                return json.load(f).get('tiles', {})
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not read subdivision state {self.state_path}: {e}")
+            return {}
+
+    def save_state(self):
+        """Write the per-variant record of subdivided sources."""
+        try:
+            with open(self.state_path, 'w') as f:
+                json.dump({'tiles': self.state}, f, indent=2)
+        except OSError as e:
+            print(f"Warning: Could not write subdivision state {self.state_path}: {e}")
+
+    def _fingerprint(self, tile_path, previous=None):
+        """Get mtime/size/hash for a source tile, hashing only when mtime or size moved."""
+        fingerprint = tile_fingerprint(tile_path)
+        if fingerprint['md5'] is not None:
+            return fingerprint  # Packed tiles carry their own hash
+        if previous and previous.get('mtime') == fingerprint['mtime'] and previous.get('size') == fingerprint['size']:
+            fingerprint['md5'] = previous.get('md5')
+        else:
+            with open(tile_path, 'rb') as f:
+                fingerprint['md5'] = calculate_md5(f.read())
+        return fingerprint
+
+    def _remove_outputs(self, tile_name, grid_sizes):
+        """Delete the sub-tiles produced from a source tile."""
+        try:
+            coords = self.tile_naming.parse_original_tile_name(tile_name)
+        except ValueError:
             return
+        for grid_size in grid_sizes:
+            scale_dir = os.path.join(self.output_dir, f"{grid_size}x{grid_size}")
+            for i in range(grid_size):
+                for j in range(grid_size):
+                    subtile_name = self.tile_naming.create_subdivided_tile_name(
+                        coords.parent_row, coords.parent_col, i, j
+                    )
+                    try:
+                        os.remove(os.path.join(scale_dir, subtile_name))
+                    except FileNotFoundError:
+                        pass
 
-        # Create processing tasks
-        tasks = []
+    def remove_tile(self, tile_name):
+        """Delete the sub-tiles of a source tile that is gone and forget it."""
+        entry = self.state.pop(tile_name, None)
+        if entry is not None:
+            self._remove_outputs(tile_name, entry.get('scales', []))
+
+    def build_work_items(self, tiles_dir):
+        """
+        Create (tile_path, output_dir, grid_sizes) work items for tiles that are out of date,
+        one per tile with every scale it is missing.
+
+        Unchanged tiles are skipped and outputs of deleted sources are removed.
+        """
+        tile_files = [f for f in list_tiles(tiles_dir) if f.endswith(".png")]
+        work_items = []
         for tile_name in tile_files:
+            try:
+                self.tile_naming.parse_original_tile_name(tile_name)
+            except ValueError as e:
+                print(f"Skipping {tile_name}: {e}")
+                continue
+
             tile_path = os.path.join(tiles_dir, tile_name)
-            tasks.append((tile_path, tile_name))
-
-        # Process tiles in parallel
-        num_workers = max(1, mp.cpu_count() - 1)  # Leave one CPU free
-        print(f"Processing {len(tasks)} tiles using {num_workers} workers")
-        
-        with ThreadPoolExecutor(max_workers=num_workers) as executor:
-            futures = []
-            for task in tasks:
-                futures.append(executor.submit(self._process_single_tile, *task))
-
-            # Monitor progress with tqdm
-            with tqdm(total=len(futures), desc="Subdividing tiles") as pbar:
-                for future in as_completed(futures):
-                    try:
-                        future.result()  # Get result to check for exceptions
-                        pbar.update(1)
-                    except Exception as e:
-                        print(f"Error processing tile: {e}")
+            previous = self.state.get(tile_name)
+            fingerprint = self._fingerprint(tile_path, previous)
 
-    def _process_single_tile(self, tile_path, tile_name):
-        """Process a single tile for all grid sizes."""
-        try:
-            # Parse coordinates once
-            coords = self.tile_naming.parse_original_tile_name(tile_name)
-            
-            # Load image once
-            with Image.open(tile_path) as tile:
-                tile.load()  # Ensure image is loaded
-                
-                # Process for each grid size
-                for grid_size in self.grid_sizes:
-                    self._subdivide_for_grid_size(tile, coords, grid_size)
-                    
-        except Exception as e:
-            print(f"Error processing {tile_name}: {e}")
-            raise
-
-    def _subdivide_for_grid_size(self, tile, coords, grid_size):
-        """Subdivide a loaded tile for a specific grid size."""
-        width, height = tile.size
-        tile_width = width // grid_size
-        tile_height = height // grid_size
-        
-        output_dir = os.path.join(self.output_dir, f"{grid_size}x{grid_size}")
-        
-        for i in range(grid_size):
-            for j in range(grid_size):
-                # Calculate crop coordinates
-                left = j * tile_width
-                top = i * tile_height
-                right = left + tile_width
-                bottom = top + tile_height
-                
-                # Create subtile
-                subtile = tile.crop((left, top, right, bottom))
-                
-                # Generate filename and save
-                subtile_name = self.tile_naming.create_subdivided_tile_name(
-                    coords.parent_row, coords.parent_col, i, j
-                )
-                subtile_path = os.path.join(output_dir, subtile_name)
-                subtile.save(subtile_path)
+            produced = set()
+            if previous and previous.get('md5') == fingerprint['md5']:
+                produced = set(previous.get('scales', []))
+            missing = [g for g in self.grid_sizes if g not in produced]
+
+            if not missing:
+                self.stats['skipped'] += 1
+                self.state[tile_name] = {**fingerprint, 'scales': previous['scales']}
+                continue
+
+            self.stats['regenerated'] += 1
+            self._pending[tile_name] = {**fingerprint, 'scales': sorted(produced)}
+            work_items.append((tile_path, self.output_dir, tuple(missing)))
+
+        # Clean up outputs whose source tile no longer exists
+        for tile_name in set(self.state) - set(tile_files):
+            self.remove_tile(tile_name)
+            self.stats['removed'] += 1
+
+        return work_items
+
+    def record_completed(self, completed_items):
+        """Record finished work items in the state file."""
+        for tile_path, _, grid_sizes in completed_items:
+            entry = self._pending.get(os.path.basename(tile_path))
+            if entry is not None:
+                entry['scales'] = sorted(set(entry['scales']) | set(grid_sizes))
+        for tile_name, entry in self._pending.items():
+            if entry['scales']:
+                self.state[tile_name] = entry
+        self._pending = {}
+        self.save_state()
+
+    def ensure_subdivided(self, tile_path, grid_sizes):
+        """
+        Produce the given scales of a tile on demand, decoding it once.
+
+        Returns the scales that were generated; scales already current are skipped.
+        """
+        tile_name = os.path.basename(tile_path)
+        previous = self.state.get(tile_name)
+        fingerprint = self._fingerprint(tile_path, previous)
+
+        produced = []
+        if previous and previous.get('md5') == fingerprint['md5']:
+            produced = previous.get('scales', [])
+        missing = [g for g in grid_sizes if g not in produced]
+        if not missing:
+            return []
+
+        subdivide_tile(tile_path, self.output_dir, missing)
+        self.state[tile_name] = {**fingerprint, 'scales': sorted(set(produced) | set(missing))}
+        return missing
+
+    def subdivide_tiles(self, tiles_dir, backend='thread', max_workers=None):
+        """Process out-of-date tiles with parallel execution."""
+        print(f"Starting subdivision process in: {tiles_dir}")
 
-def process_all_variations(project_path):
-    """Process all variations in the project."""
-    rendered_tiles_dir = os.path.join(project_path, "rendered-tiles")
+        work_items = self.build_work_items(tiles_dir)
+        if not work_items:
+            self.save_state()
+            print(f"Nothing to subdivide: {self.stats['skipped']} tiles up to date, "
+                  f"{self.stats['removed']} removed")
+            return
+
+        scheduler = WorkScheduler(backend, max_workers)
+        summary = scheduler.run(
+            subdivide_tile,
+            work_items,
+            desc="Subdividing tiles",
+            unit="tile",
+            cost=lambda item: sum(item[2])
+        )
+        self.record_completed(summary['completed_items'])
+        return summary
+
+def process_all_variations(project_path, backend='process', max_workers=None, tile_size=None):
+    """
+    Process all variations in the project on a single shared worker pool.
+
+    Only the scales listed in the project's subdivision_scales are produced.
+    Normalized tiles are subdivided when an ingest for tile_size exists.
+
+    Args:
+        project_path: Path to the project
+        backend: 'process' or 'thread' worker pool
+        max_workers: Worker count (default: CPU count - 1)
+        tile_size: rendered_tile_size the assembly will use (None accepts any ingest)
+    """
+    rendered_tiles_dir = get_assembly_tiles_dir(project_path, tile_size)
     subdivided_tiles_dir = os.path.join(project_path, "subdivided-tiles")
-    
+
     print(f"Processing variations in: {rendered_tiles_dir}")
-    
+
     # Get list of variation directories
-    variations = [d for d in os.listdir(rendered_tiles_dir) 
-                 if os.path.isdir(os.path.join(rendered_tiles_dir, d))]
-    
+    variations = list_variants(rendered_tiles_dir)
+
     if not variations:
         print("No variation directories found")
         return
-        
-    # Process each variation directory
-    for variation in tqdm(variations, desc="Processing variations"):
+
+    grid_sizes = get_subdivision_scales(project_path)
+    print(f"Subdivision scales: {', '.join(f'{g}x{g}' for g in grid_sizes)}")
+
+    # Flatten (variant, tile) work across every variation
+    work_items = []
+    subdividers = {}
+    for variation in variations:
         variation_path = os.path.join(rendered_tiles_dir, variation)
         output_dir = os.path.join(subdivided_tiles_dir, variation)
         os.makedirs(output_dir, exist_ok=True)
-        
-        # Create subdivider and process tiles
-        subdivider = TileSubdivider(output_dir)
-        subdivider.subdivide_tiles(variation_path)
+
+        subdivider = TileSubdivider(output_dir, grid_sizes)
+        subdividers[output_dir] = subdivider
+        work_items.extend(subdivider.build_work_items(variation_path))
+
+    scheduler = WorkScheduler(backend, max_workers)
+    summary = scheduler.run(
+        subdivide_tile,
+        work_items,
+        desc="Subdividing all variations",
+        unit="tile",
+        cost=lambda item: sum(item[2])  # More and larger grids produce more sub-tiles
+    )
+
+    completed_by_variant = {output_dir: [] for output_dir in subdividers}
+    for item in summary['completed_items']:
+        completed_by_variant[item[1]].append(item)
+    for output_dir, subdivider in subdividers.items():
+        subdivider.record_completed(completed_by_variant[output_dir])
+
+    skipped = sum(s.stats['skipped'] for s in subdividers.values())
+    regenerated = sum(s.stats['regenerated'] for s in subdividers.values())
+    removed = sum(s.stats['removed'] for s in subdividers.values())
+    print(f"Tiles skipped (up to date): {skipped}, regenerated: {regenerated}, "
+          f"removed (deleted sources): {removed}")
+    print(f"Subdivided {summary['completed']} tiles "
+          f"({sum(summary['results'])} sub-tiles), {summary['failed']} failed")
+    summary.update({'skipped': skipped, 'regenerated': regenerated, 'removed': removed})
+    return summary
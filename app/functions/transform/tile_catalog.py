@@ -0,0 +1,126 @@
+# transform/tile_catalog.py
+import os
+from ..base.tile_naming import TileNaming
+from ..base.tile_store import get_tile_source, list_variants, register_tiles
+
+class TileCatalog:
+    """
+    In-memory index of a project's rendered and subdivided tiles.
+
+    Each directory is listed once (a single scandir, or a packed container
+    index), after which parent and sub-tile lookups are dictionary hits with
+    no per-piece filesystem calls.
+    """
+
+    def __init__(self, rendered_tiles_dir, subdivided_tiles_dir=None):
+        self.rendered_tiles_dir = rendered_tiles_dir
+        self.subdivided_tiles_dir = subdivided_tiles_dir or os.path.join(
+            os.path.dirname(os.path.normpath(rendered_tiles_dir)), "subdivided-tiles"
+        )
+        self.tile_naming = TileNaming()
+        self._variants = None
+        self._parents = {}   # variant -> {(parent_row, parent_col): filename}
+        self._children = {}  # (variant, grid_size) -> {(parent_row, parent_col): {(child_row, child_col)}}
+
+    def refresh(self):
+        """Drop all indexes so the next lookup rescans."""
+        self._variants = None
+        self._parents = {}
+        self._children = {}
+
+    def variants(self):
+        """List variant names under rendered-tiles."""
+        if self._variants is None:
+            self._variants = list_variants(self.rendered_tiles_dir)
+        return list(self._variants)
+
+    def parent_tiles(self, variant):
+        """Map (parent_row, parent_col) to filename for a variant."""
+        if variant not in self._parents:
+            index = {}
+            source = get_tile_source(os.path.join(self.rendered_tiles_dir, variant))
+            for filename in source.names():
+                if not filename.endswith('.png'):
+                    continue
+                try:
+                    coords = self.tile_naming.parse_original_tile_name(filename)
+                except ValueError:
+                    continue
+                index[(coords.parent_row, coords.parent_col)] = filename
+            self._parents[variant] = index
+        return self._parents[variant]
+
+    def has_parent(self, variant, parent_row, parent_col):
+        """Check whether a variant has a tile at a grid position."""
+        return (parent_row, parent_col) in self.parent_tiles(variant)
+
+    def parent_path(self, variant, parent_row, parent_col):
+        """Get the rendered tile path for a grid position, or None."""
+        filename = self.parent_tiles(variant).get((parent_row, parent_col))
+        if filename is None:
+            return None
+        return os.path.join(self.rendered_tiles_dir, variant, filename)
+
+    def grid_dimensions(self, variant):
+        """Get (rows, cols) of a variant's grid from its tile positions."""
+        positions = self.parent_tiles(variant)
+        if not positions:
+            return 0, 0
+        return (max(row for row, _ in positions) + 1,
+                max(col for _, col in positions) + 1)
+
+    def scale_dir(self, variant, grid_size):
+        """Get the subdivided-tiles directory of a variant at one scale."""
+        return os.path.join(self.subdivided_tiles_dir, variant, f"{grid_size}x{grid_size}")
+
+    def _scale_index(self, variant, grid_size):
+        """Index the sub-tiles of one scale directory."""
+        key = (variant, grid_size)
+        if key not in self._children:
+            index = {}
+            source = get_tile_source(self.scale_dir(variant, grid_size))
+            for filename in source.names():
+                try:
+                    coords = self.tile_naming.parse_subdivided_tile_name(filename)
+                except ValueError:
+                    continue
+                index.setdefault((coords.parent_row, coords.parent_col), set()).add(
+                    (coords.child_row, coords.child_col)
+                )
+            self._children[key] = index
+        return self._children[key]
+
+    def children(self, variant, grid_size, parent_row, parent_col):
+        """Get the set of (child_row, child_col) sub-tiles available for a parent."""
+        return self._scale_index(variant, grid_size).get((parent_row, parent_col), set())
+
+    def has_child(self, variant, grid_size, parent_row, parent_col, child_row, child_col):
+        """Check whether a sub-tile exists."""
+        return (child_row, child_col) in self.children(variant, grid_size, parent_row, parent_col)
+
+    def add_parent(self, variant, filename):
+        """Record a rendered tile that appeared after the catalog was built."""
+        coords = self.tile_naming.parse_original_tile_name(filename)
+        self.parent_tiles(variant)[(coords.parent_row, coords.parent_col)] = filename
+        if self._variants is not None and variant not in self._variants:
+            self._variants.append(variant)
+            self._variants.sort()
+
+    def remove_parent(self, variant, filename):
+        """Forget a rendered tile and its sub-tiles."""
+        coords = self.tile_naming.parse_original_tile_name(filename)
+        positions = self.parent_tiles(variant)
+        if positions.get((coords.parent_row, coords.parent_col)) == filename:
+            del positions[(coords.parent_row, coords.parent_col)]
+        for (indexed_variant, _), index in self._children.items():
+            if indexed_variant == variant:
+                index.pop((coords.parent_row, coords.parent_col), None)
+
+    def add_children(self, variant, grid_size, parent_row, parent_col):
+        """Record a freshly subdivided parent tile at one scale."""
+        children = {(i, j) for i in range(grid_size) for j in range(grid_size)}
+        self._scale_index(variant, grid_size)[(parent_row, parent_col)] = children
+        register_tiles(self.scale_dir(variant, grid_size), [
+            self.tile_naming.create_subdivided_tile_name(parent_row, parent_col, i, j)
+            for i, j in children
+        ])
@@ -0,0 +1,71 @@
+# transform/virtual_subdivision.py
+from collections import OrderedDict
+from ..base.tile_store import read_tile
+
+def subtile_bounds(height, width, grid_size, child_row, child_col):
+    """Get (top, bottom, left, right) of a sub-tile, matching TileSubdivider crops."""
+    tile_height = height // grid_size
+    tile_width = width // grid_size
+    top = child_row * tile_height
+    left = child_col * tile_width
+    return top, top + tile_height, left, left + tile_width
+
+class VirtualSubdivider:
+    """Serves subdivided tiles as in-memory crops of decoded parent tiles.
+
+    Each parent tile is decoded once and kept in a bounded LRU cache, so
+    multi-scale assembly can slice sub-tiles as numpy views instead of
+    reading them back from subdivided-tiles.
+    """
+    DEFAULT_CACHE_BYTES = 1024 ** 3  # 1 GB of decoded parent tiles
+
+    def __init__(self, catalog, max_cache_bytes=DEFAULT_CACHE_BYTES):
+        self.catalog = catalog
+        self.max_cache_bytes = max_cache_bytes
+        self._cache = OrderedDict()  # (variant, parent_row, parent_col) -> ndarray
+        self._cache_bytes = 0
+
+    def has_parent(self, variant, parent_row, parent_col):
+        """Check whether a variant has a parent tile at the given position."""
+        return self.catalog.has_parent(variant, parent_row, parent_col)
+
+    def parent_path(self, variant, parent_row, parent_col):
+        """Get the rendered tile path for a parent position, or None."""
+        return self.catalog.parent_path(variant, parent_row, parent_col)
+
+    def load_parent(self, variant, parent_row, parent_col):
+        """Decode a parent tile, reusing the cached copy when available."""
+        key = (variant, parent_row, parent_col)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        parent_path = self.parent_path(variant, parent_row, parent_col)
+        if parent_path is None:
+            return None
+
+        parent = read_tile(parent_path)
+        if parent is None:
+            print(f"Could not read parent tile: {parent_path}")
+            return None
+
+        self._cache[key] = parent
+        self._cache_bytes += parent.nbytes
+        while self._cache_bytes > self.max_cache_bytes and len(self._cache) > 1:
+            _, evicted = self._cache.popitem(last=False)
+            self._cache_bytes -= evicted.nbytes
+        return parent
+
+    def get_subtile(self, variant, parent_row, parent_col, grid_size, child_row, child_col):
+        """Get a sub-tile as a view into its decoded parent tile."""
+        parent = self.load_parent(variant, parent_row, parent_col)
+        if parent is None:
+            return None
+        height, width = parent.shape[:2]
+        top, bottom, left, right = subtile_bounds(height, width, grid_size, child_row, child_col)
+        return parent[top:bottom, left:right]
+
+    def clear(self):
+        """Drop all cached parent tiles."""
+        self._cache.clear()
+        self._cache_bytes = 0
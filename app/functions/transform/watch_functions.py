@@ -0,0 +1,384 @@
+# transform/watch_functions.py
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import numpy as np
+import cv2
+from ..base.tile_naming import TileNaming
+from ..base.tile_store import invalidate_tile_sources, list_variants, read_tile, tile_exists
+from ..base.project_config import get_subdivision_scales
+from .ingest_functions import get_assembly_tiles_dir
+from .subdivision_functions import TileSubdivider
+from .tile_catalog import TileCatalog
+
+THUMBNAILS_DIR = "thumbnails"
+THUMBNAIL_SIZE = 128  # Thumbnail width in pixels
+PREVIEW_DIR = os.path.join("collage-out", "preview")
+
+# inotify(7) constants
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, name length
+
+# Finished writes and renames only; IN_CREATE on a file means it is still being written
+TILE_EVENTS = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE
+ROOT_EVENTS = TILE_EVENTS | IN_CREATE | IN_DELETE_SELF | IN_MOVE_SELF
+
+class InotifyWatcher:
+    """
+    Reports which variants of a rendered-tiles directory changed, using
+    Linux inotify through ctypes.
+
+    The root and every variant directory are watched; new variant
+    directories are picked up as they appear.
+    """
+    def __init__(self, rendered_tiles_dir):
+        if not sys.platform.startswith('linux'):
+            raise OSError("inotify is only available on Linux")
+        self.rendered_tiles_dir = rendered_tiles_dir
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        if not hasattr(self._libc, 'inotify_init1'):
+            raise OSError("libc has no inotify support")
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._watches = {}  # wd -> variant name, or None for the root
+        self._add_watch(rendered_tiles_dir, None, ROOT_EVENTS)
+        for variant in list_variants(rendered_tiles_dir):
+            if os.path.isdir(os.path.join(rendered_tiles_dir, variant)):
+                self._add_watch(os.path.join(rendered_tiles_dir, variant), variant, TILE_EVENTS)
+
+    def _add_watch(self, path, variant, mask):
+        """Watch a directory, reporting its events under variant."""
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), mask)
+        if wd < 0:
+            error = ctypes.get_errno()
+            if variant is None or error != errno.ENOENT:
+                raise OSError(error, f"inotify_add_watch failed for {path}: {os.strerror(error)}")
+            return
+        self._watches[wd] = variant
+
+    def wait(self, timeout=None):
+        """
+        Block until something changes or timeout seconds pass.
+
+        Returns the set of changed variant names, or None when every variant
+        should be rescanned (the event queue overflowed).
+        """
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        changed = set()
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b'\0')
+                offset += EVENT_HEADER.size + length
+
+                if mask & IN_Q_OVERFLOW:
+                    return None
+                if mask & IN_IGNORED:
+                    self._watches.pop(wd, None)
+                    continue
+                if wd not in self._watches:
+                    continue
+                variant = self._watches[wd]
+                if variant is not None:
+                    changed.add(variant)
+                elif mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                    raise OSError(f"{self.rendered_tiles_dir} was removed")
+                elif mask & IN_ISDIR:
+                    variant = os.fsdecode(name)
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        # Tiles may have landed before the watch was added; the rescan finds them
+                        self._add_watch(os.path.join(self.rendered_tiles_dir, variant), variant, TILE_EVENTS)
+                    changed.add(variant)
+        return changed
+
+    def close(self):
+        """Stop watching."""
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+class PollingWatcher:
+    """Portable fallback: rescans every variant every interval seconds."""
+    def __init__(self, rendered_tiles_dir, interval=2.0):
+        self.rendered_tiles_dir = rendered_tiles_dir
+        self.interval = interval
+
+    def wait(self, timeout=None):
+        """Sleep for the poll interval (or timeout, if shorter) and ask for a full rescan."""
+        time.sleep(self.interval if timeout is None else min(timeout, self.interval))
+        return None
+
+    def close(self):
+        pass
+
+def create_watcher(rendered_tiles_dir, backend='auto', interval=2.0):
+    """Create an inotify watcher, falling back to polling where inotify isn't available."""
+    if backend not in ('auto', 'inotify', 'polling'):
+        raise ValueError(f"Unknown watch backend '{backend}', expected 'auto', 'inotify' or 'polling'")
+    if backend != 'polling':
+        try:
+            watcher = InotifyWatcher(rendered_tiles_dir)
+            print(f"Watching {rendered_tiles_dir} with inotify")
+            return watcher
+        except OSError as e:
+            if backend == 'inotify':
+                raise
+            print(f"inotify unavailable ({e}), polling every {interval}s instead")
+    else:
+        print(f"Polling {rendered_tiles_dir} every {interval}s")
+    return PollingWatcher(rendered_tiles_dir, interval)
+
+class TileUpdater:
+    """
+    Keeps a project's catalog, thumbnails, subdivisions and (optionally)
+    preview assemblies in step with its rendered tiles, one tile at a time.
+
+    update() rescans only the variants it is given and processes only tiles
+    whose mtime or size changed since they were last seen. Tiles modified in
+    the last settle seconds are left for a later pass, so half-written files
+    are never read, and a tile that fails is only retried once it changes.
+    """
+    def __init__(self, project_path, tile_size=None, preview=False, settle=1.0, thumbnail_size=THUMBNAIL_SIZE):
+        self.project_path = project_path
+        self.tile_size = tile_size
+        self.preview = preview
+        self.settle = settle
+        self.thumbnail_size = thumbnail_size
+        self.rendered_tiles_dir = os.path.join(project_path, "rendered-tiles")
+        self.thumbnails_dir = os.path.join(project_path, THUMBNAILS_DIR)
+        self.catalog = TileCatalog(self.rendered_tiles_dir)
+        self.grid_sizes = get_subdivision_scales(project_path)
+        self.tile_naming = TileNaming()
+        self._known = {}  # variant -> {tile_name: (mtime_ns, size)}
+        self._failed = {}  # variant -> {tile_name: (mtime_ns, size) when it last failed}
+        self._subdividers = {}
+
+    def _subdivider(self, variant):
+        """Get the (cached) subdivider of a variant."""
+        if variant not in self._subdividers:
+            output_dir = os.path.join(self.catalog.subdivided_tiles_dir, variant)
+            self._subdividers[variant] = TileSubdivider(output_dir, self.grid_sizes)
+        return self._subdividers[variant]
+
+    def _scan(self, variant):
+        """List a variant's valid tiles as {name: (mtime_ns, size)}."""
+        tiles = {}
+        try:
+            with os.scandir(os.path.join(self.rendered_tiles_dir, variant)) as entries:
+                for entry in entries:
+                    if not entry.name.endswith('.png') or not entry.is_file():
+                        continue
+                    try:
+                        self.tile_naming.parse_original_tile_name(entry.name)
+                    except ValueError:
+                        continue
+                    stat = entry.stat()
+                    tiles[entry.name] = (stat.st_mtime_ns, stat.st_size)
+        except (FileNotFoundError, NotADirectoryError):
+            pass
+        return tiles
+
+    def update(self, variants=None):
+        """
+        Process changed and removed tiles of the given variants (default: all).
+
+        Returns the set of variants with tiles still settling, to pass back
+        in once settle seconds have gone by.
+        """
+        if variants is None:
+            variants = set(list_variants(self.rendered_tiles_dir)) | set(self._known) | set(self._failed)
+
+        cutoff = time.time_ns() - int(self.settle * 1e9)
+        unsettled = set()
+        changes = {}
+        for variant in sorted(variants):
+            known = self._known.get(variant, {})
+            failed_keys = self._failed.get(variant, {})
+            current = self._scan(variant)
+            changed = [name for name, key in current.items()
+                       if known.get(name) != key and failed_keys.get(name) != key]
+            ready = [name for name in changed if current[name][0] <= cutoff]
+            removed = [name for name in set(known) | set(failed_keys) if name not in current]
+            if len(ready) < len(changed):
+                unsettled.add(variant)
+            if ready or removed:
+                changes[variant] = (ready, removed, current)
+
+        if not changes:
+            return unsettled
+
+        # Re-ingests changed tiles first when subdivisions come from normalized tiles
+        source_dir = get_assembly_tiles_dir(self.project_path, self.tile_size)
+        invalidate_tile_sources()
+
+        for variant, (ready, removed, current) in changes.items():
+            start = time.perf_counter()
+            failed = self._apply(variant, ready, removed, os.path.join(source_dir, variant))
+            known = self._known.setdefault(variant, {})
+            failed_keys = self._failed.setdefault(variant, {})
+            for name in removed:
+                known.pop(name, None)
+                failed_keys.pop(name, None)
+            for name in ready:
+                if name in failed:  # Retried once the file changes again
+                    known.pop(name, None)
+                    failed_keys[name] = current[name]
+                else:
+                    known[name] = current[name]
+                    failed_keys.pop(name, None)
+            if not failed_keys:
+                del self._failed[variant]
+            if not known and not os.path.isdir(os.path.join(self.rendered_tiles_dir, variant)):
+                del self._known[variant]
+            if self.preview and known and (removed or len(ready) > len(failed)):
+                self.write_preview(variant)
+            print(f"{variant}: {len(ready) - len(failed)} tiles updated, {len(removed)} removed, "
+                  f"{len(failed)} failed in {time.perf_counter() - start:.2f}s")
+        return unsettled
+
+    def _apply(self, variant, ready, removed, source_dir):
+        """
+        Update the catalog, sub-tiles and thumbnails of one variant's changed tiles.
+
+        Returns the set of ready tile names that could not be processed.
+        """
+        subdivider = self._subdivider(variant)
+        thumbnail_dir = os.path.join(self.thumbnails_dir, variant)
+        failed = set()
+
+        for name in removed:
+            self.catalog.remove_parent(variant, name)
+            subdivider.remove_tile(name)
+            try:
+                os.remove(os.path.join(thumbnail_dir, name))
+            except FileNotFoundError:
+                pass
+
+        for name in ready:
+            try:
+                self.catalog.add_parent(variant, name)
+                coords = self.tile_naming.parse_original_tile_name(name)
+                source_path = os.path.join(source_dir, name)
+                if not tile_exists(source_path):
+                    # e.g. a tile the ingest rejected; it is re-ingested once it changes
+                    raise FileNotFoundError(f"Tile not found: {source_path}")
+                for grid_size in subdivider.ensure_subdivided(source_path, self.grid_sizes):
+                    self.catalog.add_children(variant, grid_size, coords.parent_row, coords.parent_col)
+                self.write_thumbnail(os.path.join(self.rendered_tiles_dir, variant, name),
+                                     os.path.join(thumbnail_dir, name))
+            except Exception as e:
+                print(f"Error updating {variant}/{name}: {e}")
+                failed.add(name)
+        subdivider.save_state()
+        return failed
+
+    def write_thumbnail(self, tile_path, thumbnail_path):
+        """Write a thumbnail_size-wide copy of a tile, unless an up-to-date one exists."""
+        try:
+            if os.stat(thumbnail_path).st_mtime_ns >= os.stat(tile_path).st_mtime_ns:
+                return
+        except FileNotFoundError:
+            pass
+        tile = read_tile(tile_path, cv2.IMREAD_COLOR)
+        if tile is None:
+            raise ValueError(f"Could not read tile: {tile_path}")
+        height, width = tile.shape[:2]
+        size = (self.thumbnail_size, max(1, round(height * self.thumbnail_size / width)))
+        os.makedirs(os.path.dirname(thumbnail_path), exist_ok=True)
+        _write_atomic(thumbnail_path, cv2.resize(tile, size, interpolation=cv2.INTER_AREA))
+
+    def write_preview(self, variant):
+        """Assemble a variant's thumbnails into collage-out/preview/<variant>.png."""
+        positions = self.catalog.parent_tiles(variant)
+        rows, cols = self.catalog.grid_dimensions(variant)
+        thumbnail_dir = os.path.join(self.thumbnails_dir, variant)
+
+        thumbnails = {}
+        for position, name in positions.items():
+            thumbnail_path = os.path.join(thumbnail_dir, name)
+            if not os.path.isfile(thumbnail_path):
+                continue  # Tile failed or not processed yet
+            thumbnail = cv2.imread(thumbnail_path, cv2.IMREAD_COLOR)
+            if thumbnail is not None:
+                thumbnails[position] = thumbnail
+        if not thumbnails:
+            return None
+
+        height, width = next(iter(thumbnails.values())).shape[:2]
+        canvas = np.zeros((rows * height, cols * width, 3), dtype=np.uint8)
+        for (row, col), thumbnail in thumbnails.items():
+            if thumbnail.shape[:2] != (height, width):
+                thumbnail = cv2.resize(thumbnail, (width, height), interpolation=cv2.INTER_AREA)
+            canvas[row * height:(row + 1) * height, col * width:(col + 1) * width] = thumbnail
+
+        preview_path = os.path.join(self.project_path, PREVIEW_DIR, f"{variant}.png")
+        os.makedirs(os.path.dirname(preview_path), exist_ok=True)
+        _write_atomic(preview_path, canvas)
+        return preview_path
+
+def _write_atomic(path, image):
+    """Write a PNG through a temporary file so readers never see a partial image."""
+    ok, data = cv2.imencode('.png', image)
+    if not ok:
+        raise IOError(f"Could not encode {path}")
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(data.tobytes())
+    os.replace(temp_path, path)
+
+def watch_project(project_path, tile_size=None, preview=False, backend='auto', interval=2.0, settle=1.0):
+    """
+    Watch a project's rendered-tiles and update it as tiles arrive, until interrupted.
+
+    Args:
+        project_path: Path to the project
+        tile_size: rendered_tile_size assemblies use (picks normalized tiles if ingested)
+        preview: Also rebuild a thumbnail preview assembly of each changed variant
+        backend: 'auto', 'inotify' or 'polling'
+        interval: Seconds between rescans when polling
+        settle: Seconds a tile must go unmodified before it is processed
+    """
+    rendered_tiles_dir = os.path.join(project_path, "rendered-tiles")
+    os.makedirs(rendered_tiles_dir, exist_ok=True)
+    watcher = create_watcher(rendered_tiles_dir, backend, interval)
+    updater = TileUpdater(project_path, tile_size, preview, settle)
+
+    print("Catching up on existing tiles...")
+    pending = updater.update()
+    print("Waiting for tiles (Ctrl+C to stop)")
+    try:
+        while True:
+            changed = watcher.wait(settle if pending else None)
+            if changed is None:
+                pending = updater.update()
+            elif changed or pending:
+                pending = updater.update(changed | pending)
+    except KeyboardInterrupt:
+        print("\nStopped watching")
+    finally:
+        watcher.close()
@@ -0,0 +1,117 @@
+import os
+import re
+import mmap
+import random
+import numpy as np
+
+# Bytes str.split() treats as whitespace in the ASCII range
+WHITESPACE = b' \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f'
+WORD_PATTERN = re.compile(b'[^' + re.escape(WHITESPACE) + b']+')
+FALLBACK_WORDS = ["DADA"]
+
+class WordDictionary:
+    """
+    Whitespace-separated words of a dictionary file, memory-mapped once.
+
+    Only the byte offset of each word's first character is kept in memory,
+    so a random word is an index lookup plus a short match in the mapped
+    file, without building a list of every word.
+    """
+    INDEX_CHUNK_BYTES = 16 * 1024 ** 2  # Bytes scanned per step while indexing
+
+    def __init__(self, dictionary_path):
+        self.dictionary_path = dictionary_path
+        self._file = None
+        self._map = None
+        self._starts = None
+        self._fallback = None
+        self.key = None  # (mtime, size) the index was built from
+
+        try:
+            stat = os.stat(dictionary_path)
+            self.key = (stat.st_mtime_ns, stat.st_size)
+            if stat.st_size:
+                self._file = open(dictionary_path, 'rb')
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                self._starts = self._index_word_starts(self._map)
+        except Exception as e:
+            print(f"Error loading dictionary: {e}")
+            self._use_fallback()
+            return
+
+        if self._starts is None or not len(self._starts):
+            print("No words found in dictionary")
+            self._use_fallback()
+            return
+        print(f"Loaded {len(self._starts)} words from dictionary")
+
+    def _use_fallback(self):
+        """Serve the fallback word list instead of the file."""
+        self.close()
+        self._starts = None
+        self._fallback = FALLBACK_WORDS
+
+    @classmethod
+    def _index_word_starts(cls, buffer):
+        """Get the offset of every word's first byte, scanning the file in chunks."""
+        data = np.frombuffer(buffer, dtype=np.uint8)
+        is_space = np.zeros(256, dtype=bool)
+        is_space[list(WHITESPACE)] = True
+        dtype = np.uint32 if len(data) < 2 ** 32 else np.uint64
+
+        starts = []
+        previous_space = True
+        for offset in range(0, len(data), cls.INDEX_CHUNK_BYTES):
+            space = is_space[data[offset:offset + cls.INDEX_CHUNK_BYTES]]
+            before = np.empty_like(space)
+            before[0] = previous_space
+            before[1:] = space[:-1]
+            starts.append((np.flatnonzero(~space & before) + offset).astype(dtype))
+            previous_space = space[-1]
+        del data  # Release the buffer so the map can be closed
+        return np.concatenate(starts)
+
+    def __len__(self):
+        return len(self._fallback) if self._fallback is not None else len(self._starts)
+
+    def __getitem__(self, index):
+        if self._fallback is not None:
+            return self._fallback[index]
+        start = int(self._starts[index])
+        return WORD_PATTERN.match(self._map, start).group().decode('utf-8', errors='replace')
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def choice(self):
+        """Pick a random word (same RNG use as random.choice on a word list)."""
+        return self[random.randrange(len(self))]
+
+    def close(self):
+        """Unmap the dictionary file."""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+_dictionaries = {}
+
+def get_word_dictionary(dictionary_path):
+    """Get the shared dictionary for a path, re-indexing it only if the file changed."""
+    dictionary_path = os.path.abspath(dictionary_path)
+    dictionary = _dictionaries.get(dictionary_path)
+    if dictionary is not None:
+        try:
+            stat = os.stat(dictionary_path)
+            key = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            key = None
+        if key == dictionary.key:
+            return dictionary
+        dictionary.close()
+    dictionary = WordDictionary(dictionary_path)
+    _dictionaries[dictionary_path] = dictionary
+    return dictionary
@@ -0,0 +1,304 @@
+# app/ui/cli.py
+"""
+Non-interactive Paneful commands and a job-file runner.
+
+Usage:
+    python main.py slice <project> --grid-size 10
+    python main.py multi-scale <project> --runs 3 --seed 42
+    python main.py run-jobs jobs.yaml --concurrency 2
+    python main.py watch <project> --preview
+
+Projects are directories, or names under projects_dir from settings.cfg.
+All jobs run in one process, so tile pools, fonts, the word dictionary and
+ControlNet models loaded by one job stay warm for the next.
+"""
+import argparse
+import inspect
+import json
+import os
+import random
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from ..functions.base.settings import load_settings
+from ..functions.base.profiler import profile_action
+from ..functions.program_functions import load_project_config, create_dadaist_collage_with_words
+from ..functions.transform import Assembler
+from ..functions.transform.ingest_functions import get_assembly_tiles_dir, ingest_rendered_tiles
+from ..functions.transform.subdivision_functions import process_all_variations
+from ..functions.transform.watch_functions import watch_project
+
+DEFAULT_DICTIONARY_PATH = 'meaningless-words/dictionary.txt'
+
+def slice_project(project_path, settings, grid_size=10):
+    """Slice the base image into a grid_size x grid_size grid."""
+    # Imported here so the other commands run without torch installed
+    from ..functions.base.slicer import slice_and_save
+    if grid_size < 1:
+        raise ValueError("grid_size must be at least 1")
+    slice_and_save(project_path, grid_size)
+
+def subdivide_project(project_path, settings, backend='process', max_workers=None):
+    """Subdivide every variant for multi-scale assembly."""
+    process_all_variations(project_path, backend=backend, max_workers=max_workers,
+                           tile_size=settings['rendered_tile_size'])
+
+def ingest_project(project_path, settings, tile_size=None, backend='process', max_workers=None):
+    """Normalize rendered tiles to tile_size (default: rendered_tile_size)."""
+    ingest_rendered_tiles(project_path, tile_size or settings['rendered_tile_size'], backend, max_workers)
+
+def _assembler(project_path, settings):
+    """Create an Assembler reading the tiles the menus would use."""
+    project_config = load_project_config(project_path)
+    rendered_tiles_dir = get_assembly_tiles_dir(project_path, settings['rendered_tile_size'])
+    return Assembler(project_config['name'], rendered_tiles_dir, os.path.join(project_path, "collage-out"))
+
+def restore_project(project_path, settings):
+    """Rebuild the exact assembly of every variant."""
+    _assembler(project_path, settings).assemble(strategy='exact')
+
+def random_assembly(project_path, settings, runs=1):
+    """Create runs random assemblies."""
+    _assembler(project_path, settings).assemble(strategy='random', run_number=runs)
+
+def multi_scale_assembly(project_path, settings, runs=1, exported=False):
+    """Create runs multi-scale assemblies, from exported sub-tiles if exported."""
+    assembler = _assembler(project_path, settings)
+    assembler.set_multi_scale_strategy(project_path, virtual=not exported)
+    assembler.assemble(strategy='multi-scale', run_number=runs)
+
+def dadaist_collage(project_path, settings, words=10, dictionary=DEFAULT_DICTIONARY_PATH, runs=1):
+    """Create runs Dadaist collages with words words each."""
+    for _ in range(runs):
+        create_dadaist_collage_with_words(project_path, words, dictionary)
+
+OPERATIONS = {
+    'slice': slice_project,
+    'subdivide': subdivide_project,
+    'ingest': ingest_project,
+    'restore': restore_project,
+    'random': random_assembly,
+    'multi-scale': multi_scale_assembly,
+    'dadaism': dadaist_collage
+}
+COMMANDS = set(OPERATIONS) | {'run-jobs', 'watch'}
+
+def resolve_project(project, settings):
+    """Get a project's path from a directory or a name under projects_dir."""
+    for candidate in (project, os.path.join(settings['projects_dir'], project)):
+        if os.path.isdir(candidate):
+            return os.path.abspath(candidate)
+    raise ValueError(f"Project not found: {project}")
+
+def run_operation(project_path, settings, operation, params=None):
+    """Run one operation on a project; params may include a seed for the RNGs."""
+    params = dict(params or {})
+    seed = params.pop('seed', None)
+    if seed is not None:
+        random.seed(seed)
+        np.random.seed(seed)
+    print(f"\n=== {operation}: {project_path} ===")
+    with profile_action(project_path, operation, settings['profile']):
+        OPERATIONS[operation](project_path, settings, **params)
+
+def parse_operation(entry):
+    """Turn a job file operation (a name, or a one-key mapping of name to parameters) into (name, params)."""
+    if isinstance(entry, str):
+        name, params = entry, {}
+    elif isinstance(entry, dict) and len(entry) == 1:
+        name, params = next(iter(entry.items()))
+        params = params or {}
+    else:
+        raise ValueError(f"Invalid operation entry: {entry!r}")
+    if name not in OPERATIONS:
+        raise ValueError(f"Unknown operation '{name}', expected one of: {', '.join(OPERATIONS)}")
+    if not isinstance(params, dict):
+        raise ValueError(f"Parameters of '{name}' must be a mapping, got {params!r}")
+    params = {key.replace('-', '_'): value for key, value in params.items()}
+    if 'workers' in params:  # Same name as the command-line option
+        params['max_workers'] = params.pop('workers')
+    # Everything after (project_path, settings), plus the seed run_operation takes
+    accepted = list(inspect.signature(OPERATIONS[name]).parameters)[2:] + ['seed']
+    unknown = [key for key in params if key not in accepted]
+    if unknown:
+        raise ValueError(f"Unknown parameter(s) for '{name}': {', '.join(unknown)} "
+                         f"(expected: {', '.join(accepted)})")
+    return name, params
+
+def load_job_file(path):
+    """
+    Load a YAML or JSON job file.
+
+    Returns (jobs, options): jobs is a list of (project, [(operation,
+    params), ...]) and options holds the optional top-level concurrency and
+    settings overrides. Every entry is validated before anything runs.
+    """
+    with open(path, 'r') as f:
+        if path.lower().endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError("YAML job files need PyYAML (pip install pyyaml); JSON job files work without it")
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+
+    if isinstance(data, list):
+        data = {'jobs': data}
+    if not isinstance(data, dict) or not isinstance(data.get('jobs'), list):
+        raise ValueError("Job file needs a 'jobs' list")
+
+    jobs = []
+    for job in data['jobs']:
+        if not isinstance(job, dict) or 'project' not in job:
+            raise ValueError(f"Job needs a 'project': {job!r}")
+        operations = job.get('operations', [])
+        if isinstance(operations, (str, dict)):
+            operations = [operations]
+        jobs.append((str(job['project']), [parse_operation(entry) for entry in operations]))
+
+    options = {
+        'concurrency': data.get('concurrency'),
+        'settings': data.get('settings') or {}
+    }
+    return jobs, options
+
+def run_jobs(jobs, settings, concurrency=1):
+    """
+    Run jobs, one project per worker thread.
+
+    Operations on the same project run in job file order, and a failed
+    operation skips the rest of its project. Different projects run
+    concurrently and share this process's caches.
+
+    Returns:
+        dict: completed operation count and (project, operation, error) failures
+    """
+    # Merge jobs that name the same project so its operations stay in order
+    by_project = {}
+    for project, operations in jobs:
+        by_project.setdefault(resolve_project(project, settings), []).extend(operations)
+
+    summary = {'completed': 0, 'failed': []}
+    lock = threading.Lock()
+
+    def run_project(project_path, operations):
+        for operation, params in operations:
+            try:
+                run_operation(project_path, settings, operation, params)
+                with lock:
+                    summary['completed'] += 1
+            except Exception as e:
+                print(f"Error in {operation} for {project_path}: {e}")
+                with lock:
+                    summary['failed'].append((project_path, operation, str(e)))
+                return
+
+    if concurrency > 1 and any('seed' in params for ops in by_project.values() for _, params in ops):
+        print("Warning: concurrent projects share the global RNG, so seeded runs are only reproducible "
+              "with concurrency 1")
+
+    if concurrency > 1 and settings['profile']:
+        # Only one operation can be profiled at a time, and tracemalloc would count every thread's memory
+        print("Profiling runs one project at a time, ignoring concurrency")
+        concurrency = 1
+
+    if concurrency <= 1 or len(by_project) <= 1:
+        for project_path, operations in by_project.items():
+            run_project(project_path, operations)
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for future in [executor.submit(run_project, p, ops) for p, ops in by_project.items()]:
+                future.result()
+
+    print(f"\nCompleted {summary['completed']} operations, {len(summary['failed'])} failed")
+    for project_path, operation, error in summary['failed']:
+        print(f"  {os.path.basename(project_path)} {operation}: {error}")
+    return summary
+
+def build_parser():
+    """Build the argument parser for every command."""
+    parser = argparse.ArgumentParser(prog="paneful", description="Run Paneful operations without the menus")
+    parser.add_argument('--profile', action='store_true', help="Profile each operation into <project>/profiles")
+    parser.add_argument('--rendered-tile-size', type=int, help="Override rendered_tile_size from settings.cfg")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def project_command(name, help_text):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument('project', help="Project directory or name under projects_dir")
+        command.add_argument('--seed', type=int, help="Seed the random number generators")
+        return command
+
+    command = project_command('slice', "Slice the base image into tiles")
+    command.add_argument('--grid-size', type=int, default=10, help="Tiles per row and column")
+
+    command = project_command('subdivide', "Subdivide tiles for multi-scale assembly")
+    command.add_argument('--backend', choices=['process', 'thread'], default='process', help="Worker backend")
+    command.add_argument('--workers', dest='max_workers', type=int, help="Worker count")
+
+    command = project_command('ingest', "Normalize rendered tiles")
+    command.add_argument('--tile-size', type=int, help="Tile size (default: rendered_tile_size)")
+    command.add_argument('--backend', choices=['process', 'thread'], default='process', help="Worker backend")
+    command.add_argument('--workers', dest='max_workers', type=int, help="Worker count")
+
+    project_command('restore', "Rebuild the exact assembly of every variant")
+
+    command = project_command('random', "Create random assemblies")
+    command.add_argument('--runs', type=int, default=1, help="Number of assemblies")
+
+    command = project_command('multi-scale', "Create multi-scale assemblies")
+    command.add_argument('--runs', type=int, default=1, help="Number of assemblies")
+    command.add_argument('--exported', action='store_true', help="Use exported subdivided tiles instead of in-memory crops")
+
+    command = project_command('dadaism', "Create Dadaist collages with words")
+    command.add_argument('--words', type=int, default=10, help="Words per collage")
+    command.add_argument('--dictionary', default=DEFAULT_DICTIONARY_PATH, help="Word list to draw from")
+    command.add_argument('--runs', type=int, default=1, help="Number of collages")
+
+    command = commands.add_parser('run-jobs', help="Run a YAML or JSON job file")
+    command.add_argument('job_file', help="Job file listing projects and operations")
+    command.add_argument('--concurrency', type=int, help="Projects run at once (default: the file's, or 1)")
+
+    command = commands.add_parser('watch', help="Update subdivisions and thumbnails as rendered tiles arrive")
+    command.add_argument('project', help="Project directory or name under projects_dir")
+    command.add_argument('--preview', action='store_true', help="Also rebuild a preview assembly of changed variants")
+    command.add_argument('--backend', choices=['auto', 'inotify', 'polling'], default='auto',
+                         help="Change detection (default: inotify, polling where unavailable)")
+    command.add_argument('--interval', type=float, default=2.0, help="Seconds between rescans when polling")
+    command.add_argument('--settle', type=float, default=1.0,
+                         help="Seconds a tile must go unmodified before it is processed")
+    return parser
+
+def main(argv=None):
+    """Run a command and return the process exit status."""
+    args = build_parser().parse_args(argv)
+    settings = load_settings()
+    if args.profile:
+        settings['profile'] = True
+    if args.rendered_tile_size:
+        settings['rendered_tile_size'] = args.rendered_tile_size
+
+    try:
+        if args.command == 'run-jobs':
+            jobs, options = load_job_file(args.job_file)
+            settings.update(options['settings'])
+            concurrency = args.concurrency or options['concurrency'] or 1
+            summary = run_jobs(jobs, settings, concurrency)
+            return 1 if summary['failed'] else 0
+
+        if args.command == 'watch':
+            watch_project(resolve_project(args.project, settings), settings['rendered_tile_size'],
+                          args.preview, args.backend, args.interval, args.settle)
+            return 0
+
+        params = {key: value for key, value in vars(args).items()
+                  if key not in ('command', 'project', 'profile', 'rendered_tile_size')}
+        run_operation(resolve_project(args.project, settings), settings, args.command, params)
+        return 0
+    except Exception as e:
+        print(f"Error: {e}")
+        return 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,6 +2,7 @@ import os
 import logging
 from ..functions.transform.subdivision_functions import process_all_variations
 from ..functions.transform import Assembler
+from ..functions.transform.ingest_functions import get_assembly_tiles_dir, ingest_rendered_tiles
 from ..functions.program_functions import (
     create_new_project,
     scan_for_projects,
@@ -10,6 +11,8 @@ from ..functions.program_functions import (
     reset_project_config
 )
 from ..functions.base.slicer import slice_and_save
+from ..functions.base.tile_store import pack_project, unpack_project
+from ..functions.base.profiler import profile_action
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s: %(message)s')
 
@@ -29,6 +32,9 @@ def display_project_menu(project_name):
     print("3. Subdivide Tiles for Multi-Scale Assembly")
     print("4. Random Assembly Options")
     print("5. Reset Project Config")
+    print("6. Pack Tiles into Tile Store")
+    print("7. Unpack Tile Store to Directories")
+    print("8. Ingest and Normalize Rendered Tiles")
     print("0. Back to Main Menu")
     return input("Select an option: ")
 
@@ -49,7 +55,7 @@ def display_random_assembly_menu():
     print("0. Back to Project Menu")
     return input("Select an option: ")
 
-def handle_random_assembly_menu(project_path):
+def handle_random_assembly_menu(project_path, settings):
     """Handle random assembly submenu."""
     while True:
         try:
@@ -60,14 +66,15 @@ def handle_random_assembly_menu(project_path):
                 
             project_config = load_project_config(project_path)
             project_name = project_config['name']
-            rendered_tiles_dir = os.path.join(project_path, "rendered-tiles")
+            rendered_tiles_dir = get_assembly_tiles_dir(project_path, settings['rendered_tile_size'])
             collage_out_dir = os.path.join(project_path, "collage-out")
             
             if choice == '1':  # Basic Random Assembly
                 try:
                     run_number = int(input("How many variants to generate? (default: 1) ") or "1")
-                    assembler = Assembler(project_name, rendered_tiles_dir, collage_out_dir)
-                    assembler.assemble(strategy='random', run_number=run_number)
+                    with profile_action(project_path, 'random-assembly', settings['profile']):
+                        assembler = Assembler(project_name, rendered_tiles_dir, collage_out_dir)
+                        assembler.assemble(strategy='random', run_number=run_number)
                     print("Random assembly completed successfully")
                 except Exception as e:
                     print(f"Error during random assembly: {e}")
@@ -76,16 +83,19 @@ def handle_random_assembly_menu(project_path):
                 try:
                     word_count = int(input("How many words to place (default 10)? ") or "10")
                     dictionary_path = input("Enter dictionary path (press Enter for default): ").strip() or 'meaningless-words/dictionary.txt'
-                    create_dadaist_collage_with_words(project_path, word_count, dictionary_path)
+                    with profile_action(project_path, 'dadaist-collage', settings['profile']):
+                        create_dadaist_collage_with_words(project_path, word_count, dictionary_path)
                 except Exception as e:
                     print(f"Error creating Dadaist collage: {e}")
                 
             elif choice == '3':  # Multi-scale Assembly
                 try:
                     run_number = int(input("How many variants to generate? (default: 1) ") or "1")
-                    assembler = Assembler(project_name, rendered_tiles_dir, collage_out_dir)
-                    assembler.set_multi_scale_strategy(project_path)
-                    assembler.assemble(strategy='multi-scale', run_number=run_number)
+                    use_exported = input("Use exported subdivided tiles instead of in-memory crops? (y/N) ").strip().lower() == 'y'
+                    with profile_action(project_path, 'multi-scale-assembly', settings['profile']):
+                        assembler = Assembler(project_name, rendered_tiles_dir, collage_out_dir)
+                        assembler.set_multi_scale_strategy(project_path, virtual=not use_exported)
+                        assembler.assemble(strategy='multi-scale', run_number=run_number)
                     print("Multi-scale assembly completed successfully")
                 except Exception as e:
                     print(f"Error during multi-scale assembly: {e}")
@@ -101,7 +111,7 @@ def handle_random_assembly_menu(project_path):
             print(f"\nError: {e}")
             print("Returning to menu...")
 
-def handle_project_menu(project_path):
+def handle_project_menu(project_path, settings):
     """Handle project menu logic."""
     while True:
         try:
@@ -118,42 +128,76 @@ def handle_project_menu(project_path):
                     if grid_size < 1:
                         print("Grid size must be at least 1. Using default size of 10.")
                         grid_size = 10
-                    slice_and_save(project_path, grid_size)
+                    with profile_action(project_path, 'slice', settings['profile']):
+                        slice_and_save(project_path, grid_size)
                     print("Slicing operation completed successfully")
                 except Exception as e:
                     print(f"Error during slicing: {e}")
                 
             elif choice == '2':  # Fix/Restore Tiles
                 try:
-                    rendered_tiles_dir = os.path.join(project_path, "rendered-tiles")
+                    rendered_tiles_dir = get_assembly_tiles_dir(project_path, settings['rendered_tile_size'])
                     collage_out_dir = os.path.join(project_path, "collage-out")
-                    assembler = Assembler(project_config['name'], rendered_tiles_dir, collage_out_dir)
-                    assembler.assemble(strategy='exact')
+                    with profile_action(project_path, 'restore', settings['profile']):
+                        assembler = Assembler(project_config['name'], rendered_tiles_dir, collage_out_dir)
+                        assembler.assemble(strategy='exact')
                     print("Restore operation completed successfully")
                 except Exception as e:
                     print(f"Error during restore: {e}")
                 
             elif choice == '3':  # Subdivide Tiles
                 try:
+                    backend = input("Worker backend - process or thread (default: process): ").strip().lower() or 'process'
                     print("Starting processing of all variations...")
-                    process_all_variations(project_path)
+                    with profile_action(project_path, 'subdivide', settings['profile']):
+                        process_all_variations(project_path, backend=backend, tile_size=settings['rendered_tile_size'])
                     print("Successfully processed all variations")
                 except Exception as e:
                     logging.error(f"Error processing variations: {e}")
                     print(f"Error during subdivision: {e}")
                 
             elif choice == '4':  # Random Assembly Options
-                handle_random_assembly_menu(project_path)
+                handle_random_assembly_menu(project_path, settings)
                 
             elif choice == '5':  # Reset Project Config
                 try:
-                    if reset_project_config(project_path):
+                    with profile_action(project_path, 'reset-config', settings['profile']):
+                        reset = reset_project_config(project_path)
+                    if reset:
                         print("Project configuration has been reset to defaults")
                     else:
                         print("Failed to reset project configuration")
                 except Exception as e:
                     print(f"Error resetting configuration: {e}")
             
+            elif choice == '6':  # Pack Tiles
+                try:
+                    codec = input("Compression - raw or zlib (default: raw): ").strip().lower() or 'raw'
+                    remove_sources = input("Remove packed PNG files afterwards? (y/N) ").strip().lower() == 'y'
+                    with profile_action(project_path, 'pack', settings['profile']):
+                        count = pack_project(project_path, codec=codec, remove_sources=remove_sources)
+                    print(f"Packed {count} tiles")
+                except Exception as e:
+                    print(f"Error packing tiles: {e}")
+            
+            elif choice == '7':  # Unpack Tile Store
+                try:
+                    remove_containers = input("Remove tile store containers afterwards? (y/N) ").strip().lower() == 'y'
+                    with profile_action(project_path, 'unpack', settings['profile']):
+                        count = unpack_project(project_path, remove_containers=remove_containers)
+                    print(f"Exported {count} tiles")
+                except Exception as e:
+                    print(f"Error unpacking tiles: {e}")
+            
+            elif choice == '8':  # Ingest Rendered Tiles
+                try:
+                    tile_size = settings['rendered_tile_size']
+                    print(f"Normalizing rendered tiles to {tile_size}px...")
+                    with profile_action(project_path, 'ingest', settings['profile']):
+                        ingest_rendered_tiles(project_path, tile_size)
+                except Exception as e:
+                    print(f"Error ingesting tiles: {e}")
+            
             else:
                 print("Invalid option selected")
                 
@@ -185,7 +229,8 @@ def handle_main_menu(settings):
                 
             elif choice == '2':  # List Projects
                 try:
-                    projects = scan_for_projects(projects_dir)
+                    with profile_action(projects_dir, 'list-projects', settings['profile']):
+                        projects = scan_for_projects(projects_dir)
                     if not projects:
                         continue
                         
@@ -195,7 +240,7 @@ def handle_main_menu(settings):
                         continue
                         
                     if project_choice.isdigit() and 1 <= int(project_choice) <= len(projects):
-                        handle_project_menu(projects[int(project_choice) - 1])
+                        handle_project_menu(projects[int(project_choice) - 1], settings)
                     else:
                         print("Invalid project selection")
                 except Exception as e:
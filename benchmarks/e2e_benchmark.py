@@ -0,0 +1,253 @@
+# benchmarks/e2e_benchmark.py
+"""
+End-to-end timings of the Paneful pipeline on a synthetic project:
+slicing (ControlNet stubbed), subdivision, every Assembler strategy,
+Dadaism, word placement and OutputManager.save_assembly.
+
+Results are written as JSON and checked against a baseline; a stage slower
+than its baseline time by more than its threshold counts as a regression
+and the run exits with status 1.
+
+Usage: python -m benchmarks.e2e_benchmark [--grid 4] [--tile-size 256] [--variants 3] [--words 10]
+                                          [--baseline benchmarks/e2e-baseline.json] [--update-baseline]
+"""
+import argparse
+import contextlib
+import json
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import types
+from datetime import datetime
+import numpy as np
+import cv2
+from .synthetic_project import make_project
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app')
+FONTS_DIR = os.path.join(APP_DIR, 'fonts')
+DICTIONARY_PATH = os.path.join(APP_DIR, 'meaningless-words', 'dictionary.txt')
+DEFAULT_BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'e2e-baseline.json')
+DEFAULT_THRESHOLD = 0.25  # Allowed slowdown over the baseline (0.25 = 25%)
+MIN_REGRESSION_SECONDS = 0.05  # Slowdowns smaller than this are timer noise
+
+class StubMapGenerator:
+    """Stands in for the ControlNet map generators, so slicing is timed without models."""
+    def __init__(self, project_path):
+        self.project_path = project_path
+
+    def generate_map(self, image_path):
+        return None
+
+def import_slicer():
+    """Import the slicer with the ControlNet generators replaced by StubMapGenerator."""
+    # Depth and normal maps import torch at module level; stub them before the slicer imports them
+    for module_name in ('canny', 'depth', 'normals'):
+        full_name = f'app.functions.controlnet.{module_name}'
+        if full_name not in sys.modules:
+            stub = types.ModuleType(full_name)
+            stub.CannyMapGenerator = stub.DepthMapGenerator = stub.NormalMapGenerator = StubMapGenerator
+            sys.modules[full_name] = stub
+
+    from app.functions.base import slicer
+    slicer.CannyMapGenerator = slicer.DepthMapGenerator = slicer.NormalMapGenerator = StubMapGenerator
+    return slicer
+
+def build_stages(project_path, grid_size, word_count):
+    """
+    Get the (name, function, setup) stages to time, in pipeline order.
+
+    setup (or None) runs untimed before every repeat. The subdivision
+    stages start from an empty subdivided-tiles each time, since the
+    subdivision state would otherwise make every repeat after the first
+    a no-op.
+    """
+    from app.functions.transform.assembler import Assembler
+    from app.functions.transform.output_manager import OutputManager
+    from app.functions.transform.subdivision_functions import process_all_variations
+    from app.functions.program_functions import run_dadaism
+    from app.functions.layering_functions import draw_words
+    from app.functions.overlay.placement import PlacementEngine
+    slicer = import_slicer()
+
+    project_name = os.path.basename(project_path)
+    rendered_tiles_dir = os.path.join(project_path, "rendered-tiles")
+    collage_out_dir = os.path.join(project_path, "collage-out")
+    subdivided_tiles_dir = os.path.join(project_path, "subdivided-tiles")
+
+    def assemble(strategy, virtual=True):
+        assembler = Assembler(project_name, rendered_tiles_dir, collage_out_dir)
+        if strategy == 'multi-scale':
+            assembler.set_multi_scale_strategy(project_path, virtual=virtual)
+        assembler.assemble(strategy=strategy, run_number=1)
+
+    # Word placement and saving start from the same Dadaist canvas
+    random.seed(0)
+    canvas = run_dadaism(project_name, rendered_tiles_dir, collage_out_dir, FONTS_DIR, return_image=True)
+
+    def clear_subdivisions():
+        # Removes the sub-tiles together with each variant's .subdivision-state.json
+        shutil.rmtree(subdivided_tiles_dir, ignore_errors=True)
+        os.makedirs(subdivided_tiles_dir)
+
+    def place_words():
+        placement = PlacementEngine.from_image(canvas)
+        draw_words(canvas, word_count, FONTS_DIR, DICTIONARY_PATH, placement=placement)
+
+    def save_assembly():
+        image = cv2.cvtColor(np.asarray(canvas), cv2.COLOR_RGBA2BGR)
+        OutputManager(project_name, collage_out_dir).save_assembly(
+            image, 'variant-00', strategy='random', run_number=1, assembly_data={'project_name': project_name}
+        )
+
+    return [
+        ('slice_and_save', lambda: slicer.slice_and_save(project_path, grid_size), None),
+        ('process_all_variations', lambda: process_all_variations(project_path), clear_subdivisions),
+        ('assemble_exact', lambda: assemble('exact'), None),
+        ('assemble_random', lambda: assemble('random'), None),
+        ('assemble_multi_scale', lambda: assemble('multi-scale'), None),
+        # Exports the sampled sub-tiles on demand
+        ('assemble_multi_scale_exported', lambda: assemble('multi-scale', virtual=False), clear_subdivisions),
+        ('run_dadaism', lambda: run_dadaism(project_name, rendered_tiles_dir, collage_out_dir, FONTS_DIR), None),
+        ('draw_words', place_words, None),
+        ('save_assembly', save_assembly, None)
+    ]
+
+def silenced(quiet):
+    """Context manager sending stdout to /dev/null when quiet."""
+    if not quiet:
+        return contextlib.nullcontext()
+    stack = contextlib.ExitStack()
+    stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, 'w'))))
+    return stack
+
+def time_stage(func, repeat, seed, quiet, setup=None):
+    """Best-of-repeat wall time of func(), running setup and reseeding the RNGs before every run."""
+    best = math.inf
+    for _ in range(repeat):
+        random.seed(seed)
+        np.random.seed(seed)
+        with silenced(quiet):
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - start)
+    return best
+
+def load_baseline(path):
+    """Load a baseline file, or None if there isn't one."""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Error loading baseline {path}: {e}")
+        return None
+
+def compare(results, baseline, default_threshold=DEFAULT_THRESHOLD):
+    """
+    Check results against a baseline.
+
+    Returns a list of (stage, seconds, baseline seconds, allowed seconds)
+    for every stage over its threshold (and over MIN_REGRESSION_SECONDS
+    slower). Baselines recorded with a different
+    project configuration are not compared.
+    """
+    if baseline['config'] != results['config']:
+        print("Baseline was recorded with a different configuration, skipping comparison")
+        return []
+
+    thresholds = baseline.get('thresholds', {})
+    regressions = []
+    print(f"\n{'stage':<30} {'baseline':>9} {'current':>9} {'change':>8}")
+    for stage, seconds in results['stages'].items():
+        reference = baseline['stages'].get(stage)
+        if reference is None:
+            print(f"{stage:<30} {'-':>9} {seconds:8.3f}s")
+            continue
+        allowed = max(reference * (1 + thresholds.get(stage, default_threshold)), reference + MIN_REGRESSION_SECONDS)
+        change = (seconds - reference) / reference if reference else 0.0
+        flag = "  REGRESSION" if seconds > allowed else ""
+        print(f"{stage:<30} {reference:8.3f}s {seconds:8.3f}s {change:+7.1%}{flag}")
+        if seconds > allowed:
+            regressions.append((stage, seconds, reference, allowed))
+    return regressions
+
+def run(grid_size=4, tile_size=256, variants=3, word_count=10, seed=0, repeat=1, workdir=None, quiet=True):
+    """Build a synthetic project, time every stage on it and return the results dict."""
+    config = {
+        'grid_size': grid_size,
+        'tile_size': tile_size,
+        'variants': variants,
+        'word_count': word_count,
+        'seed': seed
+    }
+    root = workdir or tempfile.mkdtemp(prefix='paneful-bench-')
+    try:
+        project_path = make_project(root, grid_size=grid_size, tile_size=tile_size, variants=variants, seed=seed)
+        print(f"Synthetic project: {grid_size}x{grid_size} tiles of {tile_size}px, {variants} variants")
+
+        with silenced(quiet):
+            stage_funcs = build_stages(project_path, grid_size, word_count)
+        stages = {}
+        for name, func, setup in stage_funcs:
+            stages[name] = time_stage(func, repeat, seed, quiet, setup)
+            print(f"  {name:<30} {stages[name]:8.3f}s")
+    finally:
+        if workdir is None:
+            shutil.rmtree(root, ignore_errors=True)
+
+    return {
+        'config': config,
+        'repeat': repeat,
+        'recorded': datetime.now().isoformat(timespec='seconds'),
+        'stages': stages
+    }
+
+def save_json(data, path):
+    """Write data as indented JSON, creating the parent directory."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the Paneful pipeline end to end")
+    parser.add_argument('--grid', type=int, default=4, help="Tiles per row and column")
+    parser.add_argument('--tile-size', type=int, default=256, help="Rendered tile size in pixels")
+    parser.add_argument('--variants', type=int, default=3, help="Number of rendered variants")
+    parser.add_argument('--words', type=int, default=10, help="Words placed in the word placement stage")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed")
+    parser.add_argument('--repeat', type=int, default=1, help="Timed runs per stage")
+    parser.add_argument('--workdir', help="Keep the synthetic project in this directory instead of a temporary one")
+    parser.add_argument('--output', help="Also write the results to this JSON file")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE_PATH, help="Baseline JSON file")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed slowdown for stages without their own threshold (0.25 = 25%%)")
+    parser.add_argument('--update-baseline', action='store_true', help="Record these results as the baseline")
+    parser.add_argument('--verbose', action='store_true', help="Show the pipeline's own output")
+    args = parser.parse_args()
+
+    results = run(args.grid, args.tile_size, args.variants, args.words, args.seed, args.repeat,
+                  args.workdir, quiet=not args.verbose)
+    if args.output:
+        save_json(results, args.output)
+
+    baseline = load_baseline(args.baseline)
+    if args.update_baseline:
+        # Keep hand-tuned per-stage thresholds across updates
+        results['thresholds'] = baseline.get('thresholds', {}) if baseline else {}
+        save_json(results, args.baseline)
+        print(f"Baseline written to {args.baseline}")
+    elif baseline is None:
+        print(f"No baseline at {args.baseline}; record one with --update-baseline")
+    else:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} stage(s) regressed past their threshold")
+            sys.exit(1)
+        print("\nNo regressions")
@@ -0,0 +1,92 @@
+# benchmarks/effects_benchmark.py
+"""
+Per-effect timings of the word-layer distortions against the original
+per-pixel implementations.
+
+Usage: python -m benchmarks.effects_benchmark [--size 512] [--repeat 3]
+"""
+import argparse
+import math
+import time
+import numpy as np
+from PIL import Image, ImageDraw
+from app.functions.overlay.effects import (
+    apply_liquid_effect,
+    apply_wave_distortion,
+    liquid_offsets,
+    wave_offsets
+)
+
+def reference_wave_distortion(layer, amplitude=50, wavelength=100):
+    """Original putpixel implementation of apply_wave_distortion."""
+    width, height = layer.size
+    result = Image.new('RGBA', layer.size, (0, 0, 0, 0))
+    pixels = np.array(layer)
+    offsets = wave_offsets(height, amplitude, wavelength)
+    for y in range(height):
+        for x in range(width):
+            result.putpixel(((x + int(offsets[y])) % width, y), tuple(pixels[y, x]))
+    return result
+
+def reference_liquid_effect(layer, intensity=30):
+    """Original putpixel implementation of apply_liquid_effect."""
+    width, height = layer.size
+    smoothed = liquid_offsets(height, width, intensity)
+    result = Image.new('RGBA', layer.size, (0, 0, 0, 0))
+    pixels = np.array(layer)
+    for y in range(height):
+        for x in range(width):
+            offset = int(smoothed[y, x])
+            result.putpixel(((x + offset) % width, (y + offset) % height), tuple(pixels[y, x]))
+    return result
+
+def make_word_layer(size):
+    """Create a transparent layer with some opaque text-like shapes."""
+    layer = Image.new('RGBA', (size, size), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(layer)
+    for i in range(8):
+        top = int(size * (0.1 + 0.1 * i))
+        draw.rectangle([size // 8, top, size - size // 8, top + size // 30], fill=(255, 40 * i % 256, 90, 255))
+        draw.text((size // 4, top), "DADA", fill=(20, 200, 255, 200))
+    return layer
+
+def time_call(func, layer, repeat, seed):
+    """Best-of-repeat wall time of func(layer), with numpy's RNG reseeded each run."""
+    best, result = math.inf, None
+    for _ in range(repeat):
+        np.random.seed(seed)
+        start = time.perf_counter()
+        result = func(layer)
+        best = min(best, time.perf_counter() - start)
+    return best, np.asarray(result)
+
+def run(size=512, repeat=3, seed=0):
+    """Time each effect and report the speedup and largest pixel difference."""
+    layer = make_word_layer(size)
+    cases = [
+        ('wave', reference_wave_distortion, apply_wave_distortion),
+        ('liquid', reference_liquid_effect, apply_liquid_effect)
+    ]
+    results = {}
+    print(f"Word layer: {size}x{size}, best of {repeat}")
+    for name, reference, vectorized in cases:
+        reference_time, expected = time_call(reference, layer, 1, seed)
+        vectorized_time, actual = time_call(vectorized, layer, repeat, seed)
+        max_diff = int(np.abs(expected.astype(np.int16) - actual).max())
+        results[name] = {
+            'reference_s': reference_time,
+            'vectorized_s': vectorized_time,
+            'speedup': reference_time / vectorized_time,
+            'max_diff': max_diff
+        }
+        print(f"  {name:<8} reference {reference_time:8.3f}s  vectorized {vectorized_time:8.4f}s  "
+              f"speedup {reference_time / vectorized_time:8.1f}x  max diff {max_diff}")
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark word-layer distortion effects")
+    parser.add_argument('--size', type=int, default=512, help="Layer width and height in pixels")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs of the vectorized effects")
+    parser.add_argument('--seed', type=int, default=0, help="NumPy seed for the liquid noise")
+    args = parser.parse_args()
+    run(args.size, args.repeat, args.seed)
@@ -0,0 +1,59 @@
+# benchmarks/glow_benchmark.py
+"""
+Timings of the pyramid glow blur against a full-resolution
+ImageFilter.GaussianBlur, across glow radii and canvas sizes.
+
+Usage: python -m benchmarks.glow_benchmark [--sizes 512 2048 4096] [--radii 5 10 25 60 120]
+"""
+import argparse
+import math
+import time
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+from app.functions.overlay.effects import pyramid_blur
+
+def make_text_layer(width, height):
+    """Create a transparent layer with a large word on it."""
+    layer = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(layer)
+    font = ImageFont.load_default(max(10, height // 3))
+    draw.text((width // 10, height // 4), "Dada Merz", font=font, fill=(230, 60, 20, 240))
+    return layer
+
+def best_time(func, repeat):
+    """Best-of-repeat wall time of func() and its last result."""
+    best, result = math.inf, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, np.asarray(result)
+
+def run(sizes=(512, 2048, 4096), radii=(5, 10, 25, 60, 120), repeat=3):
+    """Time both blurs for every size and radius and report the pixel difference."""
+    results = {}
+    print(f"Glow blur, best of {repeat} (layers are size x size/2)")
+    for size in sizes:
+        layer = make_text_layer(size, size // 2)
+        for radius in radii:
+            reference_time, expected = best_time(lambda: layer.filter(ImageFilter.GaussianBlur(radius)), repeat)
+            pyramid_time, actual = best_time(lambda: pyramid_blur(layer, radius), repeat)
+            diff = np.abs(expected.astype(np.int16) - actual)
+            results[(size, radius)] = {
+                'reference_s': reference_time,
+                'pyramid_s': pyramid_time,
+                'speedup': reference_time / pyramid_time,
+                'mean_diff': float(diff.mean()),
+                'max_diff': int(diff.max())
+            }
+            print(f"  {size:>5}px radius {radius:>4}  GaussianBlur {reference_time:7.4f}s  pyramid {pyramid_time:7.4f}s  "
+                  f"speedup {reference_time / pyramid_time:5.1f}x  mean diff {diff.mean():.3f}  max diff {diff.max()}")
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the pyramid glow blur")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[512, 2048, 4096], help="Layer widths in pixels")
+    parser.add_argument('--radii', type=int, nargs='+', default=[5, 10, 25, 60, 120], help="Glow radii")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per case")
+    args = parser.parse_args()
+    run(args.sizes, args.radii, args.repeat)
@@ -0,0 +1,95 @@
+# benchmarks/synthetic_project.py
+"""
+Deterministic synthetic Paneful projects for benchmarking.
+
+A project gets a base image made of random shapes, grid x grid rendered
+tiles per variant (the base image upscaled to tile_size and tinted and
+noised per variant) and, optionally, its subdivided tiles. The same
+arguments always produce the same pixels.
+
+Usage: python -m benchmarks.synthetic_project <root> [--grid 4] [--tile-size 256] [--variants 3] [--seed 0]
+"""
+import argparse
+import os
+import numpy as np
+import cv2
+
+def make_base_image(size, seed=0, shapes=40):
+    """Draw a size x size BGR image of random filled rectangles and circles."""
+    rng = np.random.default_rng(seed)
+    image = np.full((size, size, 3), rng.integers(0, 256, 3), dtype=np.uint8)
+    for _ in range(shapes):
+        color = tuple(int(c) for c in rng.integers(0, 256, 3))
+        x, y = (int(v) for v in rng.integers(0, size, 2))
+        extent = int(rng.integers(size // 20 + 1, size // 4 + 2))
+        if rng.random() < 0.5:
+            cv2.rectangle(image, (x, y), (x + extent, y + extent // 2), color, -1)
+        else:
+            cv2.circle(image, (x, y), extent // 2, color, -1)
+    return image
+
+def make_variant(base, tile_size, grid_size, variant, seed=0):
+    """Upscale the base image to the rendered size and tint and noise it for one variant."""
+    rng = np.random.default_rng((seed, variant))
+    size = tile_size * grid_size
+    image = cv2.resize(base, (size, size), interpolation=cv2.INTER_CUBIC).astype(np.int16)
+    image += rng.integers(-40, 41, 3, dtype=np.int16)
+    image += rng.integers(-12, 13, image.shape, dtype=np.int16)
+    return np.clip(image, 0, 255).astype(np.uint8)
+
+def make_project(root, name='synthetic', grid_size=4, tile_size=256, variants=3, seed=0, subdivide=False):
+    """
+    Create a synthetic project under root and return its path.
+
+    The base image is half the rendered resolution, so slicing upscales
+    its pieces to tile_size as it would for a real project.
+
+    Args:
+        root: Directory to create the project in
+        name: Project name
+        grid_size: Tiles per row and column
+        tile_size: Rendered tile width and height in pixels
+        variants: Number of rendered variants
+        seed: Seed for every random pixel
+        subdivide: Also build subdivided-tiles with process_all_variations
+    """
+    project_path = os.path.join(root, name)
+    for directory in ("base-image", "base-tiles", "rendered-tiles", "subdivided-tiles", "collage-out"):
+        os.makedirs(os.path.join(project_path, directory), exist_ok=True)
+
+    with open(os.path.join(project_path, "paneful.project"), 'w') as f:
+        f.write("[project]\n")
+        f.write(f"name={name}\n")
+        f.write(f"upscale_size={tile_size}\n")
+        f.write(f"base_tile_size={tile_size}\n")
+
+    base = make_base_image(grid_size * tile_size // 2, seed)
+    cv2.imwrite(os.path.join(project_path, "base-image", f"{name}.png"), base)
+
+    # Tiles are named like Stable Diffusion batch output: <index>-<row>_<col>.png
+    for variant in range(variants):
+        variant_dir = os.path.join(project_path, "rendered-tiles", f"variant-{variant:02d}")
+        os.makedirs(variant_dir, exist_ok=True)
+        image = make_variant(base, tile_size, grid_size, variant, seed)
+        for row in range(grid_size):
+            for col in range(grid_size):
+                tile = image[row * tile_size:(row + 1) * tile_size, col * tile_size:(col + 1) * tile_size]
+                cv2.imwrite(os.path.join(variant_dir, f"{variant:05d}-{row}_{col}.png"), tile)
+
+    if subdivide:
+        from app.functions.transform.subdivision_functions import process_all_variations
+        process_all_variations(project_path)
+
+    return project_path
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Create a synthetic Paneful project")
+    parser.add_argument('root', help="Directory to create the project in")
+    parser.add_argument('--name', default='synthetic', help="Project name")
+    parser.add_argument('--grid', type=int, default=4, help="Tiles per row and column")
+    parser.add_argument('--tile-size', type=int, default=256, help="Rendered tile size in pixels")
+    parser.add_argument('--variants', type=int, default=3, help="Number of rendered variants")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed")
+    parser.add_argument('--subdivide', action='store_true', help="Also build the subdivided tiles")
+    args = parser.parse_args()
+    print(make_project(args.root, args.name, args.grid, args.tile_size, args.variants, args.seed, args.subdivide))
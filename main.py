@@ -1,18 +1,32 @@
 # main.py
+import argparse
 import signal
 import sys
 from app.functions.base.settings import load_settings
-from app.ui.menu_functions import handle_main_menu
+from app.ui.cli import COMMANDS, main as run_cli
 
 def signal_handler(sig, frame):
     print('\nGracefully exiting Paneful...')
     sys.exit(0)
 
 def main():
+    # Commands run headless; without one, start the interactive menus
+    if any(arg in COMMANDS for arg in sys.argv[1:]):
+        sys.exit(run_cli(sys.argv[1:]))
+
+    from app.ui.menu_functions import handle_main_menu
+
     # Set up signal handler for graceful exit
     signal.signal(signal.SIGINT, signal_handler)
+    parser = argparse.ArgumentParser(description="Paneful")
+    parser.add_argument('--profile', action='store_true',
+                        help="Profile each menu action into <project>/profiles")
+    args = parser.parse_args()
+
     settings = load_settings()
+    if args.profile:
+        settings['profile'] = True
     handle_main_menu(settings)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()